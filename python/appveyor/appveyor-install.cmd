@@ -1,7 +1,7 @@
 rem install python packages
 pip install --cache-dir C:/egg_cache packaging
-pip install --cache-dir C:/egg_cache nose
-pip install --cache-dir C:/egg_cache coverage==3.7.1
+pip install --cache-dir C:/egg_cache pytest
+pip install --cache-dir C:/egg_cache coverage
 pip install --cache-dir C:/egg_cache h5py
 pip install --cache-dir C:/egg_cache pandas
 pip install --cache-dir C:/egg_cache scipy
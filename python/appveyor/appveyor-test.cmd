@@ -1,6 +1,6 @@
 mkdir testrun
 copy .coveragerc testrun
 cd testrun
-coverage run -m nose.core -v sdafile --exe
+coverage run -m pytest -v --pyargs sdafile
 if %errorlevel% neq 0 exit /b %errorlevel%
 coverage report
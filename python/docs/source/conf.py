@@ -40,7 +40,7 @@ extensions = [
 
 # Intersphinx settings
 intersphinx_mapping = {
-    'python': ('https://docs.python.org/2.7', None),
+    'python': ('https://docs.python.org/3', None),
     'numpy': ('http://docs.scipy.org/doc/numpy/', None),
     'scipy': ('http://docs.scipy.org/doc/scipy/reference', None),
     'h5py': ('http://docs.h5py.org/en/latest/', None),
@@ -1,3 +1,5 @@
 from .version import version as __version__   # noqa
 
 from .sda_file import SDAFile
+from .file_set import SDAFileSet
+from .splits import merge_splits, split
@@ -0,0 +1,303 @@
+""" An asyncio interface to SDA files.
+
+``AsyncSDAFile`` wraps an ``SDAFile`` with coroutines, so that an event loop
+is not blocked while records are read and written. The HDF5 work runs in
+executors owned by each file:
+
+* Reads run in a pool of threads, so that at most ``max_workers`` reads of a
+  file run at a time.
+* Writes run in one thread, in the order they are started. A read waits for
+  the writes started before it, so it sees their data. Coroutines start when
+  they are awaited or scheduled, so writes passed to ``asyncio.gather`` run
+  in the order they are passed.
+
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import time
+
+from .sda_file import SDAFile
+
+
+class AsyncSDAFile(object):
+    """ Read and write an SDA file from asyncio code.
+
+    Examples
+    --------
+    >>> async with await AsyncSDAFile.open('shots.sda', 'r') as sda_file:
+    ...     data = await sda_file.extract_many(['pressure', 'velocity'])
+    ...     async for label, data in sda_file.iter_records():
+    ...         process(label, data)
+
+    """
+
+    def __init__(self, name, mode='a', max_workers=4, **kw):
+        """ Open an SDA file.
+
+        The header of the file is read when it is opened. Use **open** to do
+        this without blocking the event loop.
+
+        Parameters
+        ----------
+        name : str or SDAFile
+            The name of the file, or an ``SDAFile`` to wrap.
+        mode : str, optional
+            The mode of the file. See ``SDAFile``.
+        max_workers : int, optional
+            The maximum number of reads that run at a time. Default 4.
+        kw :
+            Key-word arguments that are passed to ``SDAFile``.
+
+        """
+        if int(max_workers) < 1:
+            raise ValueError("max_workers must be at least 1")
+        if isinstance(name, SDAFile):
+            self._sda_file = name
+        else:
+            self._sda_file = SDAFile(name, mode, **kw)
+        self._max_workers = int(max_workers)
+        self._readers = ThreadPoolExecutor(self._max_workers)
+        self._writer = ThreadPoolExecutor(1)
+        self._last_write = None
+
+    @classmethod
+    async def open(cls, name, mode='a', max_workers=4, **kw):
+        """ Open an SDA file without blocking the event loop.
+
+        See ``AsyncSDAFile``.
+
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            cls, name, mode, max_workers, **kw
+        ))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    @property
+    def sda_file(self):
+        """ The wrapped ``SDAFile``. """
+        return self._sda_file
+
+    @property
+    def name(self):
+        """ File name on disk. """
+        return self._sda_file.name
+
+    @property
+    def mode(self):
+        """ Mode used to open file. """
+        return self._sda_file.mode
+
+    def close(self):
+        """ Wait for pending work, and close the file.
+
+        This blocks. In a coroutine, use **aclose**.
+
+        """
+        self._writer.shutdown()
+        self._readers.shutdown()
+        self._sda_file.close()
+
+    async def aclose(self):
+        """ Wait for pending work, and close the file. """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+    # Reads
+
+    async def extract(self, label, **kw):
+        """ Extract data from the file.
+
+        See ``SDAFile.extract``.
+
+        """
+        return await self._read(self._sda_file.extract, label, **kw)
+
+    async def extract_many(self, labels=None, **kw):
+        """ Extract the data of many labels concurrently.
+
+        Parameters
+        ----------
+        labels : sequence of str, optional
+            The labels to extract. Defaults to all labels.
+        kw :
+            Key-word arguments that are passed to ``SDAFile.extract``.
+
+        Returns
+        -------
+        data : OrderedDict
+            The extracted data by label, in the order of ``labels``.
+
+        """
+        if labels is None:
+            labels = await self.labels()
+        data = await asyncio.gather(
+            *(self.extract(label, **kw) for label in labels)
+        )
+        return OrderedDict(zip(labels, data))
+
+    async def extract_path(self, path, **kw):
+        """ Extract data from a record path.
+
+        See ``SDAFile.extract_path``.
+
+        """
+        return await self._read(self._sda_file.extract_path, path, **kw)
+
+    async def index(self):
+        """ Get the index of the metadata of all records.
+
+        See ``SDAFile.index``.
+
+        """
+        return await self._read(self._sda_file.index)
+
+    async def labels(self):
+        """ Get data labels from the file. """
+        return await self._read(self._sda_file.labels)
+
+    async def probe(self, pattern=None, storage=False):
+        """ Summarize the state of the archive.
+
+        See ``SDAFile.probe``.
+
+        """
+        return await self._read(self._sda_file.probe, pattern, storage)
+
+    async def iter_records(self, labels=None, prefetch=None, **kw):
+        """ Iterate over the data of records.
+
+        The records are extracted concurrently, ahead of the consumer, and
+        yielded in order.
+
+        Parameters
+        ----------
+        labels : sequence of str, optional
+            The labels to extract. Defaults to all labels.
+        prefetch : int, optional
+            The number of records being extracted at a time, including the
+            next record. Defaults to ``max_workers``.
+        kw :
+            Key-word arguments that are passed to ``SDAFile.extract``.
+
+        Yields
+        ------
+        label : str
+            The record label.
+        data :
+            The extracted data.
+
+        """
+        if labels is None:
+            labels = await self.labels()
+        if prefetch is None:
+            prefetch = self._max_workers
+        if int(prefetch) < 1:
+            raise ValueError("prefetch must be at least 1")
+        labels = list(labels)
+        pending = deque()
+        start = 0
+        try:
+            for label in labels:
+                while start < len(labels) and len(pending) < prefetch:
+                    pending.append(asyncio.ensure_future(
+                        self.extract(labels[start], **kw)
+                    ))
+                    start += 1
+                data = await pending.popleft()
+                yield label, data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def follow(self, labels=None, interval=0.1, timeout=None):
+        """ Iterate over the rows appended to records as they arrive.
+
+        See ``SDAFile.follow``.
+
+        Yields
+        ------
+        rows : OrderedDict
+            The new rows by label, as returned by ``SDAFile.refresh``.
+
+        """
+        last = time.time()
+        while True:
+            rows = await self._read(self._sda_file.refresh, labels)
+            if rows:
+                last = time.time()
+                yield rows
+            elif timeout is not None and time.time() - last >= timeout:
+                return
+            else:
+                await asyncio.sleep(interval)
+
+    # Writes
+
+    async def insert(self, label, data, description='', deflate=0, **kw):
+        """ Insert data into the file.
+
+        See ``SDAFile.insert``.
+
+        """
+        await self._write(
+            self._sda_file.insert, label, data, description, deflate, **kw
+        )
+
+    async def replace(self, label, data):
+        """ Replace an existing record.
+
+        See ``SDAFile.replace``.
+
+        """
+        await self._write(self._sda_file.replace, label, data)
+
+    async def remove(self, *labels):
+        """ Remove records from the file.
+
+        See ``SDAFile.remove``.
+
+        """
+        await self._write(self._sda_file.remove, *labels)
+
+    async def describe(self, label, description=''):
+        """ Change the description of a record.
+
+        See ``SDAFile.describe``.
+
+        """
+        await self._write(self._sda_file.describe, label, description)
+
+    async def append(self, label, rows):
+        """ Append rows to a numeric or logical record.
+
+        See ``SDAFile.append``.
+
+        """
+        return await self._write(self._sda_file.append, label, rows)
+
+    async def _read(self, func, *args, **kw):
+        """ Run a read in the reader pool, after earlier writes. """
+        last_write = self._last_write
+        if last_write is not None and not last_write.done():
+            # The read sees the data of earlier writes, failed or not
+            await asyncio.wait([last_write])
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kw)
+        return await loop.run_in_executor(self._readers, call)
+
+    async def _write(self, func, *args, **kw):
+        """ Run a write in the writer thread, after earlier writes. """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kw)
+        future = loop.run_in_executor(self._writer, call)
+        self._last_write = future
+        return await future
@@ -0,0 +1,135 @@
+""" Low-level writer for records with many small leaves.
+
+Creating groups, datasets, and attributes through the high-level h5py API
+costs a lot of Python overhead per object. The ``BulkWriter`` creates them
+through the low-level API instead, reusing property lists, HDF5 types, and
+dataspaces across objects.
+
+"""
+
+import h5py
+from h5py import h5a, h5d, h5p, h5s, h5t
+import numpy as np
+
+
+# Types of string attributes. Strings are variable-length, as written through
+# the high-level API by ``set_encoded``.
+_STRING_DTYPES = {
+    bytes: h5py.string_dtype('ascii'),
+    str: h5py.string_dtype('utf-8'),
+}
+
+
+class BulkWriter(object):
+    """ Create groups, datasets, and attributes with the low-level API.
+
+    A writer caches the property lists, types, and dataspaces it creates. It
+    is meant to be used for the insertion of a single record.
+
+    """
+
+    # Datasets larger than this (in bytes) are left to the high-level API,
+    # which chooses a better chunk shape for them.
+    max_bytes = 2 ** 16
+
+    def __init__(self):
+        self._dcpls = {}
+        self._types = {}
+        self._spaces = {}
+
+    def can_write(self, data):
+        """ Check if a dataset for ``data`` can be created by the writer. """
+        if not isinstance(data, np.ndarray) or data.ndim == 0:
+            return False
+        if data.dtype.hasobject:
+            return False
+        return data.nbytes <= self.max_bytes
+
+    def create_group(self, parent, name):
+        """ Create a group named ``name`` in the ``parent`` group. """
+        gid = h5py.h5g.create(parent.id, _encode(name))
+        return h5py.Group(gid)
+
+    def create_dataset(self, parent, name, data, deflate):
+        """ Create a dataset in the ``parent`` group and write ``data``.
+
+        The dataset is resizable in every dimension, chunked as a single
+        chunk, and compressed with ``deflate``, like datasets created by
+        ``SimpleRecordInserter``.
+
+        Returns
+        -------
+        dsid : h5py.h5d.DatasetID
+            The low-level identifier of the created dataset.
+
+        """
+        tid = self._get_type(data.dtype)
+        space = self._get_space(data.shape, resizable=True)
+        dcpl = self._get_dcpl(data.shape, deflate)
+        dsid = h5d.create(parent.id, _encode(name), tid, space, dcpl=dcpl)
+        if data.size > 0:
+            dsid.write(h5s.ALL, h5s.ALL, np.ascontiguousarray(data))
+        return dsid
+
+    def write_attrs(self, oid, attrs):
+        """ Write all attributes in the dict ``attrs`` to an object.
+
+        Parameters
+        ----------
+        oid : h5py.h5o.ObjectID
+            The low-level identifier of the group or dataset.
+        attrs : dict
+            Attribute values by name. The attributes must not exist. String
+            values are written as variable-length strings.
+
+        """
+        for name, value in attrs.items():
+            if isinstance(value, (bytes, str)):
+                value = np.array(value, dtype=_STRING_DTYPES[type(value)])
+            else:
+                value = np.asarray(value)
+            tid = self._get_type(value.dtype)
+            space = self._get_space(value.shape)
+            name = _encode(name)
+            attr = h5a.create(oid, name, tid, space)
+            attr.write(value)
+
+    def _get_dcpl(self, shape, deflate):
+        """ Get a dataset creation property list for a shape. """
+        key = (shape, deflate)
+        dcpl = self._dcpls.get(key)
+        if dcpl is None:
+            dcpl = h5p.create(h5p.DATASET_CREATE)
+            dcpl.set_chunk(tuple(max(1, dim) for dim in shape))
+            dcpl.set_deflate(deflate)
+            self._dcpls[key] = dcpl
+        return dcpl
+
+    def _get_space(self, shape, resizable=False):
+        """ Get a dataspace for a shape. """
+        key = (shape, resizable)
+        space = self._spaces.get(key)
+        if space is None:
+            if shape == ():
+                space = h5s.create(h5s.SCALAR)
+            elif resizable:
+                maxshape = (h5s.UNLIMITED,) * len(shape)
+                space = h5s.create_simple(shape, maxshape)
+            else:
+                space = h5s.create_simple(shape)
+            self._spaces[key] = space
+        return space
+
+    def _get_type(self, dtype):
+        """ Get the HDF5 type for a dtype. """
+        # String dtypes of different encodings compare equal
+        key = (dtype, h5py.check_string_dtype(dtype))
+        tid = self._types.get(key)
+        if tid is None:
+            tid = self._types[key] = h5t.py_create(dtype, logical=True)
+        return tid
+
+
+def _encode(name):
+    """ Encode an object name for the low-level API. """
+    return name.encode('utf-8')
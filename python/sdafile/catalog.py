@@ -0,0 +1,452 @@
+""" Catalog of the records in many SDA files.
+
+A catalog is a local SQLite database holding the header and the record
+metadata of every archive found under a set of directories. Archives are
+read in parallel with a process pool, using the one-pass metadata index of
+each file. Rescans only read archives whose size or modification time has
+changed, and drop archives that no longer exist.
+
+"""
+
+from collections import namedtuple
+import fnmatch
+import multiprocessing
+import os
+import os.path as op
+import sqlite3
+
+import h5py
+import numpy as np
+
+from .exceptions import BadSDAFile
+from .index import build_index
+from .utils import (
+    dumps_shape, error_if_bad_header, get_decoded, loads_shape,
+)
+
+
+# Version of the catalog schema. Catalogs of other versions are rebuilt.
+CATALOG_VERSION = 2
+
+# Header attributes stored for each archive
+HEADER_ATTRS = ('FileFormat', 'FormatVersion', 'Writable', 'Created',
+                'Updated')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    file_format TEXT,
+    format_version TEXT,
+    writable TEXT,
+    created TEXT,
+    updated TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    record_type TEXT,
+    description TEXT NOT NULL,
+    empty INTEGER NOT NULL,
+    shape TEXT,
+    dtype TEXT,
+    storage_size INTEGER NOT NULL,
+    children INTEGER NOT NULL,
+    PRIMARY KEY (file_id, label)
+);
+CREATE INDEX IF NOT EXISTS records_record_type ON records (record_type);
+CREATE INDEX IF NOT EXISTS records_storage_size ON records (storage_size);
+"""
+
+
+class CatalogFile(namedtuple('CatalogFile', [
+        'path', 'size', 'mtime_ns', 'header', 'error'])):
+    """ An archive in a catalog.
+
+    Attributes
+    ----------
+    path : str
+        The absolute path of the archive.
+    size : int
+        The size of the archive in bytes, when it was scanned.
+    mtime_ns : int
+        The modification time of the archive in nanoseconds, when it was
+        scanned.
+    header : dict
+        The header attributes of the archive, by name.
+    error : str or None
+        The reason the archive could not be read, or None.
+
+    """
+
+    __slots__ = ()
+
+
+class CatalogRecord(namedtuple('CatalogRecord', [
+        'path', 'label', 'record_type', 'description', 'empty', 'shape',
+        'dtype', 'storage_size', 'children'])):
+    """ A record in a catalog.
+
+    Attributes
+    ----------
+    path : str
+        The absolute path of the archive containing the record.
+    label : str
+        The record label.
+    record_type : str
+        The 'RecordType' of the record.
+    description : str
+        The record description.
+    empty : bool
+        Whether the record is marked as empty.
+    shape : tuple or None
+        The shape of the extracted data, as ``Record.shape``.
+    dtype : numpy.dtype or None
+        The dtype of numeric and logical records.
+    storage_size : int
+        The number of bytes stored on disk for the record.
+    children : int
+        The number of elements or fields of composite records.
+
+    """
+
+    __slots__ = ()
+
+
+class Catalog(object):
+    """ SQLite catalog of the records in many SDA files.
+
+    Examples
+    --------
+    >>> with Catalog('shots.db') as catalog:
+    ...     catalog.scan('/data/shots')
+    ...     records = catalog.query(
+    ...         record_type='numeric', description='velocity',
+    ...         min_size=2 ** 30,
+    ...     )
+
+    """
+
+    def __init__(self, path):
+        """ Open or create a catalog.
+
+        Parameters
+        ----------
+        path : str
+            The path of the catalog database. Use ':memory:' for a catalog
+            that is not saved.
+
+        """
+        self._path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        version, = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != CATALOG_VERSION:
+            # The catalog only caches the archives, so it is rebuilt
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS records; DROP TABLE IF EXISTS files;"
+            )
+            self._conn.execute(
+                "PRAGMA user_version = {}".format(CATALOG_VERSION)
+            )
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Close the catalog database. """
+        self._conn.close()
+
+    def scan(self, *directories, **kw):
+        """ Add the archives found in directories to the catalog.
+
+        Archives whose size and modification time match the catalog are not
+        read again. Archives that were cataloged under the directories but
+        no longer exist are removed. Without ``recursive``, only archives
+        directly in the directories are removed. Archives that cannot be
+        read are cataloged with an error and without records.
+
+        Parameters
+        ----------
+        *directories : str
+            The directories to scan.
+        pattern : str, optional
+            The glob pattern of archive file names. Default '*.sda'.
+        recursive : bool, optional
+            Whether to scan sub-directories. Default True.
+        processes : int, optional
+            The number of worker processes. Defaults to the number of CPUs.
+            If 1, archives are read in this process.
+
+        Returns
+        -------
+        counts : dict
+            The number of archives that were 'scanned', 'unchanged',
+            'removed', and 'failed'.
+
+        """
+        pattern = kw.pop('pattern', '*.sda')
+        recursive = kw.pop('recursive', True)
+        processes = kw.pop('processes', None)
+        if kw:
+            msg = "Unexpected keyword arguments: {}".format(", ".join(kw))
+            raise TypeError(msg)
+
+        directories = [op.abspath(directory) for directory in directories]
+        for directory in directories:
+            if not op.isdir(directory):
+                raise ValueError("'{}' is not a directory".format(directory))
+
+        found = {}
+        for directory in directories:
+            for path in _find_files(directory, pattern, recursive):
+                stat = os.stat(path)
+                found[path] = (stat.st_size, stat.st_mtime_ns)
+
+        known = dict(
+            (path, (size, mtime_ns)) for path, size, mtime_ns in
+            self._conn.execute("SELECT path, size, mtime_ns FROM files")
+        )
+        removed = [
+            path for path in known
+            if path not in found and _is_under(path, directories, recursive)
+        ]
+        tasks = [
+            (path, size, mtime_ns) for path, (size, mtime_ns) in
+            sorted(found.items()) if known.get(path) != (size, mtime_ns)
+        ]
+
+        counts = {
+            'scanned': len(tasks),
+            'unchanged': len(found) - len(tasks),
+            'removed': len(removed),
+            'failed': 0,
+        }
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM files WHERE path = ?",
+                ((path,) for path in removed),
+            )
+            for result in _map(_scan_file, tasks, processes):
+                if result[-1] is not None:
+                    counts['failed'] += 1
+                self._store(*result)
+        return counts
+
+    def files(self):
+        """ Get the archives in the catalog.
+
+        Returns
+        -------
+        files : list
+            :class:`CatalogFile` instances, ordered by path.
+
+        """
+        rows = self._conn.execute(
+            "SELECT path, size, mtime_ns, file_format, format_version, "
+            "writable, created, updated, error FROM files ORDER BY path"
+        )
+        files = []
+        for row in rows:
+            path, size, mtime_ns = row[:3]
+            header = dict(
+                (attr, value) for attr, value in zip(HEADER_ATTRS, row[3:8])
+                if value is not None
+            )
+            files.append(CatalogFile(path, size, mtime_ns, header, row[8]))
+        return files
+
+    def query(self, record_type=None, label=None, description=None,
+              min_size=None, max_size=None, path=None):
+        """ Find records in the catalog.
+
+        All passed criteria must match.
+
+        Parameters
+        ----------
+        record_type : str or sequence of str, optional
+            The record type, or record types, of the records.
+        label : str, optional
+            A glob pattern, as used by ``fnmatch``, matching the labels.
+        description : str, optional
+            Text that the descriptions must contain, ignoring case.
+        min_size, max_size : int, optional
+            The inclusive bounds on the number of bytes stored on disk for
+            the records. This is the compressed size of deflated records.
+        path : str, optional
+            A glob pattern matching the absolute paths of the archives.
+
+        Returns
+        -------
+        records : list
+            :class:`CatalogRecord` instances, ordered by path and label.
+
+        """
+        clauses = []
+        params = []
+        if record_type is not None:
+            if isinstance(record_type, str):
+                record_type = [record_type]
+            record_type = list(record_type)
+            clauses.append("r.record_type IN ({})".format(
+                ", ".join("?" * len(record_type))
+            ))
+            params.extend(record_type)
+        if label is not None:
+            clauses.append("r.label GLOB ?")
+            params.append(_glob_to_sqlite(label))
+        if description is not None:
+            clauses.append("instr(lower(r.description), lower(?)) > 0")
+            params.append(description)
+        if min_size is not None:
+            clauses.append("r.storage_size >= ?")
+            params.append(int(min_size))
+        if max_size is not None:
+            clauses.append("r.storage_size <= ?")
+            params.append(int(max_size))
+        if path is not None:
+            clauses.append("f.path GLOB ?")
+            params.append(_glob_to_sqlite(path))
+
+        sql = (
+            "SELECT f.path, r.label, r.record_type, r.description, r.empty, "
+            "r.shape, r.dtype, r.storage_size, r.children "
+            "FROM records r JOIN files f ON r.file_id = f.id"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY f.path, r.label"
+        return [
+            _decode_record(row) for row in self._conn.execute(sql, params)
+        ]
+
+    def _store(self, path, size, mtime_ns, header, records, error):
+        """ Replace the catalog entries of an archive. """
+        conn = self._conn
+        conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        values = [header.get(attr) for attr in HEADER_ATTRS]
+        cursor = conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, file_format, "
+            "format_version, writable, created, updated, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [path, size, mtime_ns] + values + [error],
+        )
+        file_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((file_id,) + record for record in records),
+        )
+
+
+def _scan_file(task):
+    """ Read the header and records of an archive.
+
+    This runs in the worker processes of ``Catalog.scan``.
+
+    Parameters
+    ----------
+    task : tuple
+        The (path, size, mtime_ns) of the archive.
+
+    Returns
+    -------
+    result : tuple
+        The (path, size, mtime_ns, header, records, error) of the archive.
+        ``records`` holds rows of the records table without the file id.
+
+    """
+    path, size, mtime_ns = task
+    try:
+        with h5py.File(path, 'r') as h5file:
+            error_if_bad_header(h5file)
+            header = get_decoded(h5file.attrs, *HEADER_ATTRS)
+            index = build_index(h5file)
+    except (BadSDAFile, IOError, OSError, KeyError, ValueError) as e:
+        error = "{}: {}".format(type(e).__name__, e)
+        return path, size, mtime_ns, {}, [], error
+
+    records = [
+        (
+            entry.label,
+            entry.record_type,
+            entry.description,
+            int(entry.empty),
+            dumps_shape(entry.shape),
+            None if entry.dtype is None else entry.dtype.str,
+            int(entry.storage_size),
+            entry.children,
+        )
+        for entry in index.values()
+    ]
+    return path, size, mtime_ns, header, records, None
+
+
+def _map(func, tasks, processes):
+    """ Map ``func`` over tasks, in a process pool if there are many. """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(tasks))
+    if processes <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        chunksize = max(1, len(tasks) // (4 * processes))
+        for result in pool.imap_unordered(func, tasks, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _find_files(directory, pattern, recursive):
+    """ Generate the paths of files in a directory matching a pattern. """
+    for root, dirnames, filenames in os.walk(directory):
+        for filename in fnmatch.filter(filenames, pattern):
+            yield op.join(root, filename)
+        if not recursive:
+            break
+
+
+def _is_under(path, directories, recursive=True):
+    """ Check if a path is within any of the directories.
+
+    If not ``recursive``, the path must be directly in a directory.
+
+    """
+    if not recursive:
+        return op.dirname(path) in directories
+    return any(
+        path.startswith(op.join(directory, '')) for directory in directories
+    )
+
+
+def _glob_to_sqlite(pattern):
+    """ Convert an ``fnmatch`` pattern to an SQLite GLOB pattern. """
+    # The patterns only differ in the negation of character sets
+    return pattern.replace('[!', '[^')
+
+
+def _decode_record(row):
+    (path, label, record_type, description, empty, shape, dtype,
+     storage_size, children) = row
+    return CatalogRecord(
+        path=path,
+        label=label,
+        record_type=record_type,
+        description=description,
+        empty=bool(empty),
+        shape=loads_shape(shape),
+        dtype=None if dtype is None else np.dtype(dtype),
+        storage_size=storage_size,
+        children=children,
+    )
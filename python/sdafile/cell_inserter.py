@@ -63,3 +63,30 @@ class ArrayInserter(ListInserter):
         self.record_size = np.atleast_2d(self.data).shape
         self.data = self.original_data.ravel(order='F')
         self.empty = 'yes' if self.data.size == 0 else 'no'
+
+
+class IteratorInserter(ListInserter):
+    """ Inserter for iterables, including iterators and generators.
+
+    The elements are consumed and inserted one at a time. RecordSize and
+    Empty metadata are recorded after the last element is inserted.
+
+    """
+
+    @staticmethod
+    def can_insert(data):
+        """ This can insert any iterable that is not a string. """
+        if isinstance(data, (str, bytes)):
+            return False
+        return hasattr(data, '__iter__')
+
+    def prepare_data(self):
+        """ Initializes RecordSize and Empty metadata. """
+        self.empty = 'yes'
+        self.record_size = (1, 0)
+
+    def __iter__(self):
+        for element_inserter in ListInserter.__iter__(self):
+            self.empty = 'no'
+            self.record_size = (1, self.record_size[1] + 1)
+            yield element_inserter
@@ -1,12 +1,27 @@
+import h5py
+from h5py import h5a, h5s, h5t
 import numpy as np
-from scipy.sparse import coo_matrix
+from scipy.sparse import coo_matrix, csc_matrix, csr_matrix
 
 from .utils import (
-    cell_label, get_decoded, get_empty_for_type, is_simple, is_supported,
+    cell_label, get_empty_for_type, is_simple, is_supported,
 )
 
 
-def extract(h5file, label):
+# Attributes needed to extract records stored as groups or as datasets
+GROUP_ATTRS = ('RecordType', 'Empty', 'RecordSize', 'FieldNames')
+DATASET_ATTRS = ('RecordType', 'Empty', 'Complex', 'Sparse', 'ArraySize')
+
+# Sparse matrix classes by format name
+SPARSE_FORMATS = {
+    'coo': coo_matrix,
+    'csc': csc_matrix,
+    'csr': csr_matrix,
+}
+
+
+def extract(h5file, label, sparse_format='coo', rows=None, columnar=False,
+            stack=False):
     """ Extract data from an archive.
 
     Parameters
@@ -15,6 +30,16 @@ def extract(h5file, label):
         The h5py File containing data
     label : str
         The data label.
+    sparse_format : str, optional
+        The format of extracted sparse matrices; 'coo', 'csr', or 'csc'.
+    rows : slice, optional
+        A range of rows to extract from a sparse numeric record.
+    columnar : bool, optional
+        If True, extract a 'structures' or 'objects' record as a dict of
+        field names to arrays that stack the field over all elements.
+    stack : bool, optional
+        If True, extract a 'cell' record of uniform, non-empty numeric or
+        logical arrays as a single array, with the cell dimensions leading.
 
     Returns
     -------
@@ -23,21 +48,58 @@ def extract(h5file, label):
 
     """
     grp = h5file[label]
-    attrs = get_decoded(grp.attrs)
-    return _extract_data_from_group(grp, label, attrs)
+    attrs = read_attrs(grp)
+    if columnar:
+        return _extract_columns(grp, attrs)
+    if stack:
+        return _extract_stacked(grp, label, attrs)
+    if rows is not None:
+        return _extract_sparse_rows(grp, label, attrs, rows, sparse_format)
+    return _extract_data_from_group(grp, label, attrs, sparse_format)
 
 
-def extract_simple(record_type, data, data_attrs):
+def extract_path(h5file, path, sparse_format='coo'):
+    """ Extract a record, or a record nested in cell and structure records.
+
+    Parameters
+    ----------
+    h5file : h5py.File
+        The h5py File containing data
+    path : str
+        The HDF5 path of the record, e.g. 'label/element 2/field'.
+    sparse_format : str, optional
+        The format of extracted sparse matrices; 'coo', 'csr', or 'csc'.
+
+    Returns
+    -------
+    data : object
+        Archive data of the record.
+
+    """
+    obj = h5file[path]
+    attrs = read_attrs(obj)
+    if isinstance(obj, h5py.Dataset):
+        # Nested simple records are stored directly as datasets
+        return extract_simple(attrs['RecordType'], obj, attrs, sparse_format)
+    label = path.rsplit('/', 1)[-1]
+    return _extract_data_from_group(obj, label, attrs, sparse_format)
+
+
+def extract_simple(record_type, data, data_attrs, sparse_format='coo'):
     """ Extract simple data from its raw storage format.
 
     Parameters
     -----------
-    data : ndarray
-        Data extracted from hdf5 dataset storage
     record_type : str
         The simple data type
+    data : ndarray or h5py.Dataset
+        Data extracted from hdf5 dataset storage, or the dataset itself. When
+        a dataset is passed, complex data is read directly into its final
+        buffer.
     data_attrs : dict
         Attributes associated with the stored dataset
+    sparse_format : str, optional
+        The format of extracted sparse matrices; 'coo', 'csr', or 'csc'.
 
     Returns
     -------
@@ -49,12 +111,24 @@ def extract_simple(record_type, data, data_attrs):
     sparse_flag = data_attrs.get('Sparse', 'no')
     shape = data_attrs.get('ArraySize', None)
 
+    # Complex and sparse data are read straight from the dataset. Everything
+    # else needs the raw stored array.
+    is_direct = record_type == 'numeric' and 'yes' in (
+        complex_flag, sparse_flag
+    )
+    if isinstance(data, h5py.Dataset) and not is_direct:
+        data = data[()]
+
     if record_type == 'numeric':
         if sparse_flag == 'yes':
             if complex_flag == 'yes':
-                extracted = extract_sparse_complex(data, shape.astype(int))
+                extracted = extract_sparse_complex(
+                    data, shape.astype(int), sparse_format,
+                )
             else:
-                extracted = extract_sparse(data)
+                if shape is not None:
+                    shape = shape.astype(int)
+                extracted = extract_sparse(data, shape, sparse_format)
         elif complex_flag == 'yes':
             extracted = extract_complex(data, shape.astype(int))
         else:
@@ -99,8 +173,10 @@ def extract_complex(data, shape):
 
     Parameters
     -----------
-    data : ndarray
+    data : ndarray or h5py.Dataset
         2 x N array containing real and imaginary portions of the complex data.
+        A dataset is read row-wise into the real and imaginary parts of the
+        output without intermediate copies.
     shape : tuple
         Shape of the extracted array.
 
@@ -110,8 +186,7 @@ def extract_complex(data, shape):
         The extracted complex array.
 
     """
-    extracted = 1j * data[1]
-    extracted.real = data[0]
+    extracted = _read_complex(data, 0)
     extracted = extracted.reshape(shape, order='F')
     return reduce_array(extracted)
 
@@ -169,55 +244,69 @@ def extract_numeric(data):
     return reduce_array(data.T)
 
 
-def extract_sparse(data):
+def extract_sparse(data, shape=None, sparse_format='coo'):
     """ Extract sparse 'numeric' data from stored form.
 
     Parameters
     -----------
-    data : 3xN ndarray
+    data : 3xN ndarray or h5py.Dataset
         3xN array containing the rows, columns, and values of a sparse matrix
         in COO form. Note that the row and column arrays must be 1-based to be
         compatible with MATLAB.
+    shape : tuple, optional
+        Shape of the extracted array. If not specified, this is inferred from
+        the largest row and column indices.
+    sparse_format : str, optional
+        The format of the extracted matrix; 'coo', 'csr', or 'csc'.
 
     Returns
     -------
-    extracted : scipy.sparse.coo_matrix
+    extracted : scipy.sparse.coo_matrix, csr_matrix, or csc_matrix
         The extracted sparse matrix
 
     """
-    row, col, data = data
+    n = data.shape[1]
+    row = np.empty(n, dtype=np.int64)
+    col = np.empty(n, dtype=np.int64)
+    values = np.empty(n, dtype=data.dtype)
+    _read_row(data, 0, row)
+    _read_row(data, 1, col)
+    _read_row(data, 2, values)
     # Fix 1-based indexing
     row -= 1
     col -= 1
-    return coo_matrix((data, (row, col)))
+    return _make_sparse(values, row, col, shape, sparse_format)
 
 
-def extract_sparse_complex(data, shape):
+def extract_sparse_complex(data, shape, sparse_format='coo'):
     """ Extract sparse 'numeric' data from stored form.
 
     Parameters
     -----------
-    data : ndarray
+    data : ndarray or h5py.Dataset
         3xN array containing the index, real, and imaginary values of a
         sparse complex data. The index is unraveled and 1-based.
     shape : tuple
         Shape of the extracted array
+    sparse_format : str, optional
+        The format of the extracted matrix; 'coo', 'csr', or 'csc'.
 
     Returns
     -------
-    extracted : coo_matrix
+    extracted : coo_matrix, csr_matrix, or csc_matrix
         The extracted sparse, complex matrix
 
     """
-    index = data[0].astype(np.int64)
+    index = np.empty(data.shape[1], dtype=np.int64)
+    _read_row(data, 0, index)
     # Fix 1-based indexing
     index -= 1
-    data = extract_complex(data[1:], (data.shape[1],))
+    data = _read_complex(data, 1)
     row, col = np.unravel_index(index, shape)
-    return coo_matrix((data, (row, col)))
+    return _make_sparse(data, row, col, shape, sparse_format)
 
 
-def _extract_data_from_group(grp, label, attrs):
+def _extract_data_from_group(grp, label, attrs, sparse_format='coo'):
     """ Extract data from h5 group. ``label`` is the group label. """
 
     record_type = attrs['RecordType']
@@ -231,40 +320,443 @@ def _extract_data_from_group(grp, label, attrs):
 
     if is_simple(record_type):
         ds = grp[label]
-        data_attrs = get_decoded(ds.attrs)
-        return extract_simple(record_type, ds[()], data_attrs)
-
-    if record_type in ('cell', 'structures', 'objects'):
-        record_size = attrs['RecordSize'].astype(int)
-        nr = np.prod(record_size)
-        labels = [cell_label(i) for i in range(1, nr + 1)]
-        data = _extract_composite_data(grp, labels)
+        data_attrs = read_attrs(ds)
+        return extract_simple(record_type, ds, data_attrs, sparse_format)
+
+    return _extract_composite(grp, attrs, sparse_format)
+
+
+def _extract_composite(grp, attrs, sparse_format='coo'):
+    """ Extract a composite record from its h5 group.
+
+    Nested composite records are extracted with an explicit stack rather than
+    by recursion, so that the depth of nesting is not limited by the Python
+    recursion limit. Each stack entry is a ``_CompositeFrame``.
+
+    """
+    stack = [_CompositeFrame(grp, attrs)]
+    while True:
+        frame = stack[-1]
+        if frame.is_done():
+            data = frame.result()
+            stack.pop()
+            if not stack:
+                return data
+            stack[-1].data.append(data)
+            continue
+
+        sub_obj, sub_attrs = frame.next_element()
+        record_type = sub_attrs['RecordType']
+        if is_simple(record_type):
+            element = extract_simple(
+                record_type, sub_obj, sub_attrs, sparse_format,
+            )
+        elif not is_supported(record_type):
+            msg = "RecordType '{}' is not supported".format(record_type)
+            raise ValueError(msg)
+        elif sub_attrs['Empty'] == 'yes':
+            element = get_empty_for_type(record_type)
+        else:
+            stack.append(_CompositeFrame(sub_obj, sub_attrs))
+            continue
+        frame.data.append(element)
+
+
+class _CompositeFrame(object):
+    """ The extraction state of a composite record.
+
+    Only the group of the record is held. Each element is opened, and its
+    attributes read, when it is extracted, so that the number of open
+    objects does not grow with the size of the record. The extracted
+    elements are collected in ``data``.
+
+    """
+
+    def __init__(self, grp, attrs):
+        self.grp = grp
+        self.record_type = attrs['RecordType']
+        if self.record_type in ('structure', 'object'):
+            self.record_size = None
+            self.labels = attrs['FieldNames'].split()
+            self.n = len(self.labels)
+        else:
+            self.record_size = attrs['RecordSize'].astype(int)
+            self.labels = None
+            self.n = int(np.prod(self.record_size))
+        self.data = []
+
+    def is_done(self):
+        """ Check if all elements have been extracted. """
+        return len(self.data) == self.n
+
+    def next_element(self):
+        """ Get the (object, attrs) of the next element to extract. """
+        i = len(self.data)
+        if self.labels is None:
+            label = cell_label(i + 1)
+        else:
+            label = self.labels[i]
+        obj = self.grp[label]
+        return obj, read_attrs(obj)
+
+    def result(self):
+        """ Get the extracted record from the extracted elements. """
+        data = self.data
+        if self.record_size is None:
+            return dict(zip(self.labels, data))
+        record_size = self.record_size
         if record_size[0] > 1 or len(record_size) > 2:
-            data = np.array(
-                data, dtype=object,
-            ).reshape(record_size, order='F')
-    elif record_type in ('structure', 'object'):
-        labels = attrs['FieldNames'].split()
-        data = _extract_composite_data(grp, labels)
-        data = dict(zip(labels, data))
+            data = np.array(data, dtype=object).reshape(record_size, order='F')
+        return data
+
+
+def _extract_columns(grp, attrs):
+    """ Extract a 'structures' or 'objects' record as a dict of columns.
+
+    The columns are preallocated from the fields of the first element and
+    filled in one pass over the elements, in column-major order.
+
+    """
+    if attrs['RecordType'] not in ('structures', 'objects'):
+        msg = "Only 'structures' and 'objects' records can be columnar"
+        raise ValueError(msg)
+    if attrs['Empty'] == 'yes':
+        raise ValueError("Cannot extract columns from an empty record")
+
+    n = int(np.prod(attrs['RecordSize']))
+    first = grp[cell_label(1)]
+    field_names = read_attrs(first, 'FieldNames')['FieldNames']
+    readers = [
+        _StackReader(field, first[field], n) for field in field_names.split()
+    ]
+
+    for i in range(n):
+        element = grp[cell_label(i + 1)]
+        element_fields = read_attrs(element, 'FieldNames')
+        if element_fields.get('FieldNames') != field_names:
+            raise ValueError("Record elements have different fields")
+        for reader in readers:
+            reader.read(i, element[reader.name])
+
+    return dict((reader.name, reader.result()) for reader in readers)
+
+
+def _extract_stacked(grp, label, attrs):
+    """ Extract a 'cell' record of uniform arrays as one array.
+
+    The result is preallocated from the first element and filled in one
+    pass over the elements.
+
+    """
+    if attrs['RecordType'] != 'cell':
+        raise ValueError("Only 'cell' records can be stacked")
+    if attrs['Empty'] == 'yes':
+        raise ValueError("Cannot stack an empty record")
+
+    record_size = tuple(attrs['RecordSize'].astype(int))
+    n = int(np.prod(record_size))
+    reader = _StackReader(label, grp[cell_label(1)], n, allow_empty=False)
+    if reader.record_type not in ('numeric', 'logical'):
+        msg = "Only cells of numeric or logical data can be stacked"
+        raise ValueError(msg)
+    for i in range(n):
+        reader.read(i, grp[cell_label(i + 1)])
+    data = reader.result()
+
+    # Arrange the elements like the cell, as in _extract_data_from_group
+    if record_size[0] > 1 or len(record_size) > 2:
+        ndim = len(record_size)
+        data = data.reshape(record_size[::-1] + data.shape[1:])
+        axes = tuple(range(ndim - 1, -1, -1))
+        data = data.transpose(axes + tuple(range(ndim, data.ndim)))
     return data
 
 
-def _extract_composite_data(grp, labels):
-    """ Extract composite data from a Group object with given labels. """
-    extracted = []
-    for label in labels:
-        sub_obj = grp[label]
-        attrs = get_decoded(sub_obj.attrs)
-        record_type = attrs['RecordType']
-        if is_simple(record_type):
-            element = extract_simple(record_type, sub_obj[()], attrs)
+class _StackReader(object):
+    """ Reads a simple record from many elements into one array.
+
+    ``name`` names the record in error messages. This is a structure field
+    name when extracting columns.
+
+    Real numeric and logical fields are read directly into a preallocated
+    array of the stored data. Complex fields are stacked into a complex
+    array, and character and file fields are collected in an object array.
+    Unless ``allow_empty``, elements marked as empty raise a ValueError
+    rather than being read as NaN.
+
+    """
+
+    def __init__(self, name, ds, n, allow_empty=True):
+        self.name = name
+        self.allow_empty = allow_empty
+        if not isinstance(ds, h5py.Dataset):
+            msg = "'{}' is not a simple record".format(name)
+            raise ValueError(msg)
+        attrs = read_attrs(ds)
+        self.record_type = attrs['RecordType']
+        self.complex = attrs.get('Complex', 'no')
+        if attrs.get('Sparse', 'no') == 'yes':
+            msg = "'{}' is sparse and cannot be stacked".format(name)
+            raise ValueError(msg)
+
+        self.shape = ds.shape
+        self.dtype = ds.dtype
+        self.direct = (
+            self.record_type in ('numeric', 'logical') and
+            self.complex == 'no'
+        )
+        if self.direct:
+            self.data = np.empty((n,) + self.shape, dtype=self.dtype)
+        elif self.record_type == 'numeric':
+            value = np.asarray(extract_simple(self.record_type, ds, attrs))
+            self.data = np.empty((n,) + value.shape, dtype=value.dtype)
+        else:
+            self.data = np.empty(n, dtype=object)
+
+    def read(self, i, ds):
+        """ Read the record of the i-th element from its dataset. """
+        attrs = read_attrs(ds, 'RecordType', 'Complex', 'Empty')
+        is_homogeneous = (
+            isinstance(ds, h5py.Dataset) and
+            attrs['RecordType'] == self.record_type and
+            attrs.get('Complex', 'no') == self.complex and
+            (self.record_type in ('character', 'file') or (
+                ds.shape == self.shape and ds.dtype == self.dtype
+            ))
+        )
+        if not is_homogeneous:
+            msg = "'{}' is not homogeneous".format(self.name)
+            raise ValueError(msg)
+        if attrs['Empty'] == 'yes' and not self.allow_empty:
+            msg = "'{}' has empty elements".format(self.name)
+            raise ValueError(msg)
+
+        if self.direct:
+            # Empty numeric data is stored as NaN, which reads as-is.
+            if ds.size > 0:
+                ds.read_direct(self.data[i])
+        elif attrs['Empty'] == 'yes':
+            self.data[i] = get_empty_for_type(self.record_type)
         else:
-            element = _extract_data_from_group(sub_obj, label, attrs)
-        extracted.append(element)
+            attrs = read_attrs(ds)
+            self.data[i] = extract_simple(self.record_type, ds, attrs)
+
+    def result(self):
+        """ Get the stacked data after all elements have been read. """
+        if not self.direct:
+            return self.data
+
+        # Undo the MATLAB transpose of each element and reduce row arrays
+        # and scalars, as done by ``extract_simple``.
+        n = len(self.data)
+        ndim = len(self.shape)
+        data = self.data.transpose((0,) + tuple(range(ndim, 0, -1)))
+        shape = self.shape[::-1]
+        if ndim == 2 and shape[0] == 1:
+            shape = () if shape[1] == 1 else shape[1:]
+        data = data.reshape((n,) + shape)
+
+        if self.record_type == 'logical':
+            if data.dtype.itemsize == 1:
+                data = data.view(bool)
+            else:
+                data = data.astype(bool)
+        return data
+
+
+def _extract_sparse_rows(grp, label, attrs, rows, sparse_format):
+    """ Extract a range of rows from a sparse numeric record.
+
+    If the record has a row index, only the triplets of the row bands that
+    overlap the range are read. Otherwise, all triplets are read.
+
+    """
+    ds = grp.get(label)
+    names = DATASET_ATTRS + ('RowIndexStep', 'RowIndex')
+    data_attrs = {} if ds is None else read_attrs(ds, *names)
+    is_sparse = (
+        attrs['RecordType'] == 'numeric' and
+        attrs['Empty'] == 'no' and
+        data_attrs.get('Sparse', 'no') == 'yes'
+    )
+    if not is_sparse:
+        msg = "Rows can only be extracted from sparse numeric records"
+        raise ValueError(msg)
+    if not isinstance(rows, slice) or rows.step not in (None, 1):
+        raise ValueError("'rows' must be a slice with unit step")
+
+    is_complex = data_attrs.get('Complex', 'no') == 'yes'
+    shape = data_attrs.get('ArraySize', None)
+    if shape is not None:
+        shape = tuple(shape.astype(int))
+
+    # Read only the row bands covering the requested rows, if indexed.
+    if shape is not None and 'RowIndex' in data_attrs:
+        start, stop = _row_range(rows, shape[0])
+        step = int(data_attrs['RowIndexStep'])
+        offsets = data_attrs['RowIndex']
+        lo = offsets[start // step]
+        hi = offsets[min(-(-stop // step), len(offsets) - 1)]
+        triplets = ds[:, lo:hi]
+    else:
+        triplets = ds[()]
+
+    if is_complex:
+        index = triplets[0].astype(np.int64) - 1
+        row, col = np.unravel_index(index, shape)
+        values = _read_complex(triplets, 1)
+    else:
+        row = triplets[0].astype(np.int64) - 1
+        col = triplets[1].astype(np.int64) - 1
+        values = triplets[2]
+        if shape is None:
+            shape = (
+                int(row.max()) + 1 if row.size else 0,
+                int(col.max()) + 1 if col.size else 0,
+            )
+
+    start, stop = _row_range(rows, shape[0])
+    keep = (row >= start) & (row < stop)
+    shape = (stop - start, shape[1])
+    return _make_sparse(
+        values[keep], row[keep] - start, col[keep], shape, sparse_format,
+    )
+
+
+def _row_range(rows, nrows):
+    """ Get the (start, stop) bounds of a row slice for ``nrows`` rows. """
+    start, stop, _ = rows.indices(nrows)
+    return start, max(start, stop)
+
+
+def _make_sparse(values, row, col, shape, sparse_format):
+    """ Build a sparse matrix of the requested format from triplets. """
+    try:
+        cls = SPARSE_FORMATS[sparse_format]
+    except KeyError:
+        msg = "Unsupported sparse format '{}'".format(sparse_format)
+        raise ValueError(msg)
+    if shape is not None:
+        shape = tuple(shape)
+    return cls((values, (row, col)), shape=shape)
+
+
+def _read_complex(data, start):
+    """ Read rows ``start`` and ``start + 1`` of ``data`` as complex values.
+
+    The rows hold the real and imaginary parts, respectively. They are
+    written directly into the interleaved buffer of the output array.
+
+    """
+    dtype = np.result_type(data.dtype, np.complex64)
+    extracted = np.empty(data.shape[1], dtype=dtype)
+    # View the complex array as [re0, im0, re1, im1, ...]
+    parts = extracted.view(extracted.real.dtype)
+    _read_row(data, start, parts, stride=2)
+    _read_row(data, start + 1, parts, stride=2, offset=1)
     return extracted
 
 
+def _read_row(data, row, out, stride=1, offset=0):
+    """ Read a row of a 2D array or dataset into every ``stride`` element of
+    the flat array ``out``, beginning at ``offset``.
+
+    """
+    n = data.shape[1]
+    if not isinstance(data, h5py.Dataset):
+        out[offset::stride] = data[row]
+        return
+    if n == 0:
+        return
+
+    # Select the row in the file and the strided elements in memory
+    file_space = data.id.get_space()
+    file_space.select_hyperslab((row, 0), (1, n))
+    mem_space = h5py.h5s.create_simple((out.size,))
+    mem_space.select_hyperslab((offset,), (n,), (stride,))
+    data.id.read(mem_space, file_space, out)
+
+
+def read_attrs(obj, *attrs):
+    """ Read decoded attributes of an h5py object if they exist.
+
+    Only the named attributes are read, through the low-level API. If no
+    attrs are passed, the attributes needed to extract the record stored in
+    ``obj`` are read. This is faster than ``get_decoded(obj.attrs)``, which
+    reads every attribute through the high-level API.
+
+    """
+    if len(attrs) == 0:
+        is_dataset = isinstance(obj, h5py.Dataset)
+        attrs = DATASET_ATTRS if is_dataset else GROUP_ATTRS
+    oid = obj.id
+    values = {}
+    for attr in attrs:
+        name = _ATTR_NAMES.get(attr)
+        if name is None:
+            name = _ATTR_NAMES[attr] = attr.encode('ascii')
+        if h5a.exists(oid, name):
+            values[attr] = _read_attr(h5a.open(oid, name))
+    return values
+
+
+# Encoded attribute names, string dtypes and memory types, and memory types
+# of other attribute dtypes, cached for ``read_attrs``
+_ATTR_NAMES = {}
+_STRING_TYPES = {}
+_MEMORY_TYPES = {}
+
+
+def _read_attr(attr):
+    """ Read and decode the value of a low-level attribute. """
+    tid = attr.get_type()
+    is_scalar_string = (
+        tid.get_class() == h5t.STRING and
+        attr.get_space().get_simple_extent_type() == h5s.SCALAR
+    )
+    if is_scalar_string:
+        # The common case, which is read without converting the file type to
+        # a dtype.
+        dtype, mtype = _get_string_types(tid)
+        value = np.empty((), dtype=dtype)
+        attr.read(value, mtype=mtype)
+    else:
+        dtype = attr.dtype
+        mtype = _MEMORY_TYPES.get(dtype)
+        if mtype is None:
+            mtype = _MEMORY_TYPES[dtype] = h5t.py_create(dtype)
+        value = np.empty(attr.shape, dtype=dtype)
+        if value.size > 0:
+            attr.read(value, mtype=mtype)
+    value = value[()]
+    if isinstance(value, bytes):
+        value = value.decode('ascii')
+    return value
+
+
+def _get_string_types(tid):
+    """ Get the dtype and memory type for reading a string attribute. """
+    is_variable = tid.is_variable_str()
+    if is_variable:
+        key = (is_variable, tid.get_cset())
+    else:
+        key = (is_variable, tid.get_size())
+    types = _STRING_TYPES.get(key)
+    if types is None:
+        if is_variable:
+            encoding = 'utf-8' if key[1] == h5t.CSET_UTF8 else 'ascii'
+            dtype = h5py.string_dtype(encoding)
+            types = (dtype, h5t.py_create(dtype))
+        else:
+            types = (np.dtype('S{}'.format(key[1])), None)
+        _STRING_TYPES[key] = types
+    dtype, mtype = types
+    if mtype is None:
+        # Fixed-length strings are read with their file type
+        mtype = tid
+    return dtype, mtype
+
+
 def reduce_array(arr):
     """ Reduce a 2d row-array or scalar to 1 or 0 dimensions, respectively. """
     # squeeze leading dimension if this is a MATLAB row array
@@ -0,0 +1,383 @@
+""" Read-only access to many SDA files as one archive.
+
+An ``SDAFileSet`` presents the union of the records of many archives, such
+as one archive per shot. Files are opened when they are first read, and
+their headers are validated at that time. Open files are held in a pool of
+limited size, and the least recently used file is closed when the pool is
+full.
+
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import glob
+import os
+import os.path as op
+import re
+import threading
+
+import h5py
+
+from .sda_file import PROBE_COLUMNS, SDAFile
+from .utils import error_if_bad_header
+
+
+# Rules for choosing the file of labels that exist in several files
+PRECEDENCE_RULES = ('first', 'last', 'newest', 'error')
+
+
+class SDAFileSet(object):
+    """ Read records from many SDA files as one archive.
+
+    Examples
+    --------
+    >>> shots = SDAFileSet('shots/*.sda', max_open=32, precedence='newest')
+    >>> shots.labels()
+    ['pressure', 'velocity']
+    >>> data = shots.extract_many(['pressure', 'velocity'])
+    >>> velocities = [f.extract('velocity') for f in shots.files]
+
+    """
+
+    def __init__(self, paths, max_open=64, precedence='first', sidecar=False,
+                 **kw):
+        """ Create a set of SDA files.
+
+        No file is opened when the set is created.
+
+        Parameters
+        ----------
+        paths : str or sequence of str
+            The names of the files, or a glob pattern matching them. Files
+            matching a pattern are ordered by name.
+        max_open : int, optional
+            The maximum number of files held open at a time. Default 64.
+        precedence : str or callable, optional
+            How to choose the file of a label that exists in several files.
+
+            first     The first file in ``paths`` (default)
+            last      The last file in ``paths``
+            newest    The most recently modified file
+            error     Raise a ValueError
+
+            A callable is passed the label and the names of the files that
+            contain it, in order, and returns the chosen name.
+        sidecar : bool, optional
+            Whether the files use index sidecars. See ``SDAFile``.
+        kw :
+            Key-word arguments that are passed to the underlying HDF5 files.
+            See h5py.File for options.
+
+        Raises
+        ------
+        IOError if a file does not exist
+        ValueError if ``max_open`` is less than 1
+        ValueError if ``precedence`` is not a known rule or callable
+
+        """
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(paths))
+        for path in paths:
+            if not op.isfile(path):
+                raise IOError("File '{}' does not exist".format(path))
+        if int(max_open) < 1:
+            raise ValueError("max_open must be at least 1")
+        if not callable(precedence) and precedence not in PRECEDENCE_RULES:
+            msg = "Unknown precedence '{}'".format(precedence)
+            raise ValueError(msg)
+
+        self._pool = _HandlePool(int(max_open), kw)
+        self._files = [_SetMember(path, self._pool, sidecar) for path in paths]
+        self._precedence = precedence
+        self._sources = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Close all open files. """
+        self._pool.close()
+
+    @property
+    def files(self):
+        """ The read-only ``SDAFile`` of every file, in order.
+
+        These share the pool of open files of the set.
+
+        """
+        return list(self._files)
+
+    def __len__(self):
+        return len(self.labels())
+
+    def __contains__(self, label):
+        return label in self._get_sources()
+
+    def __getitem__(self, label):
+        """ Get a lazy :class:`~sdafile.record.Record` for a label.
+
+        Raises
+        ------
+        ValueError if the label does not exist
+
+        """
+        return self._get_source(label)[label]
+
+    def labels(self):
+        """ Get the labels of all files, in the order of the files. """
+        return list(self._get_sources())
+
+    def locate(self, label):
+        """ Get the name of the file that provides a label.
+
+        Raises
+        ------
+        ValueError if the label does not exist
+
+        """
+        return self._get_source(label).name
+
+    def extract(self, label, **kw):
+        """ Extract data from the file that provides a label.
+
+        Key-word arguments are passed to ``SDAFile.extract``.
+
+        Raises
+        ------
+        ValueError if the label does not exist
+
+        """
+        return self._get_source(label).extract(label, **kw)
+
+    def extract_many(self, labels=None, **kw):
+        """ Extract the data of many labels.
+
+        The labels are extracted file by file, so that each file is opened
+        at most once.
+
+        Parameters
+        ----------
+        labels : sequence of str, optional
+            The labels to extract. Defaults to all labels.
+        kw :
+            Key-word arguments that are passed to ``SDAFile.extract``.
+
+        Returns
+        -------
+        data : OrderedDict
+            The extracted data by label, in the order of ``labels``.
+
+        Raises
+        ------
+        ValueError if a label does not exist
+
+        """
+        if labels is None:
+            labels = self.labels()
+        by_file = OrderedDict()
+        for label in labels:
+            by_file.setdefault(self._get_source(label), []).append(label)
+        extracted = {}
+        for sda_file, file_labels in by_file.items():
+            for label in file_labels:
+                extracted[label] = sda_file.extract(label, **kw)
+        return OrderedDict((label, extracted[label]) for label in labels)
+
+    def probe(self, pattern=None):
+        """ Summarize the records of the set.
+
+        This requires the pandas package.
+
+        Parameters
+        ----------
+        pattern : str or None, optional
+            A search pattern (python regular expression) applied to find
+            labels of interest. If None, all labels are selected.
+
+        Returns
+        -------
+        summary : :class:`DataFrame<pandas:pandas.DataFrame>`
+            A table summarizing the records, as ``SDAFile.probe``, with the
+            name of the file of each record in the 'File' column.
+
+        """
+        from pandas import DataFrame
+        sources = self._get_sources()
+        labels = list(sources)
+        if pattern is not None:
+            regex = re.compile(pattern)
+            labels = [
+                label for label in labels if regex.match(label) is not None
+            ]
+
+        summary = []
+        for label in labels:
+            sda_file = sources[label]
+            attrs = dict(sda_file.index()[label].attrs)
+            attrs['label'] = label
+            attrs['File'] = sda_file.name
+            summary.append(attrs)
+        cols = list(PROBE_COLUMNS) + ['File']
+        return DataFrame(summary, columns=cols).set_index('label').fillna('')
+
+    def _get_source(self, label):
+        """ Get the member file that provides a label. """
+        sda_file = self._get_sources().get(label)
+        if sda_file is None:
+            raise ValueError("Label item '{}' does not exist".format(label))
+        return sda_file
+
+    def _get_sources(self):
+        """ Get the member file of every label, resolving conflicts. """
+        if self._sources is not None:
+            return self._sources
+
+        candidates = OrderedDict()
+        for sda_file in self._files:
+            # Only the labels are needed, not the index of every file
+            for label in sda_file._top_labels():
+                candidates.setdefault(label, []).append(sda_file)
+
+        sources = OrderedDict()
+        for label, files in candidates.items():
+            if len(files) == 1:
+                sources[label] = files[0]
+            else:
+                sources[label] = self._resolve_conflict(label, files)
+        self._sources = sources
+        return sources
+
+    def _resolve_conflict(self, label, files):
+        """ Choose the file of a label from the files that contain it. """
+        precedence = self._precedence
+        if callable(precedence):
+            name = precedence(label, [sda_file.name for sda_file in files])
+            for sda_file in files:
+                if sda_file.name == name:
+                    return sda_file
+            msg = "Precedence chose '{}', which does not contain '{}'"
+            raise ValueError(msg.format(name, label))
+        if precedence == 'first':
+            return files[0]
+        if precedence == 'last':
+            return files[-1]
+        if precedence == 'newest':
+            return max(files, key=lambda f: os.stat(f.name).st_mtime)
+        names = ", ".join(sda_file.name for sda_file in files)
+        raise ValueError("Label '{}' exists in {}".format(label, names))
+
+
+class _HandlePool(object):
+    """ Least recently used pool of open, validated HDF5 files.
+
+    The pool may be used by many threads. Files that are in use are not
+    closed to make room for others, so the pool may exceed its size while
+    more than ``max_open`` files are in use.
+
+    """
+
+    def __init__(self, max_open, kw):
+        self.max_open = max_open
+        self._kw = kw
+        self._lock = threading.Lock()
+        self._handles = OrderedDict()
+        self._users = {}
+
+    def __len__(self):
+        return len(self._handles)
+
+    @contextmanager
+    def handle(self, name):
+        """ Use the open file of a name, opening it if needed.
+
+        The header of a file is validated when it is opened. Files are
+        opened outside of the lock, so that threads do not wait for each
+        other's opens.
+
+        """
+        with self._lock:
+            h5file = self._use(name)
+        if h5file is None:
+            opened = self._open(name)
+            with self._lock:
+                # Another thread may have opened the file meanwhile
+                h5file = self._use(name, opened)
+            if h5file is not opened:
+                opened.close()
+        try:
+            yield h5file
+        finally:
+            with self._lock:
+                self._users[name] -= 1
+                if not self._users[name]:
+                    del self._users[name]
+                self._evict()
+
+    def close(self):
+        """ Close all open files. """
+        with self._lock:
+            while self._handles:
+                _, h5file = self._handles.popitem()
+                h5file.close()
+            self._users.clear()
+
+    def _open(self, name):
+        """ Open a file and validate its header. """
+        h5file = h5py.File(name, 'r', **self._kw)
+        try:
+            error_if_bad_header(h5file)
+        except BaseException:
+            h5file.close()
+            raise
+        return h5file
+
+    def _use(self, name, opened=None):
+        """ Use the pooled file of a name, or add ``opened`` to the pool.
+
+        This must be called with the lock held. None is returned if the
+        file is not in the pool and ``opened`` is None.
+
+        """
+        h5file = self._handles.pop(name, None)
+        if h5file is None:
+            h5file = opened
+            if h5file is None:
+                return None
+        self._handles[name] = h5file
+        self._users[name] = self._users.get(name, 0) + 1
+        self._evict()
+        return h5file
+
+    def _evict(self):
+        """ Close the least recently used idle files over the size. """
+        idle = [name for name in self._handles if name not in self._users]
+        while len(self._handles) > self.max_open and idle:
+            self._handles.pop(idle.pop(0)).close()
+
+
+class _SetMember(SDAFile):
+    """ Read-only ``SDAFile`` that reads through a handle pool.
+
+    The header is validated by the pool when the file is opened, rather than
+    when the member is created.
+
+    """
+
+    def __init__(self, name, pool, sidecar=False):
+        self._init_state(name, 'r', sidecar, False, {})
+        self._pool = pool
+
+    @contextmanager
+    def _h5file(self, mode):
+        if mode != 'r':
+            raise IOError("File is not writable")
+        with self._lock.read(), self._pool.handle(self._filename) as h5file:
+            yield h5file
+
+    def _top_labels(self):
+        """ Get the labels of the file without building its index. """
+        with self._h5file('r') as h5file:
+            return list(h5file)
@@ -0,0 +1,257 @@
+""" One-pass metadata index of the records in an SDA file.
+
+The index is built by visiting every object in the file once with the
+low-level API. Only the attributes of the top-level record groups and of the
+datasets of simple records are read. Nested objects are counted and their
+storage is summed, but their attributes are not read.
+
+Storage profiles, which describe how the data of records is laid out on
+disk, are built on request in the same way.
+
+"""
+
+from collections import OrderedDict, namedtuple
+
+import h5py
+from h5py import h5a, h5d, h5o
+import numpy as np
+
+from .extract import _read_attr
+from .record import _record_dtype, _record_shape
+from .utils import is_simple
+
+
+class IndexEntry(namedtuple('IndexEntry', [
+        'label', 'record_type', 'description', 'empty', 'shape', 'dtype',
+        'deflate', 'complex', 'sparse', 'children', 'storage_size', 'attrs',
+        'data_shape'])):
+    """ The metadata of a record in an archive index.
+
+    Attributes
+    ----------
+    label : str
+        The record label.
+    record_type : str
+        The 'RecordType' of the record.
+    description : str
+        The record description.
+    empty : bool
+        Whether the record is marked as empty.
+    shape : tuple or None
+        The shape of the extracted data, as ``Record.shape``.
+    dtype : numpy.dtype or None
+        The dtype of numeric and logical records.
+    deflate : int
+        The compression level of the record.
+    complex : bool
+        Whether the record holds complex numeric data.
+    sparse : bool
+        Whether the record holds sparse numeric data.
+    children : int
+        The number of elements or fields of composite records, or 0 for
+        simple records.
+    storage_size : int
+        The number of bytes of data stored for the record and all records
+        nested within it.
+    attrs : dict
+        All decoded attributes of the record, including those of the dataset
+        of simple records.
+    data_shape : tuple or None
+        The shape of the stored dataset of simple records.
+
+    """
+
+    __slots__ = ()
+
+
+def build_index(h5file):
+    """ Build the metadata index of an archive.
+
+    Parameters
+    ----------
+    h5file : h5py.File
+        The h5py File containing data
+
+    Returns
+    -------
+    index : OrderedDict
+        :class:`IndexEntry` instances by label, in label order.
+
+    """
+    fid = h5file.id
+    records = OrderedDict()
+
+    def visitor(name, info):
+        if name == b'.':
+            return
+        parts = name.decode('utf-8').split('/')
+        label = parts[0]
+        if len(parts) == 1:
+            oid = h5o.open(fid, name)
+            records[label] = record = _RecordInfo(oid)
+            if not record.is_group:
+                record.storage_size = oid.get_storage_size()
+            return
+
+        # Objects are visited after their parent group
+        record = records[label]
+        dsid = None
+        if info.type == h5o.TYPE_DATASET:
+            dsid = h5o.open(fid, name)
+            record.storage_size += dsid.get_storage_size()
+        if len(parts) == 2:
+            if dsid is not None and parts[1] == label and record.is_simple():
+                record.set_data(dsid)
+            else:
+                record.children += 1
+
+    h5o.visit(fid, visitor, info=True)
+    return OrderedDict(
+        (label, record.entry(label)) for label, record in records.items()
+    )
+
+
+# Names of dataset storage layouts
+LAYOUTS = {
+    h5d.COMPACT: 'compact',
+    h5d.CONTIGUOUS: 'contiguous',
+    h5d.CHUNKED: 'chunked',
+}
+
+# Fields of a storage profile, as probe columns
+STORAGE_PROFILE_FIELDS = (
+    'StorageSize', 'LogicalSize', 'CompressionRatio', 'Layout', 'Chunks',
+    'Leaves', 'Offset',
+)
+
+
+def storage_profile(h5file, label):
+    """ Profile the storage of a record.
+
+    Parameters
+    ----------
+    h5file : h5py.File
+        The h5py File containing data
+    label : str
+        The record label.
+
+    Returns
+    -------
+    profile : dict
+        The storage profile of the record with fields
+
+        StorageSize
+            The number of bytes stored on disk for all datasets of the
+            record.
+        LogicalSize
+            The number of bytes of the uncompressed data of all datasets.
+        CompressionRatio
+            LogicalSize / StorageSize, or NaN if nothing is stored.
+        Layout
+            The layout of the datasets; 'compact', 'contiguous', 'chunked',
+            or 'mixed'. This is '' for records without datasets.
+        Chunks
+            The chunk shape shared by all datasets, or None.
+        Leaves
+            The number of datasets of the record.
+        Offset
+            The file address of the record group.
+
+    """
+    gid = h5o.open(h5file.id, label.encode('utf-8'))
+    profile = dict(
+        StorageSize=0,
+        LogicalSize=0,
+        Leaves=0,
+        Offset=h5o.get_info(gid).addr,
+    )
+    layouts = set()
+    chunks = set()
+
+    def add_dataset(dsid):
+        dcpl = dsid.get_create_plist()
+        layout = dcpl.get_layout()
+        layouts.add(LAYOUTS.get(layout, 'other'))
+        chunks.add(dcpl.get_chunk() if layout == h5d.CHUNKED else None)
+        profile['StorageSize'] += dsid.get_storage_size()
+        size = int(np.prod(dsid.shape, dtype=np.int64))
+        profile['LogicalSize'] += size * dsid.dtype.itemsize
+        profile['Leaves'] += 1
+
+    def visitor(name, info):
+        if info.type == h5o.TYPE_DATASET:
+            add_dataset(h5o.open(gid, name))
+
+    if isinstance(gid, h5d.DatasetID):
+        add_dataset(gid)
+    else:
+        h5o.visit(gid, visitor, info=True)
+
+    if len(layouts) > 1:
+        profile['Layout'] = 'mixed'
+    else:
+        profile['Layout'] = layouts.pop() if layouts else ''
+    profile['Chunks'] = chunks.pop() if len(chunks) == 1 else None
+    if profile['StorageSize'] > 0:
+        ratio = profile['LogicalSize'] / float(profile['StorageSize'])
+    else:
+        ratio = np.nan
+    profile['CompressionRatio'] = ratio
+    return profile
+
+
+class _RecordInfo(object):
+    """ Metadata of a record collected while visiting the file. """
+
+    def __init__(self, oid):
+        self.is_group = isinstance(oid, h5py.h5g.GroupID)
+        self.attrs = _read_all_attrs(oid)
+        self.data_shape = self.data_dtype = None
+        if not self.is_group:
+            self.data_shape = oid.shape
+            self.data_dtype = oid.dtype
+        self.children = 0
+        self.storage_size = 0
+
+    def is_simple(self):
+        """ Check if the record stores its data in a dataset. """
+        return is_simple(self.attrs.get('RecordType'))
+
+    def set_data(self, dsid):
+        """ Record the metadata of the dataset of a simple record. """
+        self.attrs.update(_read_all_attrs(dsid))
+        self.data_shape = dsid.shape
+        self.data_dtype = dsid.dtype
+
+    def entry(self, label):
+        """ Get the index entry of the record. """
+        attrs = self.attrs
+        if 'RecordType' in attrs:
+            shape = _record_shape(attrs, self.data_shape, self.is_group)
+            dtype = _record_dtype(attrs, self.data_dtype)
+        else:
+            shape = dtype = None
+        return IndexEntry(
+            label=label,
+            record_type=attrs.get('RecordType'),
+            description=attrs.get('Description', ''),
+            empty=attrs.get('Empty', 'no') == 'yes',
+            shape=shape,
+            dtype=dtype,
+            deflate=int(attrs.get('Deflate', 0)),
+            complex=attrs.get('Complex', 'no') == 'yes',
+            sparse=attrs.get('Sparse', 'no') == 'yes',
+            children=self.children,
+            storage_size=self.storage_size,
+            attrs=attrs,
+            data_shape=self.data_shape,
+        )
+
+
+def _read_all_attrs(oid):
+    """ Read all decoded attributes of a low-level object. """
+    attrs = {}
+    for i in range(h5a.get_num_attrs(oid)):
+        attr = h5a.open(oid, index=i)
+        attrs[attr.name.decode('utf-8')] = _read_attr(attr)
+    return attrs
@@ -0,0 +1,89 @@
+""" Locks for sharing SDA files between threads. """
+
+from contextlib import contextmanager
+import threading
+
+
+class RWLock(object):
+    """ A reentrant reader/writer lock.
+
+    Many threads may hold the lock for reading, or one thread for writing.
+    Waiting writers take precedence over new readers, so that writers are
+    not starved by a steady stream of reads. The thread that holds the lock
+    for writing may also acquire it for reading. A thread that holds the
+    lock for reading only may not acquire it for writing.
+
+    Examples
+    --------
+    >>> lock = RWLock()
+    >>> with lock.read():
+    ...     data = read()
+    >>> with lock.write():
+    ...     write(data)
+
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._writes = 0
+        self._waiting_writers = 0
+
+    def is_writer(self):
+        """ Whether this thread holds the lock for writing. """
+        with self._cond:
+            return self._writer == threading.get_ident()
+
+    @contextmanager
+    def read(self):
+        """ Hold the lock for reading. """
+        me = threading.get_ident()
+        with self._cond:
+            # Reentrant reads do not wait, or they would deadlock with a
+            # waiting writer
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                count = self._readers.pop(me) - 1
+                if count:
+                    self._readers[me] = count
+                else:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """ Hold the lock for writing.
+
+        Raises
+        ------
+        RuntimeError if this thread holds the lock for reading only
+
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                if me in self._readers:
+                    msg = "Cannot write while holding the lock for reading"
+                    raise RuntimeError(msg)
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+            self._writes += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writes -= 1
+                if not self._writes:
+                    self._writer = None
+                    self._cond.notify_all()
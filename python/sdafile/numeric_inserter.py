@@ -5,6 +5,14 @@ from .record_inserter import SimpleRecordInserter, inserter
 from .utils import UNSUPPORTED_NUMERIC_TYPE_CODES, set_encoded
 
 
+# Number of nonzeros written per block for sparse records
+SPARSE_BLOCK_SIZE = 2 ** 20
+
+# Maximum number of row bands in the index of a row-ordered sparse record.
+# This keeps the 'RowIndex' attribute within the HDF5 compact attribute limit.
+ROW_INDEX_SIZE = 4096
+
+
 class BaseNumericInserter(SimpleRecordInserter):
     """ Base inserter for numeric types. """
 
@@ -17,7 +25,7 @@ class BaseNumericInserter(SimpleRecordInserter):
             Complex=self.complex,
             Sparse=self.sparse,
         )
-        if self.complex == 'yes':
+        if self.array_size is not None:
             attrs['ArraySize'] = self.array_size
         set_encoded(dict_like, **attrs)
 
@@ -79,7 +87,17 @@ class ScalarInserter(ArrayInserter):
 
 @inserter
 class SparseInserter(BaseNumericInserter):
-    """ Inserter for sparse, numeric arrays. """
+    """ Inserter for sparse, numeric arrays.
+
+    If ``row_index`` is True, the triplets are stored in row order and the
+    dataset is given 'RowIndexStep' and 'RowIndex' attributes. 'RowIndex'
+    holds the triplet offset of every 'RowIndexStep'-th row, plus the total
+    number of triplets. This allows row ranges to be read without reading
+    the whole record.
+
+    """
+
+    row_index = False
 
     @staticmethod
     def can_insert(data):
@@ -91,18 +109,107 @@ class SparseInserter(BaseNumericInserter):
         return np.issubdtype(data.dtype, np.number)
 
     def prepare_data(self):
-        """ Records RecordSize metadata. """
+        """ Records ArraySize and Complex metadata.
+
+        CSR and CSC matrices are kept in their native format. All other
+        formats are converted to COO. The stored triplets are computed block
+        by block in ``insert_below_group``.
+
+        """
         self.sparse = 'yes'
-        data = self.data.tocoo()
+        if self.row_index:
+            self.data = self.data.tocsr()
+        elif self.data.format not in ('csr', 'csc'):
+            self.data = self.data.tocoo()
+        self.array_size = self.data.shape
         if np.issubdtype(self.data.dtype, np.complexfloating):
             self.complex = 'yes'
-            self.array_size = data.shape
-            indices = np.ravel_multi_index((data.row, data.col), data.shape)
-            self.data = np.vstack([
-                indices + 1, data.data.real, data.data.imag
-            ])
         else:
             self.complex = 'no'
-            self.array_size = None
-            # 3 x N, [row, column, value], 1-based
-            self.data = np.array([data.row + 1, data.col + 1, data.data])
+
+    def insert_below_group(self, group, writer=None):
+        """ Insert below a group, writing the 3xN triplets in blocks.
+
+        Real data is stored as [row, column, value] and complex data as
+        [index, real, imaginary], where the index is the raveled position
+        within the array. All indices are 1-based.
+
+        """
+        data = self.data
+        index_dtype = self.get_index_dtype()
+        if self.complex == 'yes':
+            value_dtype = np.finfo(data.dtype).dtype
+        else:
+            value_dtype = data.dtype
+        dtype = np.result_type(index_dtype, value_dtype)
+        ds = group.create_dataset(
+            self.label,
+            shape=(3, data.nnz),
+            maxshape=(None, None),
+            dtype=dtype,
+            compression=self.deflate,
+        )
+        for start, stop, row, col, values in self.iter_blocks():
+            if self.complex == 'yes':
+                index = np.ravel_multi_index((row, col), self.array_size)
+                ds[0, start:stop] = index + 1
+                ds[1, start:stop] = values.real
+                ds[2, start:stop] = values.imag
+            else:
+                ds[0, start:stop] = row + 1
+                ds[1, start:stop] = col + 1
+                ds[2, start:stop] = values
+        self.record_dataset_attributes(ds.attrs)
+        if self.row_index:
+            step, offsets = self.get_row_index()
+            ds.attrs['RowIndexStep'] = step
+            ds.attrs['RowIndex'] = offsets
+
+    def get_row_index(self):
+        """ Get the row step and triplet offsets of the row index.
+
+        This requires the data to be in CSR format.
+
+        """
+        indptr = self.data.indptr
+        nrows = len(indptr) - 1
+        step = max(1, -(-nrows // ROW_INDEX_SIZE))
+        offsets = indptr[::step]
+        if nrows % step != 0:
+            offsets = np.append(offsets, indptr[-1])
+        return step, offsets.astype(np.int64)
+
+    def get_index_dtype(self):
+        """ Get the dtype of the (0-based) stored indices. """
+        if self.complex == 'yes':
+            return np.dtype(np.intp)
+        data = self.data
+        if data.format == 'coo':
+            return np.result_type(data.row, data.col)
+        return data.indices.dtype
+
+    def iter_blocks(self, block_size=SPARSE_BLOCK_SIZE):
+        """ Yield (start, stop, row, col, values) blocks of the nonzeros.
+
+        The rows and columns are 0-based. CSR and CSC matrices are expanded
+        one block at a time.
+
+        """
+        data = self.data
+        nnz = data.nnz
+        for start in range(0, nnz, block_size):
+            stop = min(start + block_size, nnz)
+            values = data.data[start:stop]
+            if data.format == 'coo':
+                row = data.row[start:stop]
+                col = data.col[start:stop]
+            else:
+                # Expand the compressed axis from the index pointer
+                positions = np.arange(start, stop)
+                major = np.searchsorted(data.indptr, positions, 'right') - 1
+                minor = data.indices[start:stop]
+                if data.format == 'csr':
+                    row, col = major, minor
+                else:
+                    row, col = minor, major
+            yield start, stop, row, col, values
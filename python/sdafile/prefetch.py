@@ -0,0 +1,163 @@
+""" Reading ahead of a consumer in a background thread.
+
+A ``Prefetcher`` calls a function for each of a sequence of keys in a
+background thread, and buffers the results until they are consumed. The
+buffer is bounded by a number of results and a number of bytes, so that
+reading ahead of a slow consumer does not exhaust memory.
+
+The reading of HDF5 data holds the GIL, but most numpy operations release it.
+The reads of the background thread overlap the work of the consumer to that
+extent.
+
+"""
+
+from collections import deque
+import sys
+import threading
+
+import numpy as np
+
+
+# Default maximum number of bytes of buffered results
+PREFETCH_BYTES = 2 ** 28
+
+# Array attributes of sparse matrices
+_SPARSE_ARRAYS = ('data', 'row', 'col', 'indices', 'indptr')
+
+
+class Prefetcher(object):
+    """ Iterate over the results of a function, computed ahead of time.
+
+    Examples
+    --------
+    >>> with Prefetcher(sda_file.extract, labels, prefetch=4) as results:
+    ...     for label, data in results:
+    ...         process(label, data)
+
+    """
+
+    def __init__(self, func, keys, prefetch=2, max_bytes=PREFETCH_BYTES):
+        """ Start computing results in a background thread.
+
+        Parameters
+        ----------
+        func : callable
+            The function that is called with each key.
+        keys : sequence
+            The keys, in order.
+        prefetch : int, optional
+            The maximum number of results buffered ahead of the consumer.
+        max_bytes : int, optional
+            The maximum number of bytes of buffered results. One result is
+            buffered regardless of its size, so that results larger than
+            this are still computed ahead.
+
+        Raises
+        ------
+        ValueError if ``prefetch`` is less than 1
+
+        """
+        if int(prefetch) < 1:
+            raise ValueError("prefetch must be at least 1")
+        self._func = func
+        self._keys = list(keys)
+        self._prefetch = int(prefetch)
+        self._max_bytes = int(max_bytes)
+        self._cond = threading.Condition()
+        self._buffer = deque()
+        self._buffered_bytes = 0
+        self._remaining = len(self._keys)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """ Get the next (key, result) pair.
+
+        Errors of the function are raised here, for the key that caused
+        them, and stop the iteration.
+
+        """
+        with self._cond:
+            if self._remaining == 0:
+                raise StopIteration
+            while not self._buffer:
+                self._cond.wait()
+            key, result, nbytes, error = self._buffer.popleft()
+            self._buffered_bytes -= nbytes
+            self._remaining -= 1
+            if error is not None:
+                self._remaining = 0
+            self._cond.notify_all()
+        if error is not None:
+            raise error
+        return key, result
+
+    @property
+    def buffered_bytes(self):
+        """ The number of bytes of buffered results. """
+        return self._buffered_bytes
+
+    def close(self):
+        """ Stop computing results, and discard buffered results. """
+        with self._cond:
+            self._closed = True
+            self._remaining = 0
+            self._buffer.clear()
+            self._buffered_bytes = 0
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        for key in self._keys:
+            with self._cond:
+                while not self._closed and self._buffer and (
+                        len(self._buffer) >= self._prefetch or
+                        self._buffered_bytes >= self._max_bytes):
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                result, error = self._func(key), None
+            except Exception as e:
+                result, error = None, e
+            nbytes = get_nbytes(result)
+            with self._cond:
+                if self._closed:
+                    return
+                self._buffer.append((key, result, nbytes, error))
+                self._buffered_bytes += nbytes
+                self._cond.notify_all()
+            if error is not None:
+                return
+
+
+def get_nbytes(data):
+    """ Estimate the number of bytes of memory held by extracted data. """
+    if isinstance(data, np.ndarray):
+        nbytes = data.nbytes
+        if data.dtype.hasobject:
+            nbytes += sum(get_nbytes(item) for item in data.flat)
+        return nbytes
+    if isinstance(data, dict):
+        return sum(get_nbytes(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(get_nbytes(item) for item in data)
+    if hasattr(data, 'memory_usage'):
+        # pandas DataFrame
+        return int(data.memory_usage(deep=True).sum())
+    arrays = [getattr(data, attr, None) for attr in _SPARSE_ARRAYS]
+    arrays = [array for array in arrays if isinstance(array, np.ndarray)]
+    if arrays:
+        return sum(array.nbytes for array in arrays)
+    return sys.getsizeof(data)
@@ -0,0 +1,323 @@
+""" Lazy access to records of an SDA file.
+
+A ``Record`` exposes the metadata of a record, or of a record nested within
+a cell or structure record, without reading its data. Data is read when the
+record is converted to an array, extracted, or sliced.
+
+"""
+
+import h5py
+import numpy as np
+from scipy.sparse import issparse
+
+from .utils import (
+    CELL_EQUIVALENT, STRUCTURE_EQUIVALENT, cell_label, get_decoded, is_simple,
+)
+
+
+class Record(object):
+    """ Lazy proxy for a record in an SDA file.
+
+    Records are obtained by indexing an ``SDAFile`` with a label. Cell and
+    structure records are indexed in turn to get the records they contain.
+    The metadata are read when the record is created. The file is opened
+    again to read data.
+
+    Examples
+    --------
+    >>> rec = sda_file['waveforms']
+    >>> rec.record_type, rec.shape
+    ('cell', (4,))
+    >>> rec[2].shape
+    (1000,)
+    >>> rec[2][:10]  # reads only the first ten values
+    array([...])
+
+    """
+
+    def __init__(self, sda_file, path, entry=None):
+        """ Create a proxy for the record at an HDF5 path.
+
+        Parameters
+        ----------
+        sda_file : SDAFile
+            The file containing the record.
+        path : str
+            The HDF5 path to the record group or dataset.
+        entry : IndexEntry, optional
+            The index entry of a top-level record. If passed, the metadata
+            are taken from it rather than read from the file.
+
+        """
+        self._sda_file = sda_file
+        self._path = path
+        self._data_shape = None
+        self._data_dtype = None
+        if entry is not None:
+            self._is_group = True
+            self._attrs = entry.attrs
+            self._data_shape = entry.data_shape
+            self._data_dtype = entry.dtype
+            return
+
+        with sda_file._h5file('r') as h5file:
+            obj = h5file[path]
+            attrs = get_decoded(obj.attrs)
+            self._is_group = isinstance(obj, h5py.Group)
+            data_obj = obj
+            if self._is_group and is_simple(attrs['RecordType']):
+                data_obj = obj.get(self.name)
+                if data_obj is not None:
+                    attrs.update(get_decoded(data_obj.attrs))
+            if isinstance(data_obj, h5py.Dataset):
+                self._data_shape = data_obj.shape
+                self._data_dtype = data_obj.dtype
+        self._attrs = attrs
+
+    def __repr__(self):
+        return "<Record '{}' ({})>".format(self._path, self.record_type)
+
+    # Metadata
+
+    @property
+    def name(self):
+        """ The record label, or the field or element label if nested. """
+        return self._path.rsplit('/', 1)[-1]
+
+    @property
+    def path(self):
+        """ The path of the record within the file. """
+        return self._path
+
+    @property
+    def attrs(self):
+        """ The decoded record attributes. """
+        return dict(self._attrs)
+
+    @property
+    def record_type(self):
+        """ The 'RecordType' of the record. """
+        return self._attrs['RecordType']
+
+    @property
+    def description(self):
+        """ The record description, or '' for nested records. """
+        return self._attrs.get('Description', '')
+
+    @property
+    def empty(self):
+        """ Whether the record is marked as empty. """
+        return self._attrs.get('Empty', 'no') == 'yes'
+
+    @property
+    def complex(self):
+        """ Whether the record holds complex numeric data. """
+        return self._attrs.get('Complex', 'no') == 'yes'
+
+    @property
+    def sparse(self):
+        """ Whether the record holds sparse numeric data. """
+        return self._attrs.get('Sparse', 'no') == 'yes'
+
+    @property
+    def shape(self):
+        """ The shape of the extracted data.
+
+        This is the array shape of numeric and logical records, the length
+        of row cells or the size of other cells, and None otherwise.
+
+        """
+        return _record_shape(self._attrs, self._data_shape, self._is_group)
+
+    @property
+    def dtype(self):
+        """ The dtype of numeric and logical records, otherwise None. """
+        return _record_dtype(self._attrs, self._data_dtype)
+
+    @property
+    def ndim(self):
+        """ The number of dimensions of the extracted data, if known. """
+        shape = self.shape
+        return None if shape is None else len(shape)
+
+    def __len__(self):
+        if self.record_type in STRUCTURE_EQUIVALENT:
+            return len(self.keys())
+        shape = self.shape
+        if shape is None or len(shape) == 0:
+            raise TypeError("len() of unsized record")
+        return shape[0]
+
+    def keys(self):
+        """ The field names of structure records or the labels of cells. """
+        if self.record_type in STRUCTURE_EQUIVALENT:
+            return self._attrs.get('FieldNames', '').split()
+        if self.record_type in CELL_EQUIVALENT:
+            n = int(np.prod(self._attrs['RecordSize']))
+            return [cell_label(i) for i in range(1, n + 1)]
+        return []
+
+    # Data access
+
+    def extract(self, **kw):
+        """ Extract the data of the record.
+
+        Key-word arguments are passed to ``SDAFile.extract`` for top-level
+        records and to ``SDAFile.extract_path`` for nested records.
+
+        """
+        if '/' not in self._path:
+            return self._sda_file.extract(self._path, **kw)
+        return self._sda_file.extract_path(self._path, **kw)
+
+    def __array__(self, dtype=None):
+        data = self.extract()
+        if issparse(data):
+            data = data.toarray()
+        return np.asarray(data, dtype=dtype)
+
+    def __getitem__(self, key):
+        """ Get a nested record, or read a slice of array data.
+
+        Cell and structure records are indexed by element or field label, and
+        cells also by position. Numeric and logical arrays are sliced with
+        reads of only the selected data, where possible.
+
+        """
+        if self.record_type in STRUCTURE_EQUIVALENT or (
+                self.record_type in CELL_EQUIVALENT):
+            return self._get_child(key)
+        return self._read_slice(key)
+
+    def _get_child(self, key):
+        """ Get the record of a field or cell element. """
+        if self.empty:
+            raise KeyError("Record '{}' is empty".format(self._path))
+        if isinstance(key, str):
+            if key not in self.keys():
+                msg = "'{}' not found in '{}'".format(key, self._path)
+                raise KeyError(msg)
+            return Record(self._sda_file, "/".join((self._path, key)))
+        if self.record_type in STRUCTURE_EQUIVALENT:
+            raise TypeError("Structure records are indexed by field name")
+
+        # Positional cell index, column-major as MATLAB
+        record_size = tuple(self._attrs['RecordSize'].astype(int))
+        shape = _reduce_shape(record_size)
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) != len(shape):
+            raise IndexError("Cell records need one index per dimension")
+        index = []
+        for i, dim in zip(key, shape):
+            i = int(i)
+            if i < 0:
+                i += dim
+            if not 0 <= i < dim:
+                raise IndexError("Cell index out of range")
+            index.append(i)
+        if len(shape) == 1:
+            position = index[0]
+        else:
+            position = np.ravel_multi_index(index, shape, order='F')
+        label = cell_label(position + 1)
+        return Record(self._sda_file, "/".join((self._path, label)))
+
+    def _read_slice(self, key):
+        """ Read a slice of simple data. """
+        if self.sparse and isinstance(key, slice) and '/' not in self._path:
+            return self._sda_file.extract(self._path, rows=key)
+
+        can_slice = (
+            self.record_type in ('numeric', 'logical') and
+            not (self.empty or self.complex or self.sparse)
+        )
+        if not can_slice:
+            data = self.extract()
+            if issparse(data):
+                data = data.tocsr()
+            return data[key]
+
+        # Map the key on the extracted array to the stored array, which is
+        # the transpose of the unreduced extracted array.
+        stored_shape = self._data_shape
+        ndim = len(stored_shape)
+        shape = self.shape
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is None for k in key):
+            return np.asarray(self)[key]
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            fill = (slice(None),) * (len(shape) - len(key) + 1)
+            key = key[:i] + fill + key[i + 1:]
+        if len(key) > len(shape):
+            raise IndexError("Too many indices for record")
+        key = key + (slice(None),) * (len(shape) - len(key))
+        # Restore the reduced leading dimensions of row arrays and scalars
+        key = (0,) * (ndim - len(shape)) + key
+
+        path = self._path
+        if self._is_group:
+            path = "/".join((path, self.name))
+        with self._sda_file._h5file('r') as h5file:
+            data = h5file[path][key[::-1]]
+        if isinstance(data, np.ndarray):
+            data = data.T
+        if self.record_type == 'logical':
+            data = np.asarray(data, dtype=bool)[()]
+        return data
+
+
+def _record_shape(attrs, data_shape, is_group):
+    """ Get the shape of extracted data from record metadata.
+
+    Parameters
+    ----------
+    attrs : dict
+        The decoded record attributes, including those of the dataset of
+        simple records.
+    data_shape : tuple or None
+        The shape of the stored dataset of simple records.
+    is_group : bool
+        Whether the record is stored as a group, rather than as a dataset
+        within a composite record.
+
+    """
+    record_type = attrs['RecordType']
+    if record_type in CELL_EQUIVALENT:
+        if 'RecordSize' not in attrs:
+            return None
+        return _reduce_shape(tuple(attrs['RecordSize'].astype(int)))
+    if record_type not in ('numeric', 'logical') or data_shape is None:
+        return None
+    is_complex = attrs.get('Complex', 'no') == 'yes'
+    is_sparse = attrs.get('Sparse', 'no') == 'yes'
+    if is_complex or is_sparse:
+        if 'ArraySize' not in attrs:
+            return None
+        shape = tuple(attrs['ArraySize'].astype(int))
+        return shape if is_sparse else _reduce_shape(shape)
+    # Empty top-level numeric records extract as NaN
+    if attrs.get('Empty') == 'yes' and is_group and record_type == 'numeric':
+        return ()
+    return _reduce_shape(data_shape[::-1])
+
+
+def _record_dtype(attrs, data_dtype):
+    """ Get the dtype of extracted numeric or logical data, or None. """
+    record_type = attrs['RecordType']
+    if record_type == 'logical':
+        return np.dtype(bool)
+    if record_type != 'numeric' or data_dtype is None:
+        return None
+    if attrs.get('Complex', 'no') == 'yes':
+        return np.result_type(data_dtype, np.complex64)
+    return data_dtype
+
+
+def _reduce_shape(shape):
+    """ Reduce a 2D row or scalar shape, as ``reduce_array`` does. """
+    if len(shape) == 2 and shape[0] == 1:
+        return () if shape[1] == 1 else shape[1:]
+    return shape
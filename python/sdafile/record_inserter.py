@@ -2,14 +2,24 @@
 
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
+
+from .bulk_writer import BulkWriter
 from .utils import set_encoded
 
 
 class InserterRegistry(object):
-    """ Registry of inserters. """
+    """ Registry of inserters.
+
+    Lookups are cached by the exact type of the data, and by dtype for
+    arrays and other objects with a dtype. Inserters are therefore expected
+    to decide ``can_insert`` based on these alone.
+
+    """
 
     def __init__(self):
         self._inserters = []
+        self._cache = {}
         self._register_inserters()
 
     def _register_inserters(self):
@@ -32,17 +42,38 @@ class InserterRegistry(object):
             file_.__dict__.values(),
         )
 
+        # Only classes marked by the ``inserter`` decorator are registered,
+        # not their undecorated subclasses.
         inserters = []
         for obj in objs:
-            if getattr(obj, '__inserter__', False):
+            is_inserter = getattr(obj, '__dict__', {}).get('__inserter__')
+            if is_inserter and obj not in inserters:
                 inserters.append(obj)
         self._inserters = inserters
+        self._cache.clear()
+
+    def register(self, cls):
+        """ Register an inserter.
+
+        Registered inserters take precedence over those registered before
+        them, including the built-in inserters.
+
+        Parameters
+        ----------
+        cls : RecordInserter
+            The RecordInserter *class* to register. Its ``can_insert`` method
+            must only depend on the type of the data, and the dtype if the
+            data has one.
+
+        """
+        self._inserters.insert(0, cls)
+        self._cache.clear()
 
     def get_inserter(self, data):
         """" Get the inserter appropriate for the passed data.
 
-        This loops through available inserters and uses the first one it
-        encounters that can insert the data.
+        This uses the first available inserter that can insert the data. The
+        result is cached by the type, and dtype, of the data.
 
         Parameters
         ----------
@@ -56,12 +87,48 @@ class InserterRegistry(object):
             archive, or None if no such inserter can be found.
 
         """
+        key = _dispatch_key(data)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable dtype
+            return self._find_inserter(data)
+
+        cls = self._cache[key] = self._find_inserter(data)
+        return cls
+
+    def _find_inserter(self, data):
+        """ Find the inserter for data by querying all inserters. """
         for cls in self._inserters:
             if cls.can_insert(data):
                 return cls
         return None
 
 
+def _dispatch_key(data):
+    """ Get the registry cache key for data. """
+    dtype = getattr(data, 'dtype', None)
+    if isinstance(dtype, np.dtype):
+        return type(data), dtype
+    return type(data)
+
+
+_registry = None
+
+
+def get_registry():
+    """ Get the process-wide inserter registry.
+
+    Use this to register custom inserters for all ``SDAFile`` instances.
+
+    """
+    global _registry
+    if _registry is None:
+        _registry = InserterRegistry()
+    return _registry
+
+
 def inserter(cls):
     """ Mark a class as an inserter. """
     cls.__inserter__ = True
@@ -86,7 +153,7 @@ class RecordInserter(object):
     @property
     def registry(self):
         if self._registry is None:
-            self._registry = InserterRegistry()
+            self._registry = get_registry()
         return self._registry
 
     @staticmethod
@@ -156,8 +223,22 @@ class SimpleRecordInserter(RecordInserter):
         self.record_group_attributes(group.attrs)
         self.insert_below_group(group)
 
-    def insert_below_group(self, group):
-        """ Insert below a group, creating the necessary dataset entry. """
+    def insert_below_group(self, group, writer=None):
+        """ Insert below a group, creating the necessary dataset entry.
+
+        If a ``BulkWriter`` is passed and it can write the data, the dataset
+        and its attributes are created through it.
+
+        """
+        if writer is not None and writer.can_write(self.data):
+            dsid = writer.create_dataset(
+                group, self.label, self.data, self.deflate,
+            )
+            attrs = {}
+            self.record_dataset_attributes(attrs)
+            writer.write_attrs(dsid, attrs)
+            return
+
         maxshape = (None,) * self.data.ndim
         ds = group.create_dataset(
             self.label,
@@ -197,16 +278,38 @@ class CompositeRecordInserter(RecordInserter):
         )
         self.insert_into_group(group)
 
-    def insert_into_group(self, group):
-        """ Insert at the group level """
+    def insert_into_group(self, group, writer=None):
+        """ Insert at the group level
+
+        Sub-groups, datasets, and attributes are created through a
+        ``BulkWriter``, which is shared with all nested inserters. The group
+        attributes are recorded after the subitems are inserted, so that
+        iterating over the subitems may update the metadata.
+
+        Nested composite records are inserted with an explicit stack rather
+        than by recursion, so that the depth of nesting is not limited by the
+        Python recursion limit.
+
+        """
+        if writer is None:
+            writer = BulkWriter()
         self.prepare_data()
-        self.record_group_attributes(group.attrs)
-        for inserter in self:
-            if isinstance(inserter, CompositeRecordInserter):
+        stack = [(self, group, iter(self))]
+        while stack:
+            composite, group, inserters = stack[-1]
+            inserter = next(inserters, None)
+            if inserter is None:
+                # All subitems are inserted
+                stack.pop()
+                attrs = {}
+                composite.record_group_attributes(attrs)
+                writer.write_attrs(group.id, attrs)
+            elif isinstance(inserter, CompositeRecordInserter):
                 # Sub-composites get their own new groups
-                sub_group = group.create_group(inserter.label)
-                inserter.insert_into_group(sub_group)
+                sub_group = writer.create_group(group, inserter.label)
+                inserter.prepare_data()
+                stack.append((inserter, sub_group, iter(inserter)))
             else:
                 # Simple data inserts below the composite group
                 inserter.prepare_data()
-                inserter.insert_below_group(group)
+                inserter.insert_below_group(group, writer)
@@ -7,37 +7,107 @@ multiple languages. It supports reading and updating all record types, except
 
 """
 
+from collections import OrderedDict
 from contextlib import contextmanager
-from functools import partial
+from functools import partial, wraps
 import os
 import os.path as op
 import re
 import shutil
+import sqlite3
 import tempfile
+import threading
+import time
+import warnings
 
 import h5py
 import numpy as np
 
-from .extract import extract
-from .record_inserter import InserterRegistry
+from .extract import SPARSE_FORMATS, extract, extract_path, read_attrs
+from .index import STORAGE_PROFILE_FIELDS, build_index, storage_profile
+from .locks import RWLock
+from .prefetch import PREFETCH_BYTES, Prefetcher
+from .sidecar import read_sidecar, sidecar_path, write_sidecar
+from .stream import (
+    append_rows, count_rows, create_stream_record, get_stream_dataset,
+    read_rows,
+)
+from .cell_inserter import IteratorInserter
+from .numeric_inserter import SparseInserter
+from .record import Record
+from .record_inserter import get_registry
+from .structure_inserter import ColumnsInserter
 from .utils import (
     are_signatures_equivalent, error_if_bad_header, error_if_not_writable,
-    get_decoded, is_valid_writable, set_encoded, unnest, unnest_record,
-    update_header, validate_structures, write_header,
+    get_decoded, is_simple, is_valid_writable, set_encoded, unnest,
+    unnest_record, update_header, validate_structures, write_header,
 )
 
 
 WRITE_MODES = ('w', 'w-', 'x', 'a')
 
+# Columns of probe summaries
+PROBE_COLUMNS = (
+    'label', 'RecordType', 'Description', 'Empty', 'Deflate', 'Complex',
+    'ArraySize', 'Sparse', 'RecordSize', 'Class', 'FieldNames', 'Command',
+)
+
+
+def _reads(method):
+    """ Hold the lock of the file for reading during a method. """
+    @wraps(method)
+    def wrapper(self, *args, **kw):
+        with self._lock.read():
+            return method(self, *args, **kw)
+    return wrapper
+
+
+def _writes(method):
+    """ Hold the lock of the file for writing during a method. """
+    @wraps(method)
+    def wrapper(self, *args, **kw):
+        with self._lock.write():
+            return method(self, *args, **kw)
+    return wrapper
+
+
+def _fits(data, dtype):
+    """ Check that an array can be cast to a dtype without overflow.
+
+    Integers must keep their values. Floating point values may lose
+    precision, but finite values must stay finite.
+
+    """
+    if np.can_cast(data.dtype, dtype, 'safe') or data.size == 0:
+        return True
+    with np.errstate(over='ignore', invalid='ignore'):
+        cast = data.astype(dtype)
+    if np.issubdtype(dtype, np.integer) or dtype == np.bool_:
+        return bool(np.array_equal(cast, data))
+    return bool(np.array_equal(np.isfinite(cast), np.isfinite(data)))
+
 
 class SDAFile(object):
     """ Read, write, inspect, and manipulate Sandia Data Archive files.
 
     This supports version 1.1 of the Sandia Data Archive format.
 
+    An ``SDAFile`` may be shared between threads. Reads run concurrently,
+    sharing one open handle of the file, while writes are exclusive. HDF5
+    calls are serialized by h5py, but the decoding of extracted data in one
+    thread overlaps the reading of data in others.
+
     """
 
-    def __init__(self, name, mode='a', **kw):
+    # Maximum time in seconds between flushes of rows appended with SWMR
+    flush_interval = 1.0
+
+    _swmr = False
+    _stream_file = None
+    _follow_file = None
+    _batch_file = None
+
+    def __init__(self, name, mode='a', sidecar=False, swmr=False, **kw):
         """ Open an SDA file for reading, writing, or interrogation.
 
         Parameters
@@ -50,16 +120,28 @@ class SDAFile(object):
             w         Create file, truncate if exists
             w- or x   Create file, fail if exists
             a         Read/write if exists, create otherwise (default)
+        sidecar : bool, optional
+            If True, the metadata index is also stored in an SQLite file
+            named after the archive with an '.sdaidx' extension. The index is
+            loaded from this file while the size, modification time, and
+            'Updated' header of the archive match those recorded in it. This
+            avoids visiting the archive to build the index.
+        swmr : bool, optional
+            If True, use HDF5 single-writer/multiple-reader access. In mode
+            'r', the file can be read while another process appends rows to
+            its records, and **refresh** and **follow** return the new rows.
+            In other modes, new files are created in the HDF5 1.10 format
+            that SWMR requires, and **append** streams rows to the file
+            until it is closed. See **append**.
         kw :
             Key-word arguments that are passed to the underlying HDF5 file. See
             h5py.File for options.
 
         """
         file_exists = op.isfile(name)
-        self._mode = mode
-        self._filename = name
-        self._kw = kw
-        self._registry = InserterRegistry()
+        if swmr and mode != 'r':
+            kw.setdefault('libver', ('v110', 'latest'))
+        self._init_state(name, mode, sidecar, swmr, kw)
 
         # Check existence
         if mode in ('r', 'r+') and not file_exists:
@@ -111,6 +193,7 @@ class SDAFile(object):
         return self._get_attr('Writable')
 
     @Writable.setter
+    @_writes
     def Writable(self, value):
         if self._mode not in WRITE_MODES:
             raise ValueError("File is not writable.")
@@ -130,6 +213,214 @@ class SDAFile(object):
         return self._get_attr('Updated')
 
     # Public
+
+    def __getitem__(self, label):
+        """ Get a lazy :class:`~sdafile.record.Record` for a label.
+
+        The record exposes metadata without reading data. Data is read when
+        the record is extracted, converted to an array, or sliced. Cell and
+        structure records are indexed to get the records they contain.
+
+        Raises
+        ------
+        ValueError if the label contains invalid characters
+        ValueError if the label does not exist
+
+        """
+        self._validate_labels(label, must_exist=True)
+        index = self._get_cached_index()
+        if index is not None:
+            return Record(self, label, index[label])
+        return Record(self, label)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @_writes
+    def append(self, label, rows):
+        """ Append rows to a numeric or logical record.
+
+        Rows are slices along the first axis of the extracted data. Rows of
+        1D records are scalars, and rows of 2D records are 1D arrays.
+
+        If the file was opened with ``swmr=True``, the first append starts
+        streaming. The file is then held open for SWMR writing until it is
+        closed, and its 'Updated' header records the start of streaming.
+        Appended rows are flushed to readers by **flush**, and by appends
+        made ``flush_interval`` seconds or more after the last flush.
+        Records cannot be created or changed while streaming, so records
+        must exist before streaming starts. Use **create_stream** to create
+        records with no rows.
+
+        Parameters
+        ----------
+        label : str
+            The record label.
+        rows : array_like
+            The rows to append. A single row may be passed without the
+            leading axis.
+
+        Returns
+        -------
+        n : int
+            The number of rows of the record.
+
+        Raises
+        ------
+        ValueError if the label contains invalid characters
+        ValueError if the label does not exist
+        ValueError if the record is not a non-empty, real, non-sparse
+        numeric or logical record
+        ValueError if the rows do not match the rows of the record
+        IOError if the file cannot be opened for SWMR writing
+
+        """
+        self._validate_can_write()
+        self._validate_labels(label, must_exist=True)
+        if self._swmr:
+            h5file = self._start_stream()
+            n = append_rows(get_stream_dataset(h5file, label), rows)
+            if time.time() - self._last_flush >= self.flush_interval:
+                self.flush()
+            return n
+
+        with self._h5file('r+') as h5file:
+            n = append_rows(get_stream_dataset(h5file, label), rows)
+            self._update_header(h5file)
+        return n
+
+    def h5file(self, mode='r'):
+        """ Access the underlying h5py File.
+
+        This gives direct access to data that is not read or written through
+        records, such as the bytes of split files. Within the context, the
+        lock of the file is held for reading with mode 'r', and for writing
+        with mode 'a'. Writes through the h5py File do not update the
+        'Updated' header.
+
+        Parameters
+        ----------
+        mode : str, optional
+            'r' (default) to read the file, or 'a' to write it.
+
+        Raises
+        ------
+        ValueError if the mode is not 'r' or 'a'
+        IOError if the mode is 'a' and the file is not writable
+
+        Examples
+        --------
+        >>> with sda_file.h5file() as h5file:
+        ...     ds = h5file['split file/Bytes']
+
+        """
+        if mode not in ('r', 'a'):
+            raise ValueError("Mode must be 'r' or 'a', not '{}'".format(mode))
+        if mode != 'r':
+            self._validate_can_write()
+        return self._h5file(mode)
+
+    @contextmanager
+    def batch(self):
+        """ Group writes into one commit.
+
+        Within the context, the file is held open for writing, and writes
+        update the 'Updated' header once, when the context exits. This
+        avoids opening the file and updating the header for every write.
+        Records cannot be removed in a batch. Other threads cannot use the
+        file until the batch is done.
+
+        Examples
+        --------
+        >>> with sda_file.batch():
+        ...     for i, data in enumerate(shots):
+        ...         sda_file.insert('shot{}'.format(i), data)
+
+        """
+        self._validate_can_write()
+        with self._lock.write():
+            if self._batch_file is not None:
+                raise IOError("A batch is already open")
+            if self._stream_file is not None:
+                raise IOError("Cannot batch writes while streaming")
+            self._batch_file = h5py.File(self._filename, 'a', **self._kw)
+            self._batch_updated = False
+            try:
+                yield self
+            finally:
+                h5file = self._batch_file
+                self._batch_file = None
+                try:
+                    if self._batch_updated:
+                        update_header(h5file.attrs)
+                finally:
+                    h5file.close()
+                    self._index = None
+
+    def close(self):
+        """ Close the file handles held open for SWMR access.
+
+        This stops streaming. Files that are not opened with ``swmr=True``
+        need not be closed.
+
+        """
+        if self._follow_file is not None:
+            self._follow_file.close()
+            self._follow_file = None
+        if self._stream_file is not None:
+            self._stream_file.close()
+            self._stream_file = None
+
+    @_writes
+    def create_stream(self, label, row_shape=(), dtype=np.float64,
+                      description='', deflate=0, chunk_rows=None):
+        """ Create a numeric or logical record with no rows.
+
+        Rows are added with **append**. Unlike empty records created by
+        **insert**, these records are not marked as empty, so that they can
+        be appended to while streaming.
+
+        Parameters
+        ----------
+        label : str
+            The record label.
+        row_shape : tuple, optional
+            The shape of each row. The default, (), creates a 1D record.
+        dtype : numpy.dtype, optional
+            The dtype of the data. Boolean dtypes create logical records.
+        description : str, optional
+            A description to accompany the data
+        deflate : int, optional
+            An integer value from 0 to 9, specifying the compression level to
+            be applied to the stored data.
+        chunk_rows : int, optional
+            The number of rows stored in each HDF5 chunk. By default, chunks
+            hold about 64 KiB.
+
+        Raises
+        ------
+        ValueError if the label contains invalid characters
+        ValueError if the label exists
+        ValueError if the dtype is not real numeric or boolean
+        IOError if the file is streaming
+
+        """
+        self._validate_can_write()
+        self._validate_labels(label, can_exist=False)
+        if not isinstance(deflate, (int, np.integer)) or not 0 <= deflate <= 9:
+            msg = "'deflate' must be an integer from 0 to 9"
+            raise ValueError(msg)
+        with self._h5file('a') as h5file:
+            create_stream_record(
+                h5file, label, row_shape, dtype, description, deflate,
+                chunk_rows,
+            )
+            self._update_header(h5file)
+
+    @_writes
     def describe(self, label, description=''):
         """ Change the description of a data entry.
 
@@ -150,15 +441,37 @@ class SDAFile(object):
         self._validate_labels(label, must_exist=True)
         with self._h5file('r+') as h5file:
             set_encoded(h5file[label].attrs, Description=description)
-            update_header(h5file.attrs)
+            self._update_header(h5file)
 
-    def extract(self, label):
+    @_reads
+    def extract(self, label, sparse_format='coo', rows=None, columnar=False,
+                stack=False):
         """ Extract data from an SDA file.
 
         Parameters
         ----------
         label : str
             The data label.
+        sparse_format : str, optional
+            The format of extracted sparse numeric data; 'coo' (default),
+            'csr', or 'csc'.
+        rows : slice, optional
+            A range of rows to extract from a sparse numeric record. The
+            result has ``stop - start`` rows. For records inserted with
+            ``row_index=True``, only the stored rows in that range are read.
+        columnar : bool or str, optional
+            If True, a 'structures' or 'objects' record is extracted as a
+            dict that maps each field name to an array of that field over all
+            record elements. Numeric and logical fields are stacked along a
+            new leading axis. Character and file fields are collected in
+            object arrays. If 'frame', the columns are returned as a pandas
+            DataFrame. This requires homogeneous, non-sparse, simple fields.
+        stack : bool, optional
+            If True, a 'cell' record whose elements are numeric or logical
+            arrays of the same shape and type is extracted as one array. The
+            leading dimensions index the cell elements. This is a single
+            dimension for row cells, such as stored lists. Cells with empty
+            elements cannot be stacked.
 
         Returns
         -------
@@ -168,19 +481,90 @@ class SDAFile(object):
         Notes
         -----
         Sparse numeric data is extracted as
-        :class:`coo_matrix<scipy:scipy.sparse.coo_matrix>`. This format does
-        not support all numpy operations.
+        :class:`coo_matrix<scipy:scipy.sparse.coo_matrix>` unless another
+        ``sparse_format`` is requested. The COO format does not support all
+        numpy operations.
 
         Raises
         ------
         ValueError if the label contains invalid characters
         ValueError if the label does not exist
+        ValueError if the sparse format is not supported
+        ValueError if `rows` is specified for a non-sparse record
+        ValueError if `columnar` is not True, False, or 'frame'
+        ValueError if `columnar` is specified and the record cannot be
+        extracted as columns
+        ValueError if `stack` is True and the record cannot be stacked
+        ValueError if more than one of `columnar`, `stack`, and `rows` is
+        specified
 
         """
         self._validate_labels(label, must_exist=True)
+        if sparse_format not in SPARSE_FORMATS:
+            msg = "Unsupported sparse format '{}'".format(sparse_format)
+            raise ValueError(msg)
+        if not (isinstance(columnar, bool) or
+                isinstance(columnar, str) and columnar == 'frame'):
+            msg = "Unsupported columnar option '{}'".format(columnar)
+            raise ValueError(msg)
+        options = [
+            name for name, value in (
+                ('columnar', columnar), ('stack', stack),
+                ('rows', rows is not None),
+            ) if value
+        ]
+        if len(options) > 1:
+            msg = "Options {} cannot be combined".format(", ".join(options))
+            raise ValueError(msg)
         with self._h5file('r') as h5file:
-            return extract(h5file, label)
+            data = extract(
+                h5file, label, sparse_format, rows, bool(columnar), stack,
+            )
+
+        if columnar == 'frame':
+            from pandas import DataFrame
+            data = DataFrame({
+                field: list(column) if column.ndim > 1 else column
+                for field, column in data.items()
+            })
+        return data
 
+    @_reads
+    def extract_path(self, path, sparse_format='coo'):
+        """ Extract a record nested within cell and structure records.
+
+        Parameters
+        ----------
+        path : str
+            The record label followed by the '/'-separated labels of the
+            nested fields and cell elements, e.g. 'shot12/diagnostics/element
+            3/A1'. A bare label extracts the whole record.
+        sparse_format : str, optional
+            The format of extracted sparse numeric data; 'coo' (default),
+            'csr', or 'csc'.
+
+        Returns
+        -------
+        data : object
+            Archive data at the path.
+
+        Raises
+        ------
+        ValueError if the label contains invalid characters
+        ValueError if the label does not exist
+        ValueError if the path does not exist
+        ValueError if the sparse format is not supported
+
+        """
+        if sparse_format not in SPARSE_FORMATS:
+            msg = "Unsupported sparse format '{}'".format(sparse_format)
+            raise ValueError(msg)
+        path = self._validate_path(path)
+        with self._h5file('r') as h5file:
+            self._resolve_path(h5file, path)
+            return extract_path(h5file, path, sparse_format)
+
+    @_reads
     def extract_to_file(self, label, path, overwrite=False):
         """ Extract a file record to file.
 
@@ -212,8 +596,79 @@ class SDAFile(object):
         with open(path, 'wb') as f:
             f.write(self.extract(label))
 
+    def flush(self):
+        """ Flush the rows appended while streaming to readers. """
+        if self._stream_file is not None:
+            self._stream_file.flush()
+            self._last_flush = time.time()
+
+    def follow(self, labels=None, interval=0.1, timeout=None):
+        """ Yield the rows appended to records as they arrive.
+
+        Parameters
+        ----------
+        labels : str or sequence of str, optional
+            The records to follow, as for **refresh**.
+        interval : float, optional
+            The time in seconds between checks for new rows.
+        timeout : float, optional
+            The time in seconds without new rows after which to stop. If
+            None (default), follow until the generator is closed.
+
+        Yields
+        ------
+        rows : OrderedDict
+            The new rows by label, as returned by **refresh**.
+
+        """
+        last = time.time()
+        while True:
+            rows = self.refresh(labels)
+            if rows:
+                last = time.time()
+                yield rows
+            elif timeout is not None and time.time() - last >= timeout:
+                return
+            else:
+                time.sleep(interval)
+
+    @_reads
+    def index(self):
+        """ Get an index of the metadata of all records in the archive.
+
+        The index is built by visiting the file once, and is cached. It is
+        rebuilt when the modification time or size of the file changes, or
+        after this ``SDAFile`` writes to the file. The cached index serves
+        **labels**, **probe**, lazy records, and the validation of labels.
+
+        If the file was opened with ``sidecar=True``, the index is loaded
+        from the sidecar file when it is valid, and written to it when it is
+        rebuilt.
+
+        Returns
+        -------
+        index : OrderedDict
+            :class:`~sdafile.index.IndexEntry` instances by label, with the
+            record type, description, emptiness, shape, dtype, deflate level,
+            complex and sparse flags, number of children, storage size, and
+            attributes of each record.
+
+        """
+        # The lock keeps writers from invalidating the index while it is
+        # built, which would then cache a stale index
+        key = self._index_key()
+        if self._index is None or self._index[0] != key:
+            with self._h5file('r') as h5file:
+                if self._sidecar:
+                    index = self._read_sidecar(h5file, key)
+                else:
+                    index = build_index(h5file)
+            self._index = (key, index)
+        return self._index[1]
+
+    @_writes
     def insert(self, label, data, description='', deflate=0,
-               as_structures=False):
+               as_structures=False, row_index=False, as_cell=False):
         """ Insert data into an SDA file.
 
         Parameters
@@ -230,7 +685,20 @@ class SDAFile(object):
         as_record : bool, optional
             If specified, data that is storable as a cell record and has
             homogenous cells will be stored as a "structures" record. Note that
-            this does not extend to nested cell records.
+            this does not extend to nested cell records. A dict of
+            equal-length columns or a pandas DataFrame is stored column-wise
+            as a "structures" record, where element *i* holds entry *i* of
+            each column.
+        row_index : bool, optional
+            If specified, sparse data is stored in row order along with an
+            index of row offsets. This allows row ranges to be extracted
+            without reading the entire record. The index is ignored by
+            readers that do not support it.
+        as_cell : bool, optional
+            If specified, the data is stored as a 'cell' record of the items
+            it yields when iterated. Iterators and generators are consumed
+            lazily, with each item written as it is produced. If an item
+            cannot be stored, the partial record is removed.
 
         Raises
         ------
@@ -239,6 +707,9 @@ class SDAFile(object):
         ValueError if the label exists
         ValueError if `as_structures` is True and the data cannot be stored as
         a structures record.
+        ValueError if `row_index` is True and the data is not sparse.
+        ValueError if `as_cell` is True and the data is not iterable.
+        ValueError if `as_cell` and `as_structures` are both True.
 
         Notes
         -----
@@ -261,7 +732,8 @@ class SDAFile(object):
 
         sparse arrays (:class:`coo_matrix<scipy:scipy.sparse.coo_matrix>`) :
             These are stored as 'numeric' records if the dtype is a type
-            supported for numeric numpy arrays.
+            supported for numeric numpy arrays. CSR and CSC matrices are
+            written without an intermediate COO copy.
 
         strings :
             Strings are stored as 'character' records. An attempt will be
@@ -277,6 +749,10 @@ class SDAFile(object):
             The contents of a file-like objects (with a 'read' method) are
             stored as 'file' records.
 
+        iterables :
+            With `as_cell`, the items of any iterable, such as a generator,
+            are stored as a 'cell' record.
+
         other :
             Arrays of characters are not supported. Convert to a string.
             Object arrays are not supported. Cast to another dtype or turn into
@@ -294,14 +770,25 @@ class SDAFile(object):
         if not isinstance(deflate, (int, np.integer)) or not 0 <= deflate <= 9:
             msg = "'deflate' must be an integer from 0 to 9"
             raise ValueError(msg)
-        cls = self._registry.get_inserter(data)
+        if as_cell:
+            if as_structures:
+                msg = "'as_cell' and 'as_structures' cannot both be True."
+                raise ValueError(msg)
+            if not IteratorInserter.can_insert(data):
+                raise ValueError("Data is not iterable")
+            cls = IteratorInserter
+        elif as_structures and ColumnsInserter.can_insert(data):
+            cls = ColumnsInserter
+        else:
+            cls = self._registry.get_inserter(data)
         if cls is None:
             msg = "{!r} is not a supported type".format(data)
             raise ValueError(msg)
 
         inserter = cls(label, data, deflate, self._registry)
 
-        if as_structures:
+        # Columns are homogeneous by construction and validated on insertion
+        if as_structures and cls is not ColumnsInserter:
             if inserter.record_type != 'cell':
                 msg = "Data cannot be stored as a 'structures' record."
                 raise ValueError(msg)
@@ -311,6 +798,12 @@ class SDAFile(object):
             # Tell the inserter to use the 'structures' record type
             inserter.record_type = 'structures'
 
+        if row_index:
+            if not isinstance(inserter, SparseInserter):
+                msg = "Only sparse data can be stored with a row index."
+                raise ValueError(msg)
+            inserter.row_index = True
+
         with self._h5file('r+') as h5file:
             try:
                 inserter.insert(h5file, description)
@@ -320,8 +813,9 @@ class SDAFile(object):
                     del h5file[label]
                 raise
             else:
-                update_header(h5file.attrs)
+                self._update_header(h5file)
 
+    @_writes
     def insert_from_file(self, path, description='', deflate=0):
         """ Insert the contents of a file as a file record.
 
@@ -354,6 +848,59 @@ class SDAFile(object):
             self.insert(label, f, description, deflate)
         return label
 
+    def iter_records(self, labels=None, prefetch=2, max_bytes=PREFETCH_BYTES,
+                     **kw):
+        """ Iterate over the data of records, reading ahead in a thread.
+
+        While the data of one record is processed, the next records are
+        read and decompressed in a background thread.
+
+        Parameters
+        ----------
+        labels : sequence of str, optional
+            The labels of the records. Defaults to all labels.
+        prefetch : int, optional
+            The maximum number of records read ahead. Default 2. If 0, the
+            records are read when they are needed, without a thread.
+        max_bytes : int, optional
+            The maximum number of bytes of data read ahead. The next record
+            is always read ahead, regardless of its size. Default 256 MiB.
+        kw :
+            Key-word arguments that are passed to **extract**.
+
+        Yields
+        ------
+        label : str
+            The record label.
+        data :
+            The extracted data.
+
+        Raises
+        ------
+        ValueError if a label contains invalid characters
+        ValueError if a label does not exist
+
+        Examples
+        --------
+        >>> for label, data in sda_file.iter_records(prefetch=4):
+        ...     results[label] = analyze(data)
+
+        """
+        if labels is None:
+            labels = self.labels()
+        else:
+            labels = list(labels)
+            if labels:
+                self._validate_labels(labels, must_exist=True)
+        extract = partial(self.extract, **kw)
+        if int(prefetch) < 1:
+            for label in labels:
+                yield label, extract(label)
+            return
+        with Prefetcher(extract, labels, prefetch, max_bytes) as records:
+            for label, data in records:
+                yield label, data
+
     def labels(self):
         """ Get data labels from the archive.
 
@@ -363,9 +910,9 @@ class SDAFile(object):
             Labels from the archive.
 
         """
-        with self._h5file('r') as h5file:
-            return list(h5file.keys())
+        return list(self.index())
 
+    @_writes
     def remove(self, *labels):
         """ Remove specified records from the archive.
 
@@ -373,6 +920,8 @@ class SDAFile(object):
 
         """
         self._validate_can_write()
+        if self._batch_file is not None:
+            raise IOError("Records cannot be removed in a batch")
         self._validate_labels(labels, must_exist=True)
 
         # Create a new file so space is actually freed
@@ -420,8 +969,10 @@ class SDAFile(object):
                 )
             update_header(destination.attrs)
         shutil.move(destination_path, self._filename)
+        self._index = None
 
-    def probe(self, pattern=None):
+    @_reads
+    def probe(self, pattern=None, storage=False):
         """ Summarize the state of the archive
 
         This requires the pandas package.
@@ -431,6 +982,12 @@ class SDAFile(object):
         pattern : str or None, optional
             A search pattern (python regular expression) applied to find
             archive labels of interest. If None, all labels are selected.
+        storage : bool, optional
+            If True, add the storage profile of each record. This adds the
+            columns 'StorageSize' (bytes on disk), 'LogicalSize'
+            (uncompressed bytes), 'CompressionRatio', 'Layout', 'Chunks',
+            'Leaves' (number of datasets), and 'Offset' (file address of the
+            record). See **storage_summary** for the archive as a whole.
 
         Returns
         -------
@@ -439,7 +996,8 @@ class SDAFile(object):
 
         """
         from pandas import DataFrame
-        labels = self.labels()
+        index = self.index()
+        labels = list(index)
         if pattern is not None:
             regex = re.compile(pattern)
             labels = [
@@ -447,22 +1005,125 @@ class SDAFile(object):
             ]
 
         summary = []
-        with self._h5file('r') as h5file:
-            for label in labels:
-                g = h5file[label]
-                attrs = get_decoded(g.attrs)
-                if label in g:
-                    attrs.update(get_decoded(g[label].attrs))
-                attrs['label'] = label
-                summary.append(attrs)
-
-        cols = [
-            'label', 'RecordType', 'Description', 'Empty', 'Deflate',
-            'Complex', 'ArraySize', 'Sparse', 'RecordSize', 'Class',
-            'FieldNames', 'Command',
-        ]
+        for label in labels:
+            attrs = dict(index[label].attrs)
+            attrs['label'] = label
+            summary.append(attrs)
+
+        cols = list(PROBE_COLUMNS)
+        if storage:
+            with self._h5file('r') as h5file:
+                for attrs in summary:
+                    attrs.update(storage_profile(h5file, attrs['label']))
+            cols.extend(STORAGE_PROFILE_FIELDS)
         return DataFrame(summary, columns=cols).set_index('label').fillna('')
 
+    @_reads
+    def refresh(self, labels=None):
+        """ Get the rows appended to records since the last refresh.
+
+        The first refresh of a record returns all of its rows. If the file
+        was opened in mode 'r' with ``swmr=True``, it is held open until it
+        is closed, and the rows appended by a SWMR writer are seen as they
+        are flushed.
+
+        Parameters
+        ----------
+        labels : str or sequence of str, optional
+            The labels of the records to refresh. By default, all non-empty,
+            real, non-sparse numeric and logical records are refreshed.
+
+        Returns
+        -------
+        rows : OrderedDict
+            The new rows by label, for the records that have new rows. Rows
+            are along the first axis, as for **append**.
+
+        Raises
+        ------
+        ValueError if the label contains invalid characters
+        ValueError if the label does not exist
+        ValueError if a record cannot have rows appended
+
+        """
+        if isinstance(labels, str):
+            labels = [labels]
+        if labels is None:
+            labels = [
+                label for label, entry in self.index().items()
+                if entry.record_type in ('numeric', 'logical') and not (
+                    entry.empty or entry.complex or entry.sparse)
+            ]
+        else:
+            self._validate_labels(labels, must_exist=True)
+
+        rows = OrderedDict()
+        # Concurrent refreshes must not return the same rows
+        with self._cursor_lock, self._follow_h5file() as h5file:
+            for label in labels:
+                ds = get_stream_dataset(h5file, label)
+                if self._follow_file is not None:
+                    ds.refresh()
+                start = self._cursors.get(label, 0)
+                n = count_rows(ds)
+                if n > start:
+                    record_type = read_attrs(ds, 'RecordType')['RecordType']
+                    rows[label] = read_rows(ds, start, record_type)
+                    self._cursors[label] = n
+        return rows
+
+    @_reads
+    def storage_summary(self):
+        """ Summarize the storage of the archive.
+
+        This does not require pandas.
+
+        Returns
+        -------
+        summary : dict
+            The storage summary with entries
+
+            FileSize
+                The size of the file in bytes.
+            StorageSize
+                The number of bytes stored on disk for all record datasets.
+            LogicalSize
+                The number of bytes of the uncompressed data of all record
+                datasets.
+            CompressionRatio
+                LogicalSize / StorageSize, or NaN if nothing is stored.
+            FreeSpace
+                The free space tracked by the HDF5 library. This is usually
+                zero for files that are not open for writing.
+            Unaccounted
+                The remaining bytes. These hold HDF5 metadata, such as object
+                headers, attributes, and group indices, and space lost when
+                records were deleted or replaced.
+            Records
+                The number of records.
+
+        """
+        labels = self.labels()
+        summary = dict(StorageSize=0, LogicalSize=0, Records=len(labels))
+        with self._h5file('r') as h5file:
+            for label in labels:
+                profile = storage_profile(h5file, label)
+                summary['StorageSize'] += profile['StorageSize']
+                summary['LogicalSize'] += profile['LogicalSize']
+            summary['FreeSpace'] = h5file.id.get_freespace()
+        summary['FileSize'] = op.getsize(self._filename)
+        summary['Unaccounted'] = (
+            summary['FileSize'] - summary['StorageSize'] -
+            summary['FreeSpace']
+        )
+        if summary['StorageSize'] > 0:
+            ratio = summary['LogicalSize'] / float(summary['StorageSize'])
+        else:
+            ratio = np.nan
+        summary['CompressionRatio'] = ratio
+        return summary
+
+    @_writes
     def replace(self, label, data):
         """ Replace an existing dataset.
 
@@ -486,6 +1147,7 @@ class SDAFile(object):
             del h5file[label]
         self.insert(label, data, attrs['Description'], attrs['Deflate'])
 
+    @_writes
     def update_object(self, label, data):
         """ Update an existing object record.
 
@@ -542,8 +1204,9 @@ class SDAFile(object):
                 RecordType='object',
                 Class=attrs['Class'],
             )
-            update_header(h5file.attrs)
+            self._update_header(h5file)
 
+    @_writes
     def update_objects(self, label, data):
         """ Update an existing objects record.
 
@@ -602,17 +1265,207 @@ class SDAFile(object):
                 RecordType='objects',
                 Class=attrs['Class'],
             )
-            update_header(h5file.attrs)
+            self._update_header(h5file)
+
+    @_writes
+    def write_path(self, path, data):
+        """ Overwrite the data of a simple record in place.
+
+        Parameters
+        ----------
+        path : str
+            The record label followed by the '/'-separated labels of the
+            nested fields and cell elements, as for **extract_path**.
+        data :
+            Numeric, logical, or character data. Sparse data is not
+            supported.
+
+        Notes
+        -----
+        Only the dataset at ``path`` is written. The data must have the same
+        record type as the stored record, the same complex and empty flags,
+        and the same shape. Its type must cast safely, or within the
+        same kind, to the stored type. Use **replace** to change the type or
+        shape of a record.
+
+        Raises
+        ------
+        ValueError if the label contains invalid characters
+        ValueError if the label or path does not exist
+        ValueError if the path does not refer to simple data
+        ValueError if the data is not compatible with the stored data
+
+        """
+        self._validate_can_write()
+        path = self._validate_path(path)
+
+        cls = self._registry.get_inserter(data)
+        if cls is None:
+            msg = "{!r} is not a supported type".format(data)
+            raise ValueError(msg)
+        if not is_simple(cls.record_type) or issubclass(cls, SparseInserter):
+            msg = "Only non-sparse numeric, logical, and character data can "
+            msg += "be written in place"
+            raise ValueError(msg)
+        inserter = cls(path, data, 0, self._registry)
+        inserter.prepare_data()
+        new = inserter.data
+
+        with self._h5file('r+') as h5file:
+            obj = self._resolve_path(h5file, path)
+            if isinstance(obj, h5py.Group):
+                obj = obj.get(path.rsplit('/', 1)[-1])
+            if not isinstance(obj, h5py.Dataset):
+                msg = "'{}' is not a simple record".format(path)
+                raise ValueError(msg)
+            attrs = get_decoded(obj.attrs)
+            # Complex data is stored flattened, so its shape is the ArraySize
+            array_size = attrs.get('ArraySize')
+            if array_size is not None:
+                array_size = tuple(int(dim) for dim in np.ravel(array_size))
+            new_size = getattr(inserter, 'array_size', None)
+            if new_size is not None:
+                new_size = tuple(int(dim) for dim in new_size)
+            is_compatible = (
+                attrs['RecordType'] == inserter.record_type and
+                attrs['Empty'] == inserter.empty and
+                attrs.get('Complex', 'no') == getattr(
+                    inserter, 'complex', 'no'
+                ) and
+                attrs.get('Sparse', 'no') == 'no' and
+                obj.shape == new.shape and
+                array_size == new_size and
+                np.can_cast(new.dtype, obj.dtype, 'same_kind')
+            )
+            if not is_compatible:
+                msg = "Data is not compatible with record '{}'".format(path)
+                raise ValueError(msg)
+            if not _fits(new, obj.dtype):
+                msg = "Data does not fit in the type of record '{}'"
+                raise ValueError(msg.format(path))
+            if new.size > 0:
+                obj[...] = new
+            self._update_header(h5file)
 
     # Private
 
+    def _init_state(self, name, mode, sidecar, swmr, kw):
+        """ Set the state of the object, without accessing the file. """
+        self._mode = mode
+        self._filename = name
+        self._kw = kw
+        self._registry = get_registry()
+        self._index = None
+        self._sidecar = sidecar
+        self._swmr = swmr
+        self._cursors = {}
+        self._cursor_lock = threading.Lock()
+        self._last_flush = None
+        self._lock = RWLock()
+        self._handle_lock = threading.Lock()
+        self._handle = None
+        self._handle_users = 0
+
     @contextmanager
     def _h5file(self, mode):
-        h5file = h5py.File(self._filename, mode, **self._kw)
-        try:
-            yield h5file
-        finally:
-            h5file.close()
+        """ Open the file, holding its lock.
+
+        Concurrent readers, and the nested opens of the writer, share one
+        handle, which is closed when it is no longer used.
+
+        """
+        lock = self._lock.read if mode == 'r' else self._lock.write
+        with lock():
+            if self._stream_file is not None:
+                # SWMR writers cannot create objects
+                if mode != 'r':
+                    msg = "Records cannot be created or changed while "
+                    msg += "streaming"
+                    raise IOError(msg)
+                yield self._stream_file
+                return
+            if self._batch_file is not None:
+                try:
+                    yield self._batch_file
+                finally:
+                    if mode != 'r':
+                        self._index = None
+                return
+
+            h5file = self._acquire_handle(mode)
+            try:
+                yield h5file
+            finally:
+                self._release_handle(h5file)
+                # Any write invalidates the index
+                if mode != 'r':
+                    self._index = None
+
+    def _acquire_handle(self, mode):
+        """ Get the shared handle of the file, opening it if needed. """
+        with self._handle_lock:
+            h5file = self._handle
+            if h5file is None:
+                kw = self._kw
+                if self._swmr and mode == 'r':
+                    kw = dict(kw, swmr=True)
+                h5file = h5py.File(self._filename, mode, **kw)
+                self._handle = h5file
+            elif mode != 'r' and h5file.mode == 'r':
+                msg = "File '{}' is open for reading".format(self._filename)
+                raise IOError(msg)
+            self._handle_users += 1
+            return h5file
+
+    def _release_handle(self, h5file):
+        """ Release the shared handle, closing it if it is not used. """
+        with self._handle_lock:
+            self._handle_users -= 1
+            if self._handle_users == 0:
+                self._handle = None
+                h5file.close()
+
+    @contextmanager
+    def _follow_h5file(self):
+        """ Open the file to read new rows.
+
+        SWMR readers hold the file open, so that datasets can be refreshed.
+
+        """
+        if not (self._swmr and self._mode == 'r'):
+            with self._h5file('r') as h5file:
+                yield h5file
+            return
+        if self._follow_file is None:
+            self._follow_file = h5py.File(
+                self._filename, 'r', swmr=True, **self._kw
+            )
+        yield self._follow_file
+
+    def _start_stream(self):
+        """ Open the file for SWMR writing, if it is not open. """
+        if self._stream_file is None:
+            h5file = h5py.File(self._filename, 'r+', **self._kw)
+            try:
+                # Attributes are not changed while streaming, so the header
+                # records the start of streaming
+                update_header(h5file.attrs)
+                h5file.swmr_mode = True
+            except (RuntimeError, ValueError) as e:
+                h5file.close()
+                msg = "File '{}' cannot be opened for SWMR writing: {}"
+                raise IOError(msg.format(self._filename, e))
+            self._stream_file = h5file
+            self._index = None
+            self._last_flush = time.time()
+        return self._stream_file
+
+    def _update_header(self, h5file):
+        """ Update the header after a write, or mark a batch as updated. """
+        if self._batch_file is not None:
+            self._batch_updated = True
+        else:
+            update_header(h5file.attrs)
 
     def _get_attr(self, attr, root=None):
         """ Get a named atribute as a string """
@@ -630,6 +1483,69 @@ class SDAFile(object):
         if self.Writable == 'no':
             raise IOError("'Writable' flag is 'no'")
 
+    def _get_cached_index(self):
+        """ Get the cached index if it is valid, without building it.
+
+        Writes invalidate the index, so it is not rebuilt for validation.
+        Otherwise, a sequence of inserts would rebuild it for every insert.
+
+        """
+        if self._index is not None and self._index[0] == self._index_key():
+            return self._index[1]
+        return None
+
+    def _read_sidecar(self, h5file, key):
+        """ Read the index from the sidecar, or build it and write it. """
+        mtime, size, _ = key
+        updated = get_decoded(h5file.attrs, 'Updated').get('Updated')
+        sidecar_key = (size, mtime, updated)
+        path = sidecar_path(self._filename)
+        index = read_sidecar(path, sidecar_key)
+        if index is None:
+            index = build_index(h5file)
+            try:
+                write_sidecar(path, sidecar_key, index)
+            except (IOError, OSError, sqlite3.Error) as e:
+                # The index is still usable without its sidecar
+                msg = "Could not write index sidecar '{}': {}".format(path, e)
+                warnings.warn(msg)
+        return index
+
+    def _index_key(self):
+        """ Get the file state that a cached index is valid for.
+
+        The modification time is in nanoseconds, so that rewrites of the
+        same size are seen unless the clock of the file system is coarser.
+        The inode changes when the file is replaced, as by **remove**.
+
+        """
+        stat = os.stat(self._filename)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _resolve_path(self, h5file, path):
+        """ Get the object at a record path.
+
+        Every object along the path must be a cell or structure record.
+
+        """
+        parts = path.split('/')
+        obj = h5file[parts[0]]
+        for i, part in enumerate(parts[1:], 1):
+            record_type = get_decoded(obj.attrs, 'RecordType')['RecordType']
+            if is_simple(record_type) or part not in obj:
+                msg = "Path '{}' does not exist"
+                raise ValueError(msg.format('/'.join(parts[:i + 1])))
+            obj = obj[part]
+        return obj
+
+    def _validate_path(self, path):
+        """ Validate the label of a record path and normalize the path. """
+        if '\\' in path:
+            raise ValueError(r"path cannot contain '\'")
+        path = path.strip('/')
+        self._validate_labels(path.split('/', 1)[0], must_exist=True)
+        return path
+
     def _validate_labels(self, labels, can_exist=True, must_exist=False):
         if isinstance(labels, str):
             labels = [labels]
@@ -639,9 +1555,18 @@ class SDAFile(object):
             if '/' in label or '\\' in label:
                 msg = r"label cannot contain '/' or '\'"
                 raise ValueError(msg)
-        with self._h5file('r') as h5file:
+        if not can_exist or must_exist:
+            existing = self._get_cached_index()
+            if existing is None and self._sidecar and not (
+                    self._lock.is_writer()):
+                # Reads load the index from the sidecar. Writes invalidate
+                # the sidecar, so it is not rebuilt for their validation.
+                existing = self.index()
+            if existing is None:
+                with self._h5file('r') as h5file:
+                    existing = [label for label in labels if label in h5file]
             for label in labels:
-                label_exists = label in h5file
+                label_exists = label in existing
                 if not can_exist and label_exists:
                     msg = "Label '{}' already exists.".format(label)
                     raise ValueError(msg)
@@ -0,0 +1,280 @@
+""" Archives sharded across many SDA files for parallel writing.
+
+HDF5 allows one writer per file. A sharded archive spreads its records over
+several ordinary SDA files, the shards, so that producer processes can write
+in parallel, each to its own shard. A small JSON manifest lists the shards
+and the rules that map labels to shards:
+
+    {
+        "format": "SDA shards",
+        "version": 1,
+        "shards": ["ingest_shard0.sda", "ingest_shard1.sda"],
+        "rules": [["ch0[0-7]_.*", 0], ["ch(0[89]|1[0-5])_.*", 1]]
+    }
+
+A label is written to the shard of the first rule whose regular expression
+matches it, or else to a shard chosen by a stable hash of the label. Shard
+names are relative to the manifest.
+
+The shards are merged into one standard SDA file by ``consolidate``, which
+copies the HDF5 objects of each record without decoding them.
+
+"""
+
+import json
+import os
+import os.path as op
+import re
+import zlib
+
+import h5py
+
+from .file_set import SDAFileSet
+from .sda_file import SDAFile
+from .utils import (
+    error_if_bad_header, make_temporary_file, update_header,
+)
+
+
+MANIFEST_FORMAT = 'SDA shards'
+
+MANIFEST_VERSION = 1
+
+# File name template of shards
+SHARD_TEMPLATE = '{}_shard{}.sda'
+
+
+class ShardedArchive(object):
+    """ An archive of records sharded across SDA files.
+
+    Examples
+    --------
+    In the coordinating process
+
+    >>> archive = ShardedArchive.create('ingest.json', 4)
+
+    In each producer process
+
+    >>> archive = ShardedArchive('ingest.json')
+    >>> archive.shard(producer_id).insert(label, data)
+
+    or, if the labels of producers map to their own shards
+
+    >>> archive.insert(label, data)
+
+    When all producers are done
+
+    >>> archive.consolidate('ingest.sda')
+
+    """
+
+    def __init__(self, manifest):
+        """ Open a sharded archive from its manifest.
+
+        Parameters
+        ----------
+        manifest : str
+            The path of the manifest.
+
+        Raises
+        ------
+        IOError if the manifest does not exist
+        ValueError if the manifest is invalid
+
+        """
+        if not op.isfile(manifest):
+            raise IOError("File '{}' does not exist".format(manifest))
+        with open(manifest) as f:
+            try:
+                content = json.load(f)
+            except ValueError:
+                content = None
+        if not isinstance(content, dict) or (
+                content.get('format') != MANIFEST_FORMAT):
+            msg = "'{}' is not a shard manifest".format(manifest)
+            raise ValueError(msg)
+        if content.get('version') != MANIFEST_VERSION:
+            msg = "Unsupported shard manifest version '{}'".format(
+                content.get('version')
+            )
+            raise ValueError(msg)
+
+        directory = op.dirname(op.abspath(manifest))
+        self._manifest = manifest
+        self._shards = [
+            op.join(directory, name) for name in content['shards']
+        ]
+        self._rules = [
+            (re.compile(pattern), int(shard))
+            for pattern, shard in content.get('rules', [])
+        ]
+        _validate_rules(self._rules, len(self._shards))
+
+    @classmethod
+    def create(cls, manifest, n_shards, rules=None, overwrite=False):
+        """ Create a sharded archive with empty shards.
+
+        Parameters
+        ----------
+        manifest : str
+            The path of the manifest. The shards are created next to it,
+            named '<name>_shard<i>.sda' after the manifest name.
+        n_shards : int
+            The number of shards.
+        rules : sequence of (str, int), optional
+            Pairs of a regular expression and a shard number. A label is
+            written to the shard of the first expression that matches the
+            start of the label, or else to a shard chosen by hash.
+        overwrite : bool, optional
+            Whether to overwrite an existing manifest and shards. Default
+            False.
+
+        Returns
+        -------
+        archive : ShardedArchive
+            The created archive.
+
+        Raises
+        ------
+        ValueError if ``n_shards`` is less than 1 or a rule is invalid
+        IOError if `overwrite` is False and the manifest or a shard exists
+
+        """
+        n_shards = int(n_shards)
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+        rules = [(pattern, int(shard)) for pattern, shard in rules or []]
+        _validate_rules(
+            [(re.compile(pattern), shard) for pattern, shard in rules],
+            n_shards,
+        )
+
+        directory = op.dirname(op.abspath(manifest))
+        stem = op.splitext(op.basename(manifest))[0]
+        names = [SHARD_TEMPLATE.format(stem, i) for i in range(n_shards)]
+        if not overwrite:
+            for path in [manifest] + [op.join(directory, n) for n in names]:
+                if op.exists(path):
+                    msg = "File '{}' exists. Will not overwrite.".format(path)
+                    raise IOError(msg)
+
+        for name in names:
+            SDAFile(op.join(directory, name), 'w')
+        content = {
+            'format': MANIFEST_FORMAT,
+            'version': MANIFEST_VERSION,
+            'shards': names,
+            'rules': [list(rule) for rule in rules],
+        }
+        with open(manifest, 'w') as f:
+            json.dump(content, f, indent=4)
+        return cls(manifest)
+
+    @property
+    def manifest(self):
+        """ The path of the manifest. """
+        return self._manifest
+
+    @property
+    def shards(self):
+        """ The paths of the shards. """
+        return list(self._shards)
+
+    def shard_of(self, label):
+        """ Get the number of the shard that a label is written to. """
+        for regex, shard in self._rules:
+            if regex.match(label) is not None:
+                return shard
+        # crc32 is stable across processes, unlike hash
+        return zlib.crc32(label.encode('utf-8')) % len(self._shards)
+
+    def shard(self, shard, mode='a'):
+        """ Get the ``SDAFile`` of a shard.
+
+        A shard must be written by one process at a time.
+
+        """
+        return SDAFile(self._shards[shard], mode)
+
+    def insert(self, label, data, *args, **kw):
+        """ Insert data into the shard of a label.
+
+        Arguments are passed to ``SDAFile.insert``.
+
+        """
+        self.shard(self.shard_of(label)).insert(label, data, *args, **kw)
+
+    def file_set(self, **kw):
+        """ Get an ``SDAFileSet`` that reads the records of all shards.
+
+        Key-word arguments are passed to ``SDAFileSet``. Labels that exist
+        in several shards raise a ValueError by default.
+
+        """
+        kw.setdefault('precedence', 'error')
+        return SDAFileSet(self._shards, **kw)
+
+    def consolidate(self, target, overwrite=False):
+        """ Merge the shards into one SDA file.
+
+        The HDF5 objects of each record are copied natively, without
+        extracting the data.
+
+        Parameters
+        ----------
+        target : str
+            The path of the SDA file to create.
+        overwrite : bool, optional
+            Whether to overwrite an existing target. Default False.
+
+        Raises
+        ------
+        IOError if `overwrite` is False and the target exists
+        ValueError if a label exists in several shards
+
+        """
+        consolidate(self._manifest, target, overwrite)
+
+
+def consolidate(manifest, target, overwrite=False):
+    """ Merge the shards of a sharded archive into one SDA file.
+
+    See ``ShardedArchive.consolidate``.
+
+    """
+    shards = ShardedArchive(manifest).shards
+    if op.exists(target) and not overwrite:
+        raise IOError("File '{}' exists. Will not overwrite.".format(target))
+
+    # Write to a temporary file so that a failed merge leaves no target
+    fd, temp_path = make_temporary_file(
+        op.dirname(op.abspath(target)), suffix='.sda',
+    )
+    os.close(fd)
+    try:
+        SDAFile(temp_path, 'w')
+        sources = {}
+        with h5py.File(temp_path, 'a') as dest:
+            for shard in shards:
+                with h5py.File(shard, 'r') as source:
+                    error_if_bad_header(source)
+                    for label in source:
+                        if label in sources:
+                            msg = "Label '{}' exists in '{}' and '{}'"
+                            raise ValueError(
+                                msg.format(label, sources[label], shard)
+                            )
+                        sources[label] = shard
+                        source.copy(source[label], dest, name=label)
+            update_header(dest.attrs)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _validate_rules(rules, n_shards):
+    for regex, shard in rules:
+        if not 0 <= shard < n_shards:
+            msg = "Rule '{}' maps to shard {}, which does not exist"
+            raise ValueError(msg.format(regex.pattern, shard))
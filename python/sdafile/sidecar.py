@@ -0,0 +1,193 @@
+""" Persistent index of an SDA file in an SQLite sidecar file.
+
+The sidecar stores the metadata index of an archive next to it, as
+'<archive>.sdaidx', so that the index can be loaded without visiting the
+archive. It records the size, modification time, and 'Updated' header of the
+archive it was built from, and is only used while these match.
+
+"""
+
+from collections import OrderedDict
+from contextlib import closing
+import json
+import os
+import os.path as op
+import sqlite3
+
+import numpy as np
+
+from .index import IndexEntry
+from .utils import dumps_shape, loads_shape, make_temporary_file
+
+
+# Version of the sidecar schema
+SIDECAR_VERSION = '2'
+
+SIDECAR_EXTENSION = '.sdaidx'
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE records (
+    label TEXT PRIMARY KEY,
+    record_type TEXT,
+    description TEXT NOT NULL,
+    empty INTEGER NOT NULL,
+    shape TEXT,
+    dtype TEXT,
+    deflate INTEGER NOT NULL,
+    complex INTEGER NOT NULL,
+    sparse INTEGER NOT NULL,
+    children INTEGER NOT NULL,
+    storage_size INTEGER NOT NULL,
+    attrs TEXT NOT NULL,
+    data_shape TEXT
+);
+"""
+
+
+def sidecar_path(path):
+    """ Get the path of the sidecar of an archive. """
+    return path + SIDECAR_EXTENSION
+
+
+def read_sidecar(path, key):
+    """ Read the index of an archive from its sidecar.
+
+    Parameters
+    ----------
+    path : str
+        The path of the sidecar file.
+    key : tuple
+        The (size, mtime, updated) state of the archive, with the
+        modification time in integer nanoseconds.
+
+    Returns
+    -------
+    index : OrderedDict or None
+        :class:`~sdafile.index.IndexEntry` instances by label, or None if
+        the sidecar does not exist, cannot be read, or does not match
+        ``key``.
+
+    """
+    if not op.isfile(path):
+        return None
+    try:
+        with closing(sqlite3.connect(path)) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get('version') != SIDECAR_VERSION:
+                return None
+            if _decode_key(meta) != key:
+                return None
+            rows = conn.execute("SELECT * FROM records ORDER BY rowid")
+            return OrderedDict(
+                (row[0], _decode_entry(row)) for row in rows
+            )
+    except (sqlite3.Error, ValueError, KeyError):
+        return None
+
+
+def write_sidecar(path, key, index):
+    """ Write the index of an archive to its sidecar.
+
+    The sidecar is written to a temporary file in the same directory, which
+    then replaces any existing sidecar. Readers never see a partial sidecar.
+
+    Parameters
+    ----------
+    path : str
+        The path of the sidecar file.
+    key : tuple
+        The (size, mtime, updated) state of the archive, with the
+        modification time in integer nanoseconds.
+    index : OrderedDict
+        :class:`~sdafile.index.IndexEntry` instances by label.
+
+    """
+    directory, name = op.split(op.abspath(path))
+    fd, temp_path = make_temporary_file(directory, prefix=name)
+    os.close(fd)
+    try:
+        with closing(sqlite3.connect(temp_path)) as conn:
+            conn.executescript(_SCHEMA)
+            meta = _encode_key(key)
+            meta['version'] = SIDECAR_VERSION
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)", sorted(meta.items()),
+            )
+            conn.executemany(
+                "INSERT INTO records VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_encode_entry(entry) for entry in index.values()),
+            )
+            conn.commit()
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _encode_key(key):
+    size, mtime, updated = key
+    return {'size': str(size), 'mtime': str(mtime), 'updated': updated}
+
+
+def _decode_key(meta):
+    return (int(meta['size']), int(meta['mtime']), meta['updated'])
+
+
+def _encode_entry(entry):
+    return (
+        entry.label,
+        entry.record_type,
+        entry.description,
+        int(entry.empty),
+        dumps_shape(entry.shape),
+        None if entry.dtype is None else entry.dtype.str,
+        entry.deflate,
+        int(entry.complex),
+        int(entry.sparse),
+        entry.children,
+        int(entry.storage_size),
+        json.dumps(dict(
+            (attr, _encode_value(value))
+            for attr, value in entry.attrs.items()
+        )),
+        dumps_shape(entry.data_shape),
+    )
+
+
+def _decode_entry(row):
+    (label, record_type, description, empty, shape, dtype, deflate,
+     is_complex, sparse, children, storage_size, attrs, data_shape) = row
+    attrs = dict(
+        (attr, _decode_value(value))
+        for attr, value in json.loads(attrs).items()
+    )
+    return IndexEntry(
+        label=label,
+        record_type=record_type,
+        description=description,
+        empty=bool(empty),
+        shape=loads_shape(shape),
+        dtype=None if dtype is None else np.dtype(dtype),
+        deflate=deflate,
+        complex=bool(is_complex),
+        sparse=bool(sparse),
+        children=children,
+        storage_size=storage_size,
+        attrs=attrs,
+        data_shape=loads_shape(data_shape),
+    )
+
+
+def _encode_value(value):
+    """ Encode an attribute value for JSON, keeping its numpy type. """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return {'value': value.tolist(), 'dtype': value.dtype.str}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return np.array(value['value'], dtype=value['dtype'])[()]
+    return value
@@ -0,0 +1,295 @@
+""" Split large files into SDA archives of limited size, and merge them.
+
+A file is split into parts named '<name>_file1.sda', '<name>_file2.sda', ...,
+as the MATLAB ``splitFile`` function does. Each part holds one 'split'
+record, labeled 'split file', with the fields
+
+OriginalName
+    The file name of the split file.
+SplitFiles
+    The file names of all parts, in order.
+Bytes
+    The bytes of the file held by the part.
+Checksum
+    The SHA-256 digest of ``Bytes``, as hexadecimal text.
+
+Parts are restored with ``merge_splits`` or with the MATLAB ``mergeSplits``
+function. Parts without a 'Checksum' field, such as those written by
+MATLAB, are merged without verification.
+
+Data are streamed in chunks, so the memory used does not depend on the size
+of the file. Checksums are computed in a worker thread, in parallel with the
+reading and writing of data.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import os.path as op
+import tempfile
+
+import numpy as np
+
+from .extract import extract_path, read_attrs
+from .sda_file import SDAFile
+from .utils import make_temporary_file, set_encoded, update_header
+
+
+# Label of the record of split parts
+SPLIT_LABEL = 'split file'
+
+# File name template of split parts
+SPLIT_TEMPLATE = '{}_file{}.sda'
+
+# Number of bytes reserved in each part in addition to the measured size of
+# the SDA header and record metadata
+PART_MARGIN = 2 ** 12
+
+# Number of bytes read and written at a time
+CHUNK_SIZE = 2 ** 24
+
+
+def split(path, max_bytes, directory=None, overwrite=False,
+          chunk_size=CHUNK_SIZE):
+    """ Split a file into SDA archives of limited size.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file to split. Any file can be split.
+    max_bytes : int
+        The maximum size of each part, in bytes. This must leave room for
+        the metadata of the parts, which is tens of kilobytes.
+    directory : str, optional
+        The directory of the parts. Defaults to the directory of ``path``.
+    overwrite : bool, optional
+        Whether to overwrite existing parts. Default False.
+    chunk_size : int, optional
+        The number of bytes read and written at a time.
+
+    Returns
+    -------
+    parts : list
+        The paths of the parts, in order.
+
+    Raises
+    ------
+    ValueError if ``max_bytes`` is too small for the metadata of the parts.
+    IOError if `overwrite` is False and a part exists.
+
+    """
+    if directory is None:
+        directory = op.dirname(op.abspath(path))
+
+    original_name = op.basename(path)
+    size = op.getsize(path)
+    stem = op.splitext(original_name)[0]
+
+    # The metadata of the parts grows with the number of parts. Increase the
+    # number of parts until their data and metadata fit in max_bytes.
+    n = 1
+    while True:
+        names = [SPLIT_TEMPLATE.format(stem, i) for i in range(1, n + 1)]
+        overhead = _measure_overhead(directory, original_name, names)
+        part_size = int(max_bytes) - overhead - PART_MARGIN
+        if part_size <= 0:
+            msg = "max_bytes is too small for the metadata of {} parts"
+            msg = msg.format(n)
+            raise ValueError(msg)
+        needed = max(1, -(-size // part_size))
+        if needed <= n:
+            break
+        n = needed
+
+    parts = [op.join(directory, name) for name in names]
+    if not overwrite:
+        for part in parts:
+            if op.exists(part):
+                msg = "File '{}' exists. Will not overwrite.".format(part)
+                raise IOError(msg)
+
+    buf = bytearray(min(chunk_size, part_size))
+    with open(path, 'rb') as source, ThreadPoolExecutor(1) as executor:
+        for i, part in enumerate(parts):
+            nbytes = min(part_size, size - i * part_size)
+            _write_part(
+                part, source, nbytes, buf, original_name, names, i, executor,
+            )
+    return parts
+
+
+def merge_splits(any_part, target=None, overwrite=False,
+                 chunk_size=CHUNK_SIZE):
+    """ Restore a split file from its parts.
+
+    All parts must be in the directory of ``any_part``.
+
+    Parameters
+    ----------
+    any_part : str
+        The path of any part of the split file.
+    target : str, optional
+        The path of the restored file. Defaults to the original file name in
+        the directory of the parts.
+    overwrite : bool, optional
+        Whether to overwrite an existing target. Default False.
+    chunk_size : int, optional
+        The number of bytes read and written at a time.
+
+    Returns
+    -------
+    target : str
+        The path of the restored file.
+
+    Raises
+    ------
+    ValueError if a part is not a split file of the same set, or if the data
+    of a part does not match its checksum.
+    IOError if a part is missing, or if `overwrite` is False and the target
+    exists.
+
+    """
+    directory = op.dirname(op.abspath(any_part))
+    original_name, names = _read_part_info(any_part)
+    parts = [op.join(directory, op.basename(name)) for name in names]
+    missing = [part for part in parts if not op.isfile(part)]
+    if missing:
+        msg = "Split files are missing: {}".format(", ".join(missing))
+        raise IOError(msg)
+
+    if target is None:
+        target = op.join(directory, original_name)
+    if op.exists(target) and not overwrite:
+        raise IOError("File '{}' exists. Will not overwrite.".format(target))
+
+    # Write to a temporary file so that a failed merge leaves no target
+    fd, temp_path = make_temporary_file(
+        op.dirname(op.abspath(target)), prefix=op.basename(target),
+    )
+    try:
+        with os.fdopen(fd, 'wb') as dest, ThreadPoolExecutor(1) as executor:
+            for part in parts:
+                if _read_part_info(part) != (original_name, names):
+                    msg = "'{}' is not part of the same split file".format(
+                        part
+                    )
+                    raise ValueError(msg)
+                _read_part(part, dest, chunk_size, executor)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return target
+
+
+def _measure_overhead(directory, original_name, names):
+    """ Measure the size of a part without data. """
+    fd, temp_path = tempfile.mkstemp(suffix='.sda', dir=directory)
+    os.close(fd)
+    try:
+        # The description of the last part is the longest
+        _write_part(
+            temp_path, None, 0, bytearray(), original_name, names,
+            len(names) - 1, None,
+        )
+        return op.getsize(temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+def _write_part(part, source, nbytes, buf, original_name, names, i,
+                executor):
+    """ Write ``nbytes`` bytes of the ``source`` file to part ``i``. """
+    description = "Part {} of {} of '{}'".format(
+        i + 1, len(names), original_name,
+    )
+    sda_file = SDAFile(part, 'w')
+    sda_file.insert(SPLIT_LABEL, {
+        'OriginalName': original_name,
+        'SplitFiles': list(names),
+        'Checksum': '0' * 64,
+    }, description)
+
+    digest = hashlib.sha256()
+    view = memoryview(buf)
+    with sda_file.h5file('a') as h5file:
+        grp = h5file[SPLIT_LABEL]
+        ds = grp.create_dataset('Bytes', shape=(nbytes, 1), dtype=np.uint8)
+        start = 0
+        while start < nbytes:
+            count = source.readinto(view[:min(len(buf), nbytes - start)])
+            if count == 0:
+                raise IOError("File changed size while it was split")
+            hashed = executor.submit(digest.update, view[:count])
+            data = np.frombuffer(buf, dtype=np.uint8, count=count)
+            ds[start:start + count] = data.reshape(-1, 1)
+            hashed.result()
+            start += count
+        set_encoded(
+            ds.attrs,
+            RecordType='numeric',
+            Empty='yes' if nbytes == 0 else 'no',
+            Complex='no',
+            Sparse='no',
+        )
+
+        checksum = np.frombuffer(
+            digest.hexdigest().encode('ascii'), dtype=np.uint8,
+        )
+        grp['Checksum'][:] = checksum.reshape(-1, 1)
+        set_encoded(
+            grp.attrs,
+            RecordType='split',
+            FieldNames=' '.join(sorted(grp)),
+        )
+        update_header(h5file.attrs)
+
+
+def _read_part_info(part):
+    """ Read the (original name, split file names) of a part. """
+    sda_file = SDAFile(part, 'r')
+    with sda_file.h5file('r') as h5file:
+        grp = h5file.get(SPLIT_LABEL)
+        if grp is None or read_attrs(grp, 'RecordType').get(
+                'RecordType') != 'split':
+            raise ValueError("'{}' is not a split file".format(part))
+        original_name = extract_path(h5file, SPLIT_LABEL + '/OriginalName')
+        names = extract_path(h5file, SPLIT_LABEL + '/SplitFiles')
+    return original_name, list(names)
+
+
+def _read_part(part, dest, chunk_size, executor):
+    """ Copy the bytes of a part to the ``dest`` file, and verify them. """
+    sda_file = SDAFile(part, 'r')
+    digest = hashlib.sha256()
+    with sda_file.h5file('r') as h5file:
+        grp = h5file[SPLIT_LABEL]
+        checksum = None
+        if 'Checksum' in grp:
+            checksum = extract_path(h5file, SPLIT_LABEL + '/Checksum')
+        ds = grp['Bytes']
+        if read_attrs(ds, 'Empty')['Empty'] == 'yes':
+            nbytes = 0
+        else:
+            nbytes = ds.size
+        # MATLAB may store the bytes as a row or as a column
+        is_row = ds.shape[0] == 1 and nbytes > 1
+        buf = np.empty(min(chunk_size, max(nbytes, 1)), dtype=np.uint8)
+        start = 0
+        while start < nbytes:
+            count = min(len(buf), nbytes - start)
+            if is_row:
+                selection = np.s_[:, start:start + count]
+                data = buf[:count].reshape(1, -1)
+            else:
+                selection = np.s_[start:start + count, :]
+                data = buf[:count].reshape(-1, 1)
+            ds.read_direct(data, source_sel=selection)
+            hashed = executor.submit(digest.update, buf[:count])
+            dest.write(buf[:count])
+            hashed.result()
+            start += count
+
+    if checksum is not None and digest.hexdigest() != checksum:
+        raise ValueError("Checksum mismatch in '{}'".format(part))
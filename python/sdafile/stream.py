@@ -0,0 +1,219 @@
+""" Appending rows to numeric records, and reading new rows.
+
+Rows are slices along the first axis of extracted data. As MATLAB stores the
+transpose of arrays, rows are appended along the last stored axis, except for
+1D records, which are stored as a column.
+
+These support the streaming of records through HDF5 single-writer/
+multiple-reader (SWMR) access. A SWMR writer cannot create objects, so
+stream records are created before streaming starts, with no rows. They are
+not marked as empty, so their attributes do not change while rows are
+appended. Only the row axis of the dataset of a stream record is unlimited,
+which records the row axis when a record has a single row.
+
+"""
+
+import numpy as np
+
+from .extract import read_attrs
+from .utils import set_encoded
+
+
+# Target number of bytes of the chunks of stream records
+STREAM_CHUNK_BYTES = 2 ** 16
+
+
+def create_stream_record(h5file, label, row_shape=(), dtype=np.float64,
+                         description='', deflate=0, chunk_rows=None):
+    """ Create a numeric or logical record with no rows.
+
+    Parameters
+    ----------
+    h5file : h5py.File
+        The h5py File to create the record in.
+    label : str
+        The record label.
+    row_shape : tuple, optional
+        The shape of each row. The default, (), creates a 1D record.
+    dtype : numpy.dtype, optional
+        The dtype of the data. Boolean dtypes create logical records.
+    description : str, optional
+        The record description.
+    deflate : int, optional
+        The compression level of the record.
+    chunk_rows : int, optional
+        The number of rows of each chunk. By default, chunks hold about
+        ``STREAM_CHUNK_BYTES`` bytes.
+
+    """
+    dtype = np.dtype(dtype)
+    row_shape = tuple(int(dim) for dim in row_shape)
+    if dtype == np.bool_:
+        record_type = 'logical'
+        stored_dtype = np.dtype(np.uint8)
+    elif np.issubdtype(dtype, np.number) and not (
+            np.issubdtype(dtype, np.complexfloating)):
+        record_type = 'numeric'
+        stored_dtype = dtype
+    else:
+        msg = "Stream records must be real numeric or logical"
+        raise ValueError(msg)
+
+    if chunk_rows is None:
+        row_bytes = stored_dtype.itemsize * int(np.prod(row_shape))
+        chunk_rows = max(1, STREAM_CHUNK_BYTES // max(1, row_bytes))
+    if row_shape:
+        shape = row_shape[::-1] + (0,)
+        maxshape = row_shape[::-1] + (None,)
+        chunks = tuple(max(1, dim) for dim in row_shape[::-1])
+        chunks += (int(chunk_rows),)
+    else:
+        shape = (0, 1)
+        maxshape = (None, 1)
+        chunks = (int(chunk_rows), 1)
+
+    group = h5file.create_group(label)
+    set_encoded(
+        group.attrs,
+        Description=description,
+        RecordType=record_type,
+        Empty='no',
+        Deflate=int(deflate),
+    )
+    ds = group.create_dataset(
+        label,
+        shape=shape,
+        dtype=stored_dtype,
+        maxshape=maxshape,
+        chunks=chunks,
+        compression=deflate or None,
+    )
+    attrs = dict(RecordType=record_type, Empty='no')
+    if record_type == 'numeric':
+        attrs.update(Complex='no', Sparse='no')
+    set_encoded(ds.attrs, **attrs)
+
+
+def get_stream_dataset(h5file, label):
+    """ Get the dataset of a record that rows can be appended to.
+
+    Raises
+    ------
+    ValueError if the record is not a non-empty, real, non-sparse numeric or
+    logical record
+
+    """
+    group = h5file[label]
+    attrs = read_attrs(group, 'RecordType', 'Empty')
+    if attrs['RecordType'] not in ('numeric', 'logical'):
+        msg = "Record '{}' is not a numeric or logical record".format(label)
+        raise ValueError(msg)
+    if attrs['Empty'] == 'yes':
+        msg = "Record '{}' is empty. Create it with create_stream."
+        raise ValueError(msg.format(label))
+    ds = group[label]
+    ds_attrs = read_attrs(ds, 'Complex', 'Sparse')
+    if 'yes' in (ds_attrs.get('Complex'), ds_attrs.get('Sparse')):
+        msg = "Record '{}' is complex or sparse".format(label)
+        raise ValueError(msg)
+    return ds
+
+
+def append_rows(ds, rows):
+    """ Append rows to the dataset of a record.
+
+    Parameters
+    ----------
+    ds : h5py.Dataset
+        The dataset of the record.
+    rows : array_like
+        The rows to append. A single row may be passed without the leading
+        axis.
+
+    Returns
+    -------
+    n : int
+        The number of rows of the record.
+
+    """
+    axis = _row_axis(ds)
+    row_shape = _row_shape(ds)
+    rows = np.asarray(rows)
+    if rows.shape == row_shape:
+        rows = rows[np.newaxis]
+    if rows.shape[1:] != row_shape:
+        msg = "Rows of shape {} do not match rows of shape {}".format(
+            rows.shape[1:], row_shape,
+        )
+        raise ValueError(msg)
+    if ds.dtype == np.uint8 and rows.dtype == np.bool_:
+        rows = rows.astype(np.uint8)
+    elif not np.can_cast(rows.dtype, ds.dtype, 'same_kind'):
+        msg = "Cannot append rows of type {} to data of type {}".format(
+            rows.dtype, ds.dtype,
+        )
+        raise ValueError(msg)
+
+    start = ds.shape[axis]
+    count = len(rows)
+    if count == 0:
+        return start
+    shape = list(ds.shape)
+    shape[axis] = start + count
+    ds.resize(tuple(shape))
+    selection = [slice(None)] * ds.ndim
+    selection[axis] = slice(start, start + count)
+    if axis == 0:
+        stored = rows.reshape(-1, 1)
+    else:
+        stored = rows.T
+    ds[tuple(selection)] = stored
+    return start + count
+
+
+def read_rows(ds, start=0, record_type='numeric'):
+    """ Read the rows of the dataset of a record from ``start`` on.
+
+    Returns
+    -------
+    rows : ndarray
+        The rows, with the leading axis indexing rows.
+
+    """
+    axis = _row_axis(ds)
+    stop = ds.shape[axis]
+    selection = [slice(None)] * ds.ndim
+    selection[axis] = slice(start, max(start, stop))
+    data = ds[tuple(selection)]
+    if axis == 0:
+        data = data[:, 0]
+    else:
+        data = data.T
+    if record_type == 'logical':
+        data = data.astype(bool)
+    return data
+
+
+def count_rows(ds):
+    """ Get the number of rows of the dataset of a record. """
+    return ds.shape[_row_axis(ds)]
+
+
+def _row_axis(ds):
+    """ Get the stored axis of rows. """
+    maxshape = ds.maxshape or ds.shape
+    unlimited = [i for i, dim in enumerate(maxshape) if dim is None]
+    if len(unlimited) == 1:
+        # Stream records
+        return unlimited[0]
+    # Other records are assumed to be 1D if they are stored as a column
+    if ds.ndim == 2 and ds.shape[1] == 1:
+        return 0
+    return ds.ndim - 1
+
+
+def _row_shape(ds):
+    """ Get the shape of the rows of extracted data. """
+    if _row_axis(ds) == 0:
+        return ()
+    return tuple(ds.shape[:-1][::-1])
@@ -1,5 +1,13 @@
+import sys
+
+import numpy as np
+from scipy.sparse import issparse
+
+from .cell_inserter import CellRecordInserter
 from .record_inserter import CompositeRecordInserter, inserter
-from .utils import is_valid_matlab_field_label, set_encoded
+from .utils import (
+    cell_label, is_valid_matlab_field_label, set_encoded, unnest,
+)
 
 
 @inserter
@@ -46,3 +54,107 @@ class DictInserter(CompositeRecordInserter):
                 key, sub_data, self.deflate, registry=self.registry
             )
             yield inserter
+
+
+class FieldsInserter(DictInserter):
+    """ Inserter for dicts with known, validated keys.
+
+    This is used for the elements of a ``ColumnsInserter``, which validates
+    the keys once for all elements.
+
+    """
+
+    def __init__(self, label, data, deflate, registry, keys):
+        DictInserter.__init__(self, label, data, deflate, registry)
+        self._keys = keys
+        self.field_names = " ".join(keys)
+
+    def prepare_data(self):
+        """ Records Empty metadata. """
+        self.empty = 'yes' if len(self._keys) == 0 else 'no'
+
+
+class ColumnsInserter(CellRecordInserter):
+    """ Inserter for columns of structure fields.
+
+    The data is a dict of equal-length columns or a pandas DataFrame. Element
+    *i* of the record is the structure built from entry *i* of each column.
+
+    """
+
+    record_type = 'structures'
+
+    @staticmethod
+    def can_insert(data):
+        """ This can insert dicts and DataFrames. """
+        # DOK sparse matrices are dicts
+        if isinstance(data, dict) and not issparse(data):
+            return True
+        return is_data_frame(data)
+
+    def prepare_data(self):
+        """ Records RecordSize metadata, validates keys and columns. """
+        columns = get_columns(self.data)
+        keys = sorted(columns.keys())
+        for key in keys:
+            if not is_valid_matlab_field_label(key):
+                msg = "'{}' is not a valid MATLAB field label".format(key)
+                raise ValueError(msg)
+
+        for key in keys:
+            column = columns[key]
+            if isinstance(column, (str, bytes)) or not hasattr(
+                    column, '__len__'):
+                raise ValueError("Columns must be sequences or arrays")
+        lengths = set(len(columns[key]) for key in keys)
+        if len(lengths) != 1:
+            raise ValueError("Columns must have equal, non-zero length")
+        length = lengths.pop()
+        if length == 0:
+            raise ValueError("Columns must have equal, non-zero length")
+
+        for key in keys:
+            self._validate_column(key, columns[key])
+
+        self._keys = keys
+        self._columns = [columns[key] for key in keys]
+        self.empty = 'no'
+        self.record_size = (1, length)
+
+    def _validate_column(self, key, column):
+        """ Validate that a column can be stored as a structure field. """
+        if self.registry.get_inserter(column[0]) is None:
+            msg = "Column '{}' contains unsupported data".format(key)
+            raise ValueError(msg)
+
+        # Entries of non-object arrays are homogeneous by construction
+        if isinstance(column, np.ndarray) and not column.dtype.hasobject:
+            return
+
+        signatures = set(unnest(item, self.registry) for item in column)
+        if len(signatures) > 1:
+            msg = "Column '{}' is not homogenous".format(key)
+            raise ValueError(msg)
+
+    def __iter__(self):
+        keys = self._keys
+        for i in range(self.record_size[1]):
+            sub_data = dict(zip(keys, [column[i] for column in self._columns]))
+            yield FieldsInserter(
+                cell_label(i + 1), sub_data, self.deflate, self.registry, keys,
+            )
+
+
+def get_columns(data):
+    """ Get a dict of columns from a dict or DataFrame. """
+    if is_data_frame(data):
+        return {
+            str(name): data[name].to_numpy() for name in data.columns
+        }
+    return dict(data)
+
+
+def is_data_frame(data):
+    """ Check if data is a pandas DataFrame without importing pandas. """
+    pandas = sys.modules.get('pandas')
+    return pandas is not None and isinstance(data, pandas.DataFrame)
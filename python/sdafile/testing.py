@@ -1,6 +1,7 @@
 from contextlib import contextmanager
 import os
 import os.path as op
+import shutil
 import tempfile
 import unittest
 
@@ -201,6 +202,15 @@ def temporary_file(suffix='.sda'):
             os.remove(file_path)
 
 
+@contextmanager
+def temporary_directory():
+    directory = tempfile.mkdtemp()
+    try:
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
 @contextmanager
 def temporary_h5file(suffix='.sda'):
     with temporary_file(suffix) as file_path:
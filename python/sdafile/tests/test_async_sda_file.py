@@ -0,0 +1,90 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from sdafile.async_sda_file import AsyncSDAFile
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_file
+
+
+class TestAsyncSDAFile(unittest.TestCase):
+
+    def test_read_write(self):
+
+        async def main(file_path):
+            async with await AsyncSDAFile.open(file_path, 'w') as sda_file:
+                # Writes are applied in the order they are started, and reads
+                # see the writes started before them
+                inserts = [
+                    sda_file.insert('data{}'.format(i), np.full(10, i))
+                    for i in range(5)
+                ]
+                results = await asyncio.gather(
+                    *inserts,
+                    sda_file.replace('data0', np.arange(3.0)),
+                    sda_file.labels()
+                )
+                self.assertEqual(len(results[-1]), 5)
+
+                data = await sda_file.extract_many(['data1', 'data0'])
+                self.assertEqual(list(data), ['data1', 'data0'])
+                assert_array_equal(data['data0'], np.arange(3.0))
+
+                records = []
+                async for label, data in sda_file.iter_records(prefetch=2):
+                    records.append((label, data.sum()))
+                self.assertEqual(records, [
+                    ('data0', 3.0), ('data1', 10.0), ('data2', 20.0),
+                    ('data3', 30.0), ('data4', 40.0),
+                ])
+
+                # At most prefetch records are extracted at a time
+                active = []
+                peak = []
+                extract = sda_file.sda_file.extract
+
+                def tracked(label, **kw):
+                    active.append(label)
+                    peak.append(len(active))
+                    time.sleep(0.01)
+                    try:
+                        return extract(label, **kw)
+                    finally:
+                        active.remove(label)
+
+                with patch.object(sda_file.sda_file, 'extract', tracked):
+                    async for _ in sda_file.iter_records(prefetch=2):
+                        await asyncio.sleep(0.02)
+                self.assertEqual(max(peak), 2)
+
+                with self.assertRaises(ValueError):
+                    await sda_file.insert('data1', 1.0)
+                with self.assertRaises(ValueError):
+                    await sda_file.extract('missing')
+
+        with temporary_file() as file_path:
+            asyncio.run(main(file_path))
+            self.assertEqual(len(SDAFile(file_path, 'r').labels()), 5)
+
+    def test_follow(self):
+
+        async def main(file_path):
+            sda_file = AsyncSDAFile(file_path, 'w')
+            sda_file.sda_file.create_stream('time')
+            await sda_file.append('time', np.arange(3.0))
+            received = []
+            async for rows in sda_file.follow(interval=0.01, timeout=0.05):
+                received.append(rows['time'])
+                if len(received) == 1:
+                    await sda_file.append('time', 3.0)
+            await sda_file.aclose()
+            return received
+
+        with temporary_file() as file_path:
+            received = asyncio.run(main(file_path))
+        self.assertEqual(len(received), 2)
+        assert_array_equal(np.concatenate(received), np.arange(4.0))
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_equal
+
+from sdafile.bulk_writer import BulkWriter
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_file, temporary_h5file
+from sdafile.utils import get_decoded, set_encoded
+
+
+class TestBulkWriter(unittest.TestCase):
+
+    def test_can_write(self):
+        writer = BulkWriter()
+        self.assertTrue(writer.can_write(np.zeros((1, 3))))
+        self.assertTrue(writer.can_write(np.zeros((0, 1))))
+        self.assertFalse(writer.can_write(np.array(1.0)))
+        self.assertFalse(writer.can_write(np.array([None], dtype=object)))
+        self.assertFalse(writer.can_write(np.zeros(writer.max_bytes)))
+
+    def test_create_group(self):
+        writer = BulkWriter()
+        with temporary_h5file() as h5file:
+            grp = writer.create_group(h5file, 'foo')
+            writer.create_group(grp, 'element 1')
+            self.assertIn('foo/element 1', h5file)
+
+    def test_create_dataset(self):
+        writer = BulkWriter()
+        data = np.arange(6, dtype=np.uint8).reshape(2, 3).T
+        with temporary_h5file() as h5file:
+            writer.create_dataset(h5file, 'foo', data, 5)
+            writer.create_dataset(h5file, 'bar', data[:0], 0)
+            ds = h5file['foo']
+            assert_array_equal(ds[()], data)
+            self.assertEqual(ds.dtype, data.dtype)
+            self.assertEqual(ds.maxshape, (None, None))
+            self.assertEqual(ds.compression, 'gzip')
+            self.assertEqual(ds.compression_opts, 5)
+            self.assertEqual(h5file['bar'].shape, (0, 2))
+
+    def test_write_attrs(self):
+        writer = BulkWriter()
+        attrs = dict(
+            RecordType='cell', Empty='no', Deflate=3, RecordSize=(1, 4),
+            Description='',
+        )
+        with temporary_h5file() as h5file:
+            grp = h5file.create_group('actual')
+            encoded = {}
+            set_encoded(encoded, **attrs)
+            writer.write_attrs(grp.id, encoded)
+            self.assertEqual(sorted(grp.attrs), sorted(attrs))
+            assert_equal(get_decoded(grp.attrs), attrs)
+
+            # Strings are stored as by the high-level API
+            expected = h5file.create_group('expected')
+            set_encoded(expected.attrs, **attrs)
+            for attr in attrs:
+                self.assertEqual(
+                    _attr_type(grp, attr), _attr_type(expected, attr),
+                )
+
+    def test_nested_attrs(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('top', np.arange(3.0))
+            sda_file.insert('cell', [np.arange(3.0), [np.arange(3.0)]])
+
+            # Nested records have the same attribute types as top-level ones
+            with sda_file._h5file('r') as h5file:
+                top = h5file['top/top']
+                for nested in (h5file['cell/element 1'],
+                               h5file['cell/element 2/element 1']):
+                    self.assertEqual(sorted(nested.attrs), sorted(top.attrs))
+                    for attr in top.attrs:
+                        self.assertEqual(
+                            _attr_type(nested, attr), _attr_type(top, attr),
+                        )
+                # Group attributes are strings like the top-level description
+                string_type = _attr_type(h5file['top'], 'Description')
+                for attr in ('RecordType', 'Empty'):
+                    attr_type = _attr_type(h5file['cell/element 2'], attr)
+                    self.assertEqual(attr_type, string_type)
+
+
+def _attr_type(obj, attr):
+    """ Get the HDF5 type of an attribute. """
+    return obj.attrs.get_id(attr).get_type()
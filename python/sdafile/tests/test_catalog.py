@@ -0,0 +1,171 @@
+import os
+import os.path as op
+import sqlite3
+import unittest
+
+import numpy as np
+
+from sdafile.catalog import Catalog
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_directory
+
+
+class TestCatalog(unittest.TestCase):
+
+    def test_scan_and_query(self):
+        with temporary_directory() as directory:
+            sub_directory = op.join(directory, 'sub')
+            os.mkdir(sub_directory)
+            path1 = op.join(directory, 'shot1.sda')
+            path2 = op.join(sub_directory, 'shot2.sda')
+
+            sda_file = SDAFile(path1, 'w')
+            sda_file.insert('velocity', np.zeros(1000), 'Velocity history')
+            sda_file.insert('time', np.zeros(10), 'Time base')
+            sda_file.insert('notes', 'text', 'Shot notes')
+            sda_file = SDAFile(path2, 'w')
+            sda_file.insert('v', np.zeros((3, 4)), 'Free-surface VELOCITY')
+            sda_file.insert('cell', [1.0, 'two'], 'Cell')
+            with open(op.join(directory, 'bad.sda'), 'wb') as f:
+                f.write(b'not an archive')
+            with open(op.join(directory, 'other.txt'), 'wb') as f:
+                f.write(b'not scanned')
+
+            with Catalog(op.join(directory, 'catalog.db')) as catalog:
+                counts = catalog.scan(directory, processes=2)
+                self.assertEqual(counts, {
+                    'scanned': 3, 'unchanged': 0, 'removed': 0, 'failed': 1,
+                })
+
+                files = catalog.files()
+                self.assertEqual(
+                    [f.path for f in files],
+                    [op.join(directory, 'bad.sda'), path1, path2],
+                )
+                self.assertIsNotNone(files[0].error)
+                self.assertEqual(files[0].header, {})
+                self.assertIsNone(files[1].error)
+                self.assertEqual(files[1].mtime_ns, os.stat(path1).st_mtime_ns)
+                self.assertEqual(files[1].header['FileFormat'], 'SDA')
+                self.assertEqual(files[1].header['Writable'], 'yes')
+
+                records = catalog.query()
+                self.assertEqual(
+                    [(r.path, r.label) for r in records],
+                    [(path1, 'notes'), (path1, 'time'), (path1, 'velocity'),
+                     (path2, 'cell'), (path2, 'v')],
+                )
+                record = records[2]
+                self.assertEqual(record.record_type, 'numeric')
+                self.assertEqual(record.description, 'Velocity history')
+                self.assertFalse(record.empty)
+                self.assertEqual(record.shape, (1000,))
+                self.assertEqual(record.dtype, np.dtype(np.float64))
+                self.assertGreaterEqual(record.storage_size, 8000)
+                self.assertEqual(record.children, 0)
+                self.assertEqual(records[3].children, 2)
+                self.assertIsNone(records[3].dtype)
+
+                records = catalog.query(
+                    record_type='numeric', description='velocity',
+                )
+                self.assertEqual(
+                    [(r.path, r.label) for r in records],
+                    [(path1, 'velocity'), (path2, 'v')],
+                )
+                records = catalog.query(
+                    record_type='numeric', description='velocity',
+                    min_size=1000,
+                )
+                self.assertEqual([r.label for r in records], ['velocity'])
+                records = catalog.query(max_size=100, record_type='numeric')
+                self.assertEqual([r.label for r in records], ['time'])
+                records = catalog.query(record_type=['cell', 'character'])
+                self.assertEqual(
+                    [r.label for r in records], ['notes', 'cell'],
+                )
+                records = catalog.query(label='[!v]*')
+                self.assertEqual(
+                    [r.label for r in records], ['notes', 'time', 'cell'],
+                )
+                records = catalog.query(path='*/sub/*')
+                self.assertEqual([r.label for r in records], ['cell', 'v'])
+
+                # Unchanged files are not read again
+                counts = catalog.scan(directory, processes=1)
+                self.assertEqual(counts, {
+                    'scanned': 0, 'unchanged': 3, 'removed': 0, 'failed': 0,
+                })
+
+                # Changed files are read again and removed files dropped
+                sda_file = SDAFile(path1, 'a')
+                sda_file.insert('pressure', np.zeros(5), 'Pressure')
+                os.remove(path2)
+                counts = catalog.scan(directory, processes=1)
+                self.assertEqual(counts, {
+                    'scanned': 1, 'unchanged': 1, 'removed': 1, 'failed': 0,
+                })
+                records = catalog.query()
+                self.assertEqual(
+                    [(r.path, r.label) for r in records],
+                    [(path1, 'notes'), (path1, 'pressure'), (path1, 'time'),
+                     (path1, 'velocity')],
+                )
+
+                # Files outside of the scanned directories are kept
+                counts = catalog.scan(sub_directory, processes=1)
+                self.assertEqual(counts['removed'], 0)
+                self.assertEqual(len(catalog.files()), 2)
+
+                with self.assertRaises(ValueError):
+                    catalog.scan(op.join(directory, 'missing'))
+
+    def test_non_recursive_scan(self):
+        with temporary_directory() as directory:
+            sub_directory = op.join(directory, 'sub')
+            os.mkdir(sub_directory)
+            path1 = op.join(directory, 'shot1.sda')
+            path2 = op.join(sub_directory, 'shot2.sda')
+            SDAFile(path1, 'w').insert('a', np.zeros(3))
+            SDAFile(path2, 'w').insert('b', np.zeros(3))
+
+            with Catalog(op.join(directory, 'catalog.db')) as catalog:
+                catalog.scan(directory, processes=1)
+
+                # Archives in sub-directories are not removed
+                counts = catalog.scan(
+                    directory, recursive=False, processes=1,
+                )
+                self.assertEqual(counts, {
+                    'scanned': 0, 'unchanged': 1, 'removed': 0, 'failed': 0,
+                })
+                self.assertEqual(
+                    [f.path for f in catalog.files()], [path1, path2],
+                )
+
+                os.remove(path1)
+                counts = catalog.scan(
+                    directory, recursive=False, processes=1,
+                )
+                self.assertEqual(counts['removed'], 1)
+                self.assertEqual(
+                    [f.path for f in catalog.files()], [path2],
+                )
+
+    def test_old_catalog(self):
+        with temporary_directory() as directory:
+            path = op.join(directory, 'shot1.sda')
+            SDAFile(path, 'w').insert('a', np.zeros(3))
+            db_path = op.join(directory, 'catalog.db')
+            conn = sqlite3.connect(db_path)
+            conn.execute(
+                "CREATE TABLE files (path TEXT UNIQUE, mtime REAL)"
+            )
+            conn.commit()
+            conn.close()
+
+            # Catalogs of an older schema are rebuilt
+            with Catalog(db_path) as catalog:
+                self.assertEqual(catalog.files(), [])
+                catalog.scan(directory, processes=1)
+                self.assertEqual(len(catalog.files()), 1)
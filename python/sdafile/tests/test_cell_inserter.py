@@ -1,7 +1,9 @@
 import numpy as np
 from numpy.testing import assert_equal
 
-from sdafile.cell_inserter import ArrayInserter, ListInserter
+from sdafile.cell_inserter import (
+    ArrayInserter, IteratorInserter, ListInserter,
+)
 from sdafile.testing import InserterTestCase
 
 
@@ -184,3 +186,55 @@ class TestCellInserter(InserterTestCase):
                 grp.attrs,
                 **grp_attrs
             )
+
+
+class TestIteratorInserter(InserterTestCase):
+
+    def test_iterator_inserter(self):
+        consumed = []
+
+        def generate():
+            for i in range(3):
+                consumed.append(i)
+                yield np.arange(i + 1)
+
+        self.assertTrue(IteratorInserter.can_insert(generate()))
+        self.assertFalse(IteratorInserter.can_insert('abc'))
+        self.assertFalse(IteratorInserter.can_insert(3))
+
+        inserter = IteratorInserter('test', generate(), 0, self.registry)
+        inserter.prepare_data()
+        sub_inserters = iter(inserter)
+        next(sub_inserters)
+        self.assertEqual(consumed, [0])
+        self.assertEqual(inserter.record_size, (1, 1))
+
+        label = 'test'
+        with self.insert(IteratorInserter, label, generate(), 0, 'desc') as \
+                h5file:
+            grp = h5file[label]
+            self.assertAttrs(
+                grp.attrs,
+                RecordType='cell',
+                Empty='no',
+                RecordSize=(1, 3),
+                Description='desc',
+                Deflate=0,
+            )
+            for i in range(3):
+                stored = grp['element {}'.format(i + 1)][()]
+                assert_equal(stored, np.arange(i + 1).reshape(-1, 1))
+
+    def test_iterator_inserter_empty(self):
+        label = 'test'
+        with self.insert(IteratorInserter, label, iter([]), 0, 'desc') as \
+                h5file:
+            grp = h5file[label]
+            self.assertAttrs(
+                grp.attrs,
+                RecordType='cell',
+                Empty='yes',
+                RecordSize=(1, 0),
+                Description='desc',
+                Deflate=0,
+            )
@@ -1,13 +1,18 @@
 import unittest
+from unittest.mock import patch
 
+import h5py
 import numpy as np
 from numpy.testing import assert_array_equal, assert_equal
-from scipy.sparse import coo_matrix
+from scipy.sparse import coo_matrix, csc_matrix, csr_matrix
 
 from sdafile.extract import (
-    extract_character, extract_complex, extract_file, extract_logical,
-    extract_numeric, extract_sparse, extract_sparse_complex,
+    extract, extract_character, extract_complex, extract_file,
+    extract_logical, extract_numeric, extract_simple, extract_sparse,
+    extract_sparse_complex, read_attrs,
 )
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_file, temporary_h5file
 
 
 class TestExtract(unittest.TestCase):
@@ -37,6 +42,44 @@ class TestExtract(unittest.TestCase):
         self.assertEqual(expected_2d.dtype, extracted.dtype)
         assert_array_equal(expected_2d, extracted)
 
+    def test_extract_complex_from_dataset(self):
+        expected = np.arange(6, dtype=np.complex128)
+        expected.imag = -np.arange(6)
+        stored = np.vstack([expected.real, expected.imag])
+        with temporary_h5file() as h5file:
+            ds = h5file.create_dataset('test', data=stored)
+            extracted = extract_complex(ds, (1, 6))
+            self.assertEqual(expected.dtype, extracted.dtype)
+            assert_array_equal(expected, extracted)
+
+            extracted = extract_complex(ds, (3, 2))
+            assert_array_equal(expected.reshape((3, 2), order='F'), extracted)
+
+            ds = h5file.create_dataset('test32', data=stored.astype('f4'))
+            extracted = extract_complex(ds, (1, 6))
+            self.assertEqual(extracted.dtype, np.complex64)
+            assert_array_equal(expected.astype(np.complex64), extracted)
+
+    def test_extract_composite(self):
+        data = [np.arange(3.0)] * 500 + [{'a': [1.0] * 500}]
+        with temporary_file() as file_path:
+            SDAFile(file_path, 'w').insert('cell', data)
+            with h5py.File(file_path, 'r') as h5file:
+                counts = []
+
+                def spy(*args, **kw):
+                    types = h5py.h5f.OBJ_DATASET | h5py.h5f.OBJ_GROUP
+                    counts.append(h5py.h5f.get_obj_count(h5file.id, types))
+                    return extract_simple(*args, **kw)
+
+                with patch('sdafile.extract.extract_simple', spy):
+                    extracted = extract(h5file, 'cell')
+
+            # The elements of a level are opened as they are extracted
+            self.assertEqual(len(counts), 1000)
+            self.assertLess(max(counts), 10)
+            assert_equal(extracted, data)
+
     def test_extract_file(self):
         contents = b'01'
         stored = np.array([48, 49], np.uint8).reshape(1, 2)
@@ -80,6 +123,23 @@ class TestExtract(unittest.TestCase):
         self.assertIsInstance(extracted, coo_matrix)
         assert_array_equal(extracted.toarray(), expected)
 
+        # Trailing empty rows and columns are kept with an explicit shape
+        expected = np.pad(expected, ((0, 2), (0, 1)), 'constant')
+        for fmt, cls in [('coo', coo_matrix), ('csr', csr_matrix),
+                         ('csc', csc_matrix)]:
+            extracted = extract_sparse(stored, (5, 4), fmt)
+            self.assertIsInstance(extracted, cls)
+            assert_array_equal(extracted.toarray(), expected)
+
+        with temporary_h5file() as h5file:
+            ds = h5file.create_dataset('test', data=stored.astype(float))
+            extracted = extract_sparse(ds, (5, 4), 'csr')
+            self.assertIsInstance(extracted, csr_matrix)
+            assert_array_equal(extracted.toarray(), expected)
+
+        with self.assertRaises(ValueError):
+            extract_sparse(stored, sparse_format='lil')
+
     def test_extract_sparse_complex(self):
         row = np.array([3, 4, 5, 6])
         col = np.array([0, 1, 1, 4])
@@ -92,3 +152,42 @@ class TestExtract(unittest.TestCase):
         expected = np.zeros((7, 5), dtype=np.complex128)
         expected[row, col] = data
         assert_array_equal(extracted.toarray(), expected)
+
+        with temporary_h5file() as h5file:
+            ds = h5file.create_dataset('test', data=stored)
+            extracted = extract_sparse_complex(ds, (7, 5))
+            assert_array_equal(extracted.toarray(), expected)
+
+            extracted = extract_sparse_complex(ds, (7, 5), 'csc')
+            self.assertIsInstance(extracted, csc_matrix)
+            assert_array_equal(extracted.toarray(), expected)
+
+    def test_read_attrs(self):
+        with temporary_h5file() as h5file:
+            ds = h5file.create_dataset('data', data=np.arange(3))
+            # Fixed-length strings as written by MATLAB and variable-length
+            # strings as written by h5py
+            ds.attrs['RecordType'] = np.bytes_(b'numeric')
+            ds.attrs['Empty'] = 'no'
+            ds.attrs['ArraySize'] = np.array([3.0, 1.0])
+            ds.attrs['Description'] = b'not read'
+            ds.attrs['Scalar'] = 4.0
+
+            attrs = read_attrs(ds)
+            self.assertEqual(
+                sorted(attrs), ['ArraySize', 'Empty', 'RecordType'],
+            )
+            self.assertEqual(attrs['RecordType'], 'numeric')
+            self.assertEqual(attrs['Empty'], 'no')
+            assert_array_equal(attrs['ArraySize'], [3.0, 1.0])
+
+            attrs = read_attrs(ds, 'Scalar', 'Missing')
+            self.assertEqual(attrs, {'Scalar': 4.0})
+
+            grp = h5file.create_group('group')
+            grp.attrs['RecordType'] = np.bytes_(b'cell')
+            grp.attrs['RecordSize'] = np.array([1.0, 2.0])
+            grp.attrs['Deflate'] = 0
+            attrs = read_attrs(grp)
+            self.assertEqual(sorted(attrs), ['RecordSize', 'RecordType'])
+            self.assertEqual(attrs['RecordType'], 'cell')
@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import os.path as op
+import threading
+import unittest
+
+import h5py
+import numpy as np
+from numpy.testing import assert_equal
+
+from sdafile.exceptions import BadSDAFile
+from sdafile.file_set import SDAFileSet, _HandlePool
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_directory
+
+
+class TestSDAFileSet(unittest.TestCase):
+
+    def _make_files(self, directory, n=4):
+        paths = []
+        for i in range(n):
+            path = op.join(directory, 'shot{}.sda'.format(i))
+            sda_file = SDAFile(path, 'w')
+            sda_file.insert('shared', np.full(3, float(i)), 'Shot data')
+            sda_file.insert('only{}'.format(i), i, 'Shot {}'.format(i))
+            paths.append(path)
+        return paths
+
+    def test_file_set(self):
+        with temporary_directory() as directory:
+            paths = self._make_files(directory)
+            with SDAFileSet(op.join(directory, '*.sda'), max_open=2) as fs:
+                self.assertEqual([f.name for f in fs.files], paths)
+                self.assertEqual(len(fs._pool), 0)
+
+                self.assertEqual(
+                    fs.labels(),
+                    ['only0', 'shared', 'only1', 'only2', 'only3'],
+                )
+                self.assertEqual(len(fs), 5)
+                # Listing labels does not build the index of each file
+                self.assertTrue(all(f._index is None for f in fs.files))
+                self.assertIn('only3', fs)
+                self.assertNotIn('missing', fs)
+                self.assertLessEqual(len(fs._pool), 2)
+
+                self.assertEqual(fs.locate('shared'), paths[0])
+                assert_equal(fs.extract('shared'), np.zeros(3))
+                self.assertEqual(fs.extract('only2'), 2)
+                with self.assertRaises(ValueError):
+                    fs.extract('missing')
+
+                data = fs.extract_many(['only3', 'shared', 'only1'])
+                self.assertEqual(list(data), ['only3', 'shared', 'only1'])
+                self.assertEqual(data['only3'], 3)
+                self.assertEqual(data['only1'], 1)
+                self.assertEqual(len(fs.extract_many()), 5)
+
+                record = fs['only1']
+                self.assertEqual(record.record_type, 'numeric')
+                self.assertEqual(record.description, 'Shot 1')
+                self.assertEqual(record.extract(), 1)
+
+                summary = fs.probe()
+                self.assertEqual(summary.loc['only2', 'File'], paths[2])
+                self.assertEqual(
+                    summary.loc['shared', 'Description'], 'Shot data',
+                )
+                self.assertEqual(list(fs.probe('only').index), [
+                    'only0', 'only1', 'only2', 'only3',
+                ])
+
+                # Member files are read-only and share the pool
+                values = [f.extract('shared')[0] for f in fs.files]
+                self.assertEqual(values, [0.0, 1.0, 2.0, 3.0])
+                self.assertLessEqual(len(fs._pool), 2)
+                with self.assertRaises(IOError):
+                    fs.files[0].insert('new', 1.0)
+
+            self.assertEqual(len(fs._pool), 0)
+
+    def test_threads(self):
+        with temporary_directory() as directory:
+            self._make_files(directory)
+            with SDAFileSet(op.join(directory, '*.sda'), max_open=1) as fs:
+                labels = ['only{}'.format(i % 4) for i in range(40)]
+                with ThreadPoolExecutor(8) as executor:
+                    values = list(executor.map(fs.extract, labels))
+                self.assertEqual(values, [i % 4 for i in range(40)])
+                # Idle files are closed down to the size of the pool
+                self.assertEqual(len(fs._pool), 1)
+
+    def test_concurrent_open(self):
+        with temporary_directory() as directory:
+            path, = self._make_files(directory, 1)
+            pool = _HandlePool(2, {})
+            barrier = threading.Barrier(2)
+            opened = []
+            open_file = pool._open
+
+            def spy(name):
+                h5file = open_file(name)
+                opened.append(h5file)
+                # Both threads open the file, outside of the lock
+                barrier.wait(5)
+                return h5file
+
+            def use(_):
+                with pool.handle(path) as h5file:
+                    return h5file
+
+            pool._open = spy
+            with ThreadPoolExecutor(2) as executor:
+                used = list(executor.map(use, range(2)))
+
+            # The file of the thread that lost the race is closed
+            self.assertIs(used[0], used[1])
+            self.assertEqual(len(pool), 1)
+            self.assertEqual(len(opened), 2)
+            self.assertEqual(
+                [bool(h5file.id.valid) for h5file in opened].count(True), 1,
+            )
+            pool.close()
+
+    def test_precedence(self):
+        with temporary_directory() as directory:
+            paths = self._make_files(directory, 3)
+            os.utime(paths[1], (0, 2e9))
+
+            fs = SDAFileSet(paths, precedence='last')
+            assert_equal(fs.extract('shared'), np.full(3, 2.0))
+            fs = SDAFileSet(paths, precedence='newest')
+            self.assertEqual(fs.locate('shared'), paths[1])
+            fs = SDAFileSet(
+                paths, precedence=lambda label, names: names[-2],
+            )
+            self.assertEqual(fs.locate('shared'), paths[1])
+            fs = SDAFileSet(paths, precedence='error')
+            with self.assertRaises(ValueError):
+                fs.labels()
+            fs.close()
+
+            with self.assertRaises(ValueError):
+                SDAFileSet(paths, precedence='unknown')
+            with self.assertRaises(ValueError):
+                SDAFileSet(paths, max_open=0)
+            with self.assertRaises(IOError):
+                SDAFileSet([op.join(directory, 'missing.sda')])
+
+    def test_bad_header(self):
+        with temporary_directory() as directory:
+            path = op.join(directory, 'bad.sda')
+            with h5py.File(path, 'w') as h5file:
+                h5file.attrs['FileFormat'] = np.bytes_('XYZ')
+            fs = SDAFileSet([path])
+            with self.assertRaises(BadSDAFile):
+                fs.labels()
+            self.assertEqual(len(fs._pool), 0)
@@ -0,0 +1,77 @@
+import unittest
+
+import h5py
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from sdafile.index import IndexEntry, build_index
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_file
+
+
+class TestIndex(unittest.TestCase):
+
+    def test_build_index(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('numeric', np.arange(12.0).reshape(3, 4), 'a')
+            sda_file.insert('complex', np.arange(3) * 1j)
+            sda_file.insert('sparse', coo_matrix(np.eye(4)))
+            sda_file.insert('empty', [])
+            sda_file.insert('cell', [1.0, 'two', {'a': np.arange(5)}])
+            sda_file.insert('structure', {'a': True, 'b': 'text'}, '', 1)
+            with sda_file._h5file('r') as h5file:
+                index = build_index(h5file)
+                storage_sizes = dict.fromkeys(h5file.keys(), 0)
+
+                def visitor(name, obj):
+                    if isinstance(obj, h5py.Dataset):
+                        label = name.split('/')[0]
+                        storage_sizes[label] += obj.id.get_storage_size()
+
+                h5file.visititems(visitor)
+
+        self.assertEqual(list(index), sorted(index))
+        for label, entry in index.items():
+            self.assertIsInstance(entry, IndexEntry)
+            self.assertEqual(entry.label, label)
+            self.assertEqual(entry.storage_size, storage_sizes[label])
+
+        entry = index['numeric']
+        self.assertEqual(entry.record_type, 'numeric')
+        self.assertEqual(entry.description, 'a')
+        self.assertEqual(entry.deflate, 0)
+        self.assertEqual(entry.shape, (3, 4))
+        self.assertEqual(entry.dtype, np.float64)
+        self.assertEqual(entry.children, 0)
+        self.assertFalse(entry.empty)
+        self.assertFalse(entry.complex)
+        self.assertFalse(entry.sparse)
+        self.assertEqual(entry.attrs['Sparse'], 'no')
+
+        entry = index['complex']
+        self.assertTrue(entry.complex)
+        self.assertEqual(entry.shape, (3,))
+        self.assertEqual(entry.dtype, np.complex128)
+
+        entry = index['sparse']
+        self.assertTrue(entry.sparse)
+        self.assertEqual(entry.shape, (4, 4))
+
+        entry = index['empty']
+        self.assertTrue(entry.empty)
+        self.assertEqual(entry.shape, (0,))
+        self.assertEqual(entry.children, 0)
+        self.assertEqual(entry.storage_size, 0)
+
+        entry = index['cell']
+        self.assertEqual(entry.record_type, 'cell')
+        self.assertEqual(entry.shape, (3,))
+        self.assertIsNone(entry.dtype)
+        self.assertEqual(entry.children, 3)
+
+        entry = index['structure']
+        self.assertIsNone(entry.shape)
+        self.assertEqual(entry.children, 2)
+        self.assertEqual(entry.deflate, 1)
+        self.assertEqual(entry.attrs['FieldNames'], 'a b')
@@ -0,0 +1,57 @@
+import threading
+import time
+import unittest
+
+from sdafile.locks import RWLock
+
+
+class TestRWLock(unittest.TestCase):
+
+    def test_concurrent_reads(self):
+        lock = RWLock()
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read():
+            with lock.read():
+                # Fails with BrokenBarrierError unless all readers hold the
+                # lock at once
+                barrier.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(barrier.broken)
+
+    def test_exclusive_write(self):
+        lock = RWLock()
+        events = []
+
+        def write():
+            with lock.write():
+                events.append('write')
+
+        with lock.read():
+            thread = threading.Thread(target=write)
+            thread.start()
+            time.sleep(0.05)
+            events.append('read')
+        thread.join()
+        self.assertEqual(events, ['read', 'write'])
+
+    def test_reentrant(self):
+        lock = RWLock()
+        with lock.write():
+            with lock.write():
+                with lock.read():
+                    pass
+        with lock.read():
+            with lock.read():
+                pass
+            with self.assertRaises(RuntimeError):
+                with lock.write():
+                    pass
+        # The lock is free again
+        with lock.write():
+            pass
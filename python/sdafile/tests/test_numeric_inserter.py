@@ -1,4 +1,7 @@
+from unittest.mock import patch
+
 import numpy as np
+from numpy.testing import assert_array_equal
 from scipy.sparse import coo_matrix
 
 from sdafile.numeric_inserter import (
@@ -189,6 +192,7 @@ class TestSparseInserter(NumericInserterTestCase):
 
     def test_sparse_inserter(self):
         data = coo_matrix((np.arange(5), (np.arange(1, 6), np.arange(2, 7))))
+        self.ds_attrs['ArraySize'] = (6, 7)
         expected = np.array([data.row + 1, data.col + 1, data.data])
         self.assertSimpleInsert(
             SparseInserter,
@@ -198,6 +202,51 @@ class TestSparseInserter(NumericInserterTestCase):
             expected,
         )
 
+    def test_sparse_inserter_compressed(self):
+        coo = coo_matrix((np.arange(5), (np.arange(1, 6), np.arange(2, 7))))
+        self.ds_attrs['ArraySize'] = (6, 7)
+        expected = np.array([coo.row + 1, coo.col + 1, coo.data])
+        for data in (coo.tocsr(), coo.tocsc()):
+            self.assertSimpleInsert(
+                SparseInserter,
+                data,
+                self.grp_attrs,
+                self.ds_attrs,
+                expected,
+            )
+
+    def test_sparse_inserter_blocks(self):
+        data = coo_matrix(
+            (np.arange(5), (np.arange(1, 6), np.arange(2, 7)))
+        ).tocsc()
+        inserter = SparseInserter('test', data, 0)
+        inserter.prepare_data()
+        blocks = list(inserter.iter_blocks(block_size=2))
+        self.assertEqual(len(blocks), 3)
+        starts = [block[0] for block in blocks]
+        self.assertEqual(starts, [0, 2, 4])
+        row = np.concatenate([block[2] for block in blocks])
+        col = np.concatenate([block[3] for block in blocks])
+        assert_array_equal(row, np.arange(1, 6))
+        assert_array_equal(col, np.arange(2, 7))
+
+    def test_sparse_inserter_row_index(self):
+        data = coo_matrix(
+            (np.arange(5), (np.arange(1, 6), np.arange(2, 7))), shape=(10, 7)
+        )
+        inserter = SparseInserter('test', data, 0)
+        inserter.row_index = True
+        inserter.prepare_data()
+        self.assertEqual(inserter.data.format, 'csr')
+        step, offsets = inserter.get_row_index()
+        self.assertEqual(step, 1)
+        assert_array_equal(offsets, [0, 0, 1, 2, 3, 4, 5, 5, 5, 5, 5])
+
+        with patch('sdafile.numeric_inserter.ROW_INDEX_SIZE', 3):
+            step, offsets = inserter.get_row_index()
+        self.assertEqual(step, 4)
+        assert_array_equal(offsets, [0, 3, 5, 5])
+
     def test_sparse_inserter_complex(self):
         data = coo_matrix(
             (np.arange(5)+1j, (np.arange(1, 6), np.arange(2, 7)))
@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from sdafile.prefetch import Prefetcher, get_nbytes
+
+
+class TestPrefetcher(unittest.TestCase):
+
+    def test_prefetch(self):
+        called = []
+
+        def func(key):
+            called.append(key)
+            return np.zeros(key)
+
+        with Prefetcher(func, [10, 20, 30], prefetch=2) as results:
+            self.assertEqual(
+                [(key, len(data)) for key, data in results],
+                [(10, 10), (20, 20), (30, 30)],
+            )
+        self.assertEqual(called, [10, 20, 30])
+
+        with Prefetcher(func, []) as results:
+            self.assertEqual(list(results), [])
+        with self.assertRaises(ValueError):
+            Prefetcher(func, [], prefetch=0)
+
+    def test_limits(self):
+        called = []
+        events = [threading.Event() for _ in range(5)]
+
+        def func(key):
+            called.append(key)
+            events[key].set()
+            return np.zeros(1000)
+
+        # 8000 bytes of buffered data stop the read ahead at one record
+        with Prefetcher(func, range(5), prefetch=3, max_bytes=8000) as it:
+            self.assertTrue(events[0].wait(5))
+            time.sleep(0.05)
+            self.assertEqual(called, [0])
+            self.assertEqual(it.buffered_bytes, 8000)
+            self.assertEqual(next(it)[0], 0)
+            self.assertTrue(events[1].wait(5))
+
+        # Without the byte limit, three records are read ahead
+        del called[:]
+        for event in events:
+            event.clear()
+        with Prefetcher(func, range(5), prefetch=3):
+            self.assertTrue(events[2].wait(5))
+            time.sleep(0.05)
+            self.assertEqual(called, [0, 1, 2])
+
+    def test_error(self):
+
+        def func(key):
+            if key == 1:
+                raise ValueError("bad key")
+            return key
+
+        results = Prefetcher(func, range(3))
+        self.assertEqual(next(results), (0, 0))
+        with self.assertRaises(ValueError):
+            next(results)
+        with self.assertRaises(StopIteration):
+            next(results)
+        results.close()
+
+    def test_get_nbytes(self):
+        self.assertEqual(get_nbytes(np.zeros(10)), 80)
+        self.assertEqual(get_nbytes({'a': np.zeros(2), 'b': [np.zeros(1)]}),
+                         24)
+        sparse = coo_matrix(np.eye(3))
+        self.assertEqual(get_nbytes(sparse), 3 * 8 + 6 * 4)
+        self.assertGreater(get_nbytes('text'), 0)
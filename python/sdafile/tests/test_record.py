@@ -0,0 +1,161 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_equal
+from scipy.sparse import coo_matrix
+
+from sdafile.record import Record
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_file
+
+
+class TestRecord(unittest.TestCase):
+
+    def setUp(self):
+        self._file_context = temporary_file()
+        file_path = self._file_context.__enter__()
+        self.sda_file = SDAFile(file_path, 'w')
+
+    def tearDown(self):
+        del self.sda_file
+        self._file_context.__exit__(None, None, None)
+
+    def test_metadata(self):
+        data = np.arange(12.0).reshape(3, 4)
+        self.sda_file.insert('numeric', data, 'desc', 3)
+        rec = self.sda_file['numeric']
+        self.assertIsInstance(rec, Record)
+        self.assertEqual(rec.name, 'numeric')
+        self.assertEqual(rec.record_type, 'numeric')
+        self.assertEqual(rec.description, 'desc')
+        self.assertEqual(rec.shape, (3, 4))
+        self.assertEqual(rec.dtype, data.dtype)
+        self.assertEqual(rec.ndim, 2)
+        self.assertEqual(len(rec), 3)
+        self.assertFalse(rec.empty)
+        self.assertFalse(rec.complex)
+        self.assertEqual(rec.attrs['Deflate'], 3)
+
+        self.sda_file.insert('complex', np.arange(3) * 1j)
+        rec = self.sda_file['complex']
+        self.assertTrue(rec.complex)
+        self.assertEqual(rec.shape, (3,))
+        self.assertEqual(rec.dtype, np.complex128)
+
+        self.sda_file.insert('empty', np.nan)
+        rec = self.sda_file['empty']
+        self.assertTrue(rec.empty)
+        self.assertEqual(rec.shape, ())
+
+        self.sda_file.insert('scalar', True)
+        rec = self.sda_file['scalar']
+        self.assertEqual(rec.shape, ())
+        self.assertEqual(rec.dtype, bool)
+        with self.assertRaises(TypeError):
+            len(rec)
+
+        self.sda_file.insert('string', 'hello')
+        rec = self.sda_file['string']
+        self.assertIsNone(rec.shape)
+        self.assertIsNone(rec.dtype)
+
+        with self.assertRaises(ValueError):
+            self.sda_file['missing']
+
+    def test_array(self):
+        data = np.arange(12.0).reshape(3, 4)
+        self.sda_file.insert('numeric', data)
+        assert_array_equal(np.asarray(self.sda_file['numeric']), data)
+
+        sparse = coo_matrix(([1.0, 2.0], ([0, 2], [1, 0])), shape=(3, 3))
+        self.sda_file.insert('sparse', sparse)
+        rec = self.sda_file['sparse']
+        self.assertEqual(rec.shape, (3, 3))
+        assert_array_equal(np.asarray(rec), sparse.toarray())
+        assert_array_equal(rec[1:].toarray(), sparse.toarray()[1:])
+
+        rec = self.sda_file['numeric']
+        assert_array_equal(rec.extract(), data)
+
+    def test_slicing(self):
+        data = np.arange(24.0).reshape(2, 3, 4)
+        self.sda_file.insert('3d', data)
+        rec = self.sda_file['3d']
+        keys = [
+            0, -1, slice(None), (0, 1), (slice(None), 2),
+            (1, slice(0, 2), slice(1, 3)), (Ellipsis, 1), (0, Ellipsis, 2),
+            (1, 2, 3), (None, 0),
+        ]
+        for key in keys:
+            assert_equal(rec[key], data[key])
+
+        vector = np.arange(10)
+        self.sda_file.insert('vector', vector)
+        rec = self.sda_file['vector']
+        self.assertEqual(rec.shape, (10,))
+        for key in [3, slice(2, 5), slice(None, None, 3), -2]:
+            assert_equal(rec[key], vector[key])
+
+        logical = np.array([[True, False], [False, False]])
+        self.sda_file.insert('logical', logical)
+        rec = self.sda_file['logical']
+        sliced = rec[0]
+        self.assertEqual(sliced.dtype, bool)
+        assert_equal(sliced, logical[0])
+        self.assertIs(type(rec[0, 0]), np.bool_)
+
+        self.sda_file.insert('complex', vector * 1j)
+        assert_equal(self.sda_file['complex'][2:4], vector[2:4] * 1j)
+
+        self.sda_file.insert('string', 'hello')
+        self.assertEqual(self.sda_file['string'][1:3], 'el')
+
+        with self.assertRaises(IndexError):
+            self.sda_file['vector'][0, 0]
+
+    def test_navigation(self):
+        data = {
+            'A1': np.arange(5),
+            'cell': ['a', {'b': np.arange(3.0)}, [1, 2]],
+            'empty': [],
+        }
+        self.sda_file.insert('structure', data)
+        rec = self.sda_file['structure']
+        self.assertEqual(rec.record_type, 'structure')
+        self.assertEqual(rec.keys(), ['A1', 'cell', 'empty'])
+        self.assertEqual(len(rec), 3)
+        self.assertIsNone(rec.shape)
+
+        a1 = rec['A1']
+        self.assertEqual(a1.path, 'structure/A1')
+        self.assertEqual(a1.shape, (5,))
+        assert_equal(a1[1:3], [1, 2])
+        assert_equal(np.asarray(a1), data['A1'])
+
+        cell = rec['cell']
+        self.assertEqual(cell.record_type, 'cell')
+        self.assertEqual(cell.shape, (3,))
+        self.assertEqual(len(cell), 3)
+        self.assertEqual(cell[0].extract(), 'a')
+        self.assertEqual(cell[-1].extract(), [1, 2])
+        assert_equal(cell[1]['b'][1:], [1.0, 2.0])
+        self.assertEqual(cell['element 1'].extract(), 'a')
+        assert_equal(cell[1].extract(), data['cell'][1])
+
+        with self.assertRaises(KeyError):
+            rec['missing']
+        with self.assertRaises(TypeError):
+            rec[0]
+        with self.assertRaises(IndexError):
+            cell[3]
+        with self.assertRaises(KeyError):
+            rec['empty'][0]
+
+        grid = np.empty((2, 3), dtype=object)
+        for idx in np.ndindex(grid.shape):
+            grid[idx] = float(idx[0] * 10 + idx[1])
+        self.sda_file.insert('grid', grid)
+        rec = self.sda_file['grid']
+        self.assertEqual(rec.shape, (2, 3))
+        for idx in np.ndindex(grid.shape):
+            self.assertEqual(rec[idx].extract(), grid[idx])
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from sdafile.cell_inserter import ListInserter
+from sdafile.numeric_inserter import (
+    ArrayInserter as NumericArrayInserter, ScalarInserter,
+)
+from sdafile.character_inserter import ArrayInserter as CharacterArrayInserter
+from sdafile.record_inserter import InserterRegistry, get_registry
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_file
+
+
+class TestInserterRegistry(unittest.TestCase):
+
+    def test_shared_registry(self):
+        registry = get_registry()
+        self.assertIs(get_registry(), registry)
+        self.assertIs(ListInserter('test', [], 0).registry, registry)
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            self.assertIs(sda_file._registry, registry)
+
+    def test_dtype_dispatch(self):
+        registry = InserterRegistry()
+        arr = np.arange(3)
+        self.assertIs(registry.get_inserter(arr), NumericArrayInserter)
+        self.assertIs(
+            registry.get_inserter(np.array(['a'], 'S1')),
+            CharacterArrayInserter,
+        )
+        self.assertIsNone(registry.get_inserter(np.arange(3, dtype='f2')))
+        self.assertIs(registry.get_inserter(3), ScalarInserter)
+        self.assertIsNone(registry.get_inserter(None))
+
+        # Results are cached by type and dtype
+        self.assertIn((np.ndarray, arr.dtype), registry._cache)
+        self.assertIn(int, registry._cache)
+
+    def test_register(self):
+
+        class Custom(object):
+            pass
+
+        class CustomInserter(ListInserter):
+
+            @staticmethod
+            def can_insert(data):
+                return isinstance(data, Custom)
+
+        registry = InserterRegistry()
+        self.assertIsNone(registry.get_inserter(Custom()))
+        registry.register(CustomInserter)
+        self.assertIs(registry.get_inserter(Custom()), CustomInserter)
+        self.assertIs(registry.get_inserter([]), ListInserter)
@@ -1,13 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
 import io
+import multiprocessing
 import os
 import random
 import shutil
+import sys
+import time
 import unittest
+from unittest.mock import patch
 
+import h5py
 import numpy as np
 from numpy.testing import assert_array_equal, assert_equal
+from scipy.sparse import coo_matrix, random as random_sparse
 
 from sdafile.exceptions import BadSDAFile
+from sdafile.record_inserter import InserterRegistry
 from sdafile.sda_file import SDAFile
 from sdafile.testing import (
     BAD_ATTRS, GOOD_ATTRS, MockRecordInserter, TEST_NUMERIC, TEST_CHARACTER,
@@ -213,7 +221,9 @@ class TestSDAFileInsert(unittest.TestCase):
         with temporary_file() as file_path:
             sda_file = SDAFile(file_path, 'w')
             called = []
-            sda_file._registry._inserters = [MockRecordInserter(called)]
+            # Use a private registry so the shared one is not altered
+            sda_file._registry = InserterRegistry()
+            sda_file._registry.register(MockRecordInserter(called))
             sda_file.insert('foo', True, 'insert_called', 0)
 
         self.assertEqual(called, ['insert_called'])
@@ -263,6 +273,72 @@ class TestSDAFileInsert(unittest.TestCase):
             with self.assertRaises(ValueError):
                 sda_file.insert('bad', data, 'bad', 0, as_structures=True)
 
+            self.assertEqual(sda_file.labels(), ['test'])
+
+    def test_as_cell(self):
+
+        def generate(fail_at=None):
+            for i in range(4):
+                if i == fail_at:
+                    yield None  # unsupported
+                yield i * np.ones(i + 1)
+
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('test', generate(), as_cell=True)
+            extracted = sda_file.extract('test')
+            self.assertEqual(len(extracted), 4)
+            for i, item in enumerate(extracted):
+                assert_equal(item, i * np.ones(i + 1))
+
+            sda_file.insert('empty', iter(()), as_cell=True)
+            self.assertEqual(sda_file.extract('empty'), [])
+
+            # Partial records are removed
+            with self.assertRaises(ValueError):
+                sda_file.insert('bad', generate(fail_at=2), as_cell=True)
+            self.assertNotIn('bad', sda_file.labels())
+
+            with self.assertRaises(ValueError):
+                sda_file.insert('bad', 3, as_cell=True)
+            with self.assertRaises(ValueError):
+                sda_file.insert(
+                    'bad', generate(), as_cell=True, as_structures=True,
+                )
+
+    def test_structures_from_columns(self):
+        from pandas import DataFrame
+
+        columns = {
+            'foo': np.array(['a', 'bc', 'def']),
+            'bar': np.arange(3),
+            'baz': np.array([True, False, True]),
+        }
+        expected = [
+            {'foo': 'a', 'bar': 0, 'baz': True},
+            {'foo': 'bc', 'bar': 1, 'baz': False},
+            {'foo': 'def', 'bar': 2, 'baz': True},
+        ]
+
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('dict', columns, as_structures=True)
+            sda_file.insert('frame', DataFrame(columns), as_structures=True)
+            for label in ('dict', 'frame'):
+                with sda_file._h5file('r') as h5file:
+                    record_type = get_record_type(h5file[label].attrs)
+                    self.assertEqual(record_type, 'structures')
+                assert_equal(sda_file.extract(label), expected)
+
+            # Without as_structures, a dict is a structure
+            sda_file.insert('structure', columns)
+            self.assertEqual(
+                sda_file.probe().loc['structure', 'RecordType'], 'structure'
+            )
+
+            with self.assertRaises(ValueError):
+                sda_file.insert('bad', DataFrame(columns))
+
     def test_from_file(self):
 
         with temporary_file() as file_path:
@@ -379,6 +455,240 @@ class TestSDAFileExtract(unittest.TestCase):
                 assert_equal(extracted.col, expected.col)
                 assert_equal(extracted.data, expected.data)
 
+    def test_sparse_format(self):
+        test_set = TEST_SPARSE + TEST_SPARSE_COMPLEX
+
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+
+            for i, data in enumerate(test_set):
+                label = "test" + str(i)
+                sda_file.insert(label, data, '', i % 10)
+                for fmt in ('coo', 'csr', 'csc'):
+                    extracted = sda_file.extract(label, sparse_format=fmt)
+                    self.assertEqual(extracted.format, fmt)
+                    self.assertEqual(extracted.shape, data.shape)
+                    self.assertEqual(extracted.dtype, data.dtype)
+                    assert_equal(extracted.toarray(), data.toarray())
+
+            with self.assertRaises(ValueError):
+                sda_file.extract('test0', sparse_format='lil')
+
+    def test_sparse_rows(self):
+        data = random_sparse(
+            200, 30, density=0.1, format='csr', random_state=0
+        )
+        data_complex = data * (1 - 2j)
+        dense = data.toarray()
+        dense_complex = data_complex.toarray()
+
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('plain', data)
+            sda_file.insert('indexed', data, row_index=True)
+            sda_file.insert('indexed_coo', data.tocoo(), row_index=True)
+            sda_file.insert('complex', data_complex, row_index=True)
+
+            with sda_file._h5file('r') as h5file:
+                attrs = h5file['indexed/indexed'].attrs
+                self.assertEqual(attrs['RowIndexStep'], 1)
+                assert_array_equal(attrs['RowIndex'], data.indptr)
+
+            for rows in [slice(0, 10), slice(57, 123), slice(190, None),
+                         slice(None), slice(20, 10), slice(-5, None)]:
+                expected = dense[rows]
+                for label in ('plain', 'indexed', 'indexed_coo'):
+                    extracted = sda_file.extract(label, 'csr', rows=rows)
+                    self.assertEqual(extracted.format, 'csr')
+                    assert_array_equal(extracted.toarray(), expected)
+                extracted = sda_file.extract('complex', rows=rows)
+                assert_array_equal(extracted.toarray(), dense_complex[rows])
+
+            with self.assertRaises(ValueError):
+                sda_file.extract('indexed', rows=slice(0, 10, 2))
+
+            sda_file.insert('dense', dense)
+            with self.assertRaises(ValueError):
+                sda_file.extract('dense', rows=slice(0, 10))
+
+            with self.assertRaises(ValueError):
+                sda_file.insert('bad', dense, row_index=True)
+
+    def test_extract_columnar(self):
+        from pandas import DataFrame
+
+        columns = {
+            'foo': np.array(['a', 'bc', 'def']),
+            'bar': np.arange(3),
+            'baz': np.array([True, False, True]),
+            'qux': np.arange(12.0).reshape(3, 2, 2),
+            'quux': np.arange(3) * (1 + 1j),
+            'corge': np.array([1.0, np.nan, 3.0]),
+        }
+
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('columns', columns, as_structures=True)
+            sda_file.insert(
+                'list', sda_file.extract('columns'), as_structures=True,
+            )
+
+            for label in ('columns', 'list'):
+                extracted = sda_file.extract(label, columnar=True)
+                self.assertEqual(sorted(extracted), sorted(columns))
+                for key, column in columns.items():
+                    self.assertEqual(extracted[key].shape, column.shape)
+                    assert_equal(extracted[key], column)
+                self.assertEqual(extracted['baz'].dtype, bool)
+                self.assertEqual(extracted['foo'].dtype, object)
+
+            frame = sda_file.extract('columns', columnar='frame')
+            self.assertIsInstance(frame, DataFrame)
+            assert_equal(frame['bar'].to_numpy(), columns['bar'])
+            assert_equal(list(frame['qux']), list(columns['qux']))
+
+            # Inhomogeneous fields fail
+            data = [{'a': np.arange(2)}, {'a': np.arange(3)}]
+            sda_file.insert('ragged', data)
+            with sda_file._h5file('r+') as h5file:
+                set_encoded(h5file['ragged'].attrs, RecordType='structures')
+            with self.assertRaises(ValueError):
+                sda_file.extract('ragged', columnar=True)
+
+            sda_file.insert('structure', {'a': 1})
+            with self.assertRaises(ValueError):
+                sda_file.extract('structure', columnar=True)
+
+            sda_file.insert('nested', [{'a': {'b': 1}}], as_structures=True)
+            with self.assertRaises(ValueError):
+                sda_file.extract('nested', columnar=True)
+
+            # Unknown columnar options fail
+            for columnar in ('dict', 1, 'False'):
+                with self.assertRaises(ValueError):
+                    sda_file.extract('columns', columnar=columnar)
+
+            # Conflicting options fail
+            conflicts = [
+                dict(columnar=True, stack=True),
+                dict(columnar='frame', rows=slice(0, 1)),
+                dict(stack=True, rows=slice(0, 1)),
+            ]
+            for kw in conflicts:
+                with self.assertRaises(ValueError):
+                    sda_file.extract('columns', **kw)
+
+    def test_extract_stack(self):
+        waveforms = np.arange(24.0).reshape(4, 6)
+
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('list', list(waveforms))
+            extracted = sda_file.extract('list', stack=True)
+            self.assertTrue(extracted.flags.c_contiguous)
+            assert_equal(extracted, waveforms)
+
+            sda_file.insert('scalars', [1, 2, 3])
+            assert_equal(sda_file.extract('scalars', stack=True), [1, 2, 3])
+
+            sda_file.insert('logical', [[True, False]] * 2)
+            with self.assertRaises(ValueError):
+                # nested cells are not numeric
+                sda_file.extract('logical', stack=True)
+            sda_file.insert('bools', [np.array([True, False])] * 3)
+            extracted = sda_file.extract('bools', stack=True)
+            self.assertEqual(extracted.dtype, bool)
+            assert_equal(extracted, [[True, False]] * 3)
+
+            sda_file.insert('complex', [np.arange(3) * 1j] * 2)
+            assert_equal(
+                sda_file.extract('complex', stack=True),
+                [np.arange(3) * 1j] * 2,
+            )
+
+            # Cells with 2D shape keep it
+            data = np.empty((2, 3), dtype=object)
+            for idx in np.ndindex(data.shape):
+                data[idx] = np.arange(4) + 10 * idx[0] + idx[1]
+            sda_file.insert('grid', data)
+            extracted = sda_file.extract('grid', stack=True)
+            self.assertEqual(extracted.shape, (2, 3, 4))
+            for idx in np.ndindex(data.shape):
+                assert_equal(extracted[idx], data[idx])
+
+            sda_file.insert('ragged', [np.arange(2), np.arange(3)])
+            with self.assertRaises(ValueError):
+                sda_file.extract('ragged', stack=True)
+
+            # Empty elements are not filled in
+            sda_file.insert('empty', [1.0, np.nan])
+            with self.assertRaises(ValueError):
+                sda_file.extract('empty', stack=True)
+            sda_file.insert('empties', [np.array([])] * 2)
+            with self.assertRaises(ValueError):
+                sda_file.extract('empties', stack=True)
+
+            sda_file.insert('strings', ['a', 'b'])
+            with self.assertRaises(ValueError):
+                sda_file.extract('strings', stack=True)
+
+            sda_file.insert('numeric', np.arange(3))
+            with self.assertRaises(ValueError):
+                sda_file.extract('numeric', stack=True)
+
+    def test_deep_nesting(self):
+        # Nesting deeper than the recursion limit
+        depth = sys.getrecursionlimit() + 10
+        data = np.arange(3.0)
+        for i in range(depth):
+            data = [data] if i % 2 else {'a': data, 'b': True}
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('deep', data)
+            extracted = sda_file.extract('deep')
+        for i in reversed(range(depth)):
+            if i % 2:
+                self.assertEqual(len(extracted), 1)
+                extracted = extracted[0]
+            else:
+                self.assertTrue(extracted['b'])
+                extracted = extracted['a']
+        assert_equal(extracted, np.arange(3.0))
+
+    def test_path(self):
+        data = {
+            'diagnostics': [np.arange(3.0), {'A1': np.eye(2), 'B': 'text'}],
+            'flag': True,
+        }
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('shot12', data)
+            sda_file.insert('sparse', coo_matrix(np.eye(3)))
+
+            assert_equal(
+                sda_file.extract_path('shot12/diagnostics/element 2/A1'),
+                np.eye(2),
+            )
+            self.assertEqual(
+                sda_file.extract_path('/shot12/diagnostics/element 2/B/'),
+                'text',
+            )
+            self.assertTrue(sda_file.extract_path('shot12/flag'))
+            assert_equal(
+                sda_file.extract_path('shot12/diagnostics/element 2'),
+                data['diagnostics'][1],
+            )
+            assert_equal(sda_file.extract_path('shot12'), data)
+            extracted = sda_file.extract_path('sparse', 'csr')
+            self.assertEqual(extracted.format, 'csr')
+
+            for path in ('shot12/missing', 'shot12/flag/flag', 'missing/A',
+                         'shot12\\flag', 'sparse/sparse'):
+                with self.assertRaises(ValueError):
+                    sda_file.extract_path(path)
+            with self.assertRaises(ValueError):
+                sda_file.extract_path('sparse', 'dok')
+
     def test_to_file(self):
         with temporary_file() as file_path:
             sda_file = SDAFile(file_path, 'w')
@@ -464,6 +774,122 @@ class TestSDAFileDescribe(unittest.TestCase):
 
 class TestSDAFileMisc(unittest.TestCase):
 
+    def test_index(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('l0', [0])
+            index = sda_file.index()
+            self.assertEqual(list(index), ['l0'])
+            self.assertIs(sda_file.index(), index)
+            self.assertEqual(index['l0'].record_type, 'cell')
+
+            # Writes through the SDAFile invalidate the index
+            sda_file.insert('l1', 1.0)
+            self.assertEqual(sda_file.labels(), ['l0', 'l1'])
+            sda_file.describe('l1', 'new description')
+            self.assertEqual(
+                sda_file.index()['l1'].description, 'new description',
+            )
+            sda_file.remove('l0')
+            self.assertEqual(sda_file.labels(), ['l1'])
+
+            # So do changes to the file by others
+            index = sda_file.index()
+            with h5py.File(file_path, 'a') as h5file:
+                h5file.create_dataset('other', data=np.arange(1000))
+            self.assertIsNot(sda_file.index(), index)
+            self.assertIn('other', sda_file.labels())
+
+            # The cached index serves label validation
+            index = sda_file.index()
+            with self.assertRaises(ValueError):
+                sda_file.extract('missing')
+            with self.assertRaises(ValueError):
+                sda_file.insert('l1', 2.0)
+            self.assertIs(sda_file.index(), index)
+
+    def test_index_replaced_file(self):
+        with temporary_file() as file_path, temporary_file() as other_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('l0', 1.0)
+            self.assertEqual(sda_file.labels(), ['l0'])
+
+            # Replace the file, keeping its modification time
+            other = SDAFile(other_path, 'w')
+            other.insert('l1', 1.0)
+            stat = os.stat(file_path)
+            os.replace(other_path, file_path)
+            os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual(sda_file.labels(), ['l1'])
+
+    def test_index_sidecar(self):
+        with temporary_file() as file_path:
+            path = file_path + '.sdaidx'
+            try:
+                sda_file = SDAFile(file_path, 'w', sidecar=True)
+                sda_file.insert('l0', [0, 1])
+                self.assertFalse(os.path.exists(path))
+                self.assertEqual(sda_file.labels(), ['l0'])
+                self.assertTrue(os.path.exists(path))
+
+                umask = os.umask(0)
+                os.umask(umask)
+                self.assertEqual(
+                    os.stat(path).st_mode & 0o777, 0o666 & ~umask,
+                )
+
+                # Without a cached index, it is loaded from the sidecar
+                sda_file._index = None
+                with patch('sdafile.sda_file.build_index') as build_index:
+                    self.assertEqual(sda_file.labels(), ['l0'])
+                    rec = sda_file['l0']
+                    self.assertEqual(rec.shape, (2,))
+                    self.assertFalse(build_index.called)
+
+                # Lazy records of a new SDAFile are served from the sidecar
+                sda_file = SDAFile(file_path, 'r', sidecar=True)
+                with patch('sdafile.sda_file.build_index') as build_index:
+                    rec = sda_file['l0']
+                    self.assertEqual(rec.shape, (2,))
+                    assert_equal(sda_file.extract('l0'), [0, 1])
+                    self.assertFalse(build_index.called)
+                self.assertIsNotNone(sda_file._get_cached_index())
+                sda_file = SDAFile(file_path, 'a', sidecar=True)
+
+                # The sidecar is rebuilt after changes
+                sda_file.insert('l1', 1.0)
+                self.assertEqual(sda_file.labels(), ['l0', 'l1'])
+                sda_file._index = None
+                with patch('sdafile.sda_file.build_index') as build_index:
+                    self.assertEqual(sda_file.labels(), ['l0', 'l1'])
+                    self.assertFalse(build_index.called)
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def test_h5file(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('l0', np.arange(3.0))
+            with sda_file.h5file() as h5file:
+                assert_equal(h5file['l0/l0'][:, 0], np.arange(3.0))
+                self.assertEqual(h5file.mode, 'r')
+            with sda_file.h5file('a') as h5file:
+                h5file['l0/l0'][:] = 1.0
+            assert_equal(sda_file.extract('l0'), np.ones(3))
+
+            # Other threads wait while the file is written
+            lock = sda_file._lock
+            with sda_file.h5file('a'):
+                self.assertTrue(lock.is_writer())
+            with sda_file.h5file():
+                self.assertFalse(lock.is_writer())
+
+            with self.assertRaises(ValueError):
+                sda_file.h5file('w')
+            with self.assertRaises(IOError):
+                SDAFile(file_path, 'r').h5file('a')
+
     def test_labels(self):
         with temporary_file() as file_path:
             sda_file = SDAFile(file_path, 'w')
@@ -565,6 +991,54 @@ class TestSDAFileMisc(unittest.TestCase):
             assert_array_equal(state['Description'], labels[4:])
             assert_array_equal(state['Deflate'], [0, 1])
 
+    def test_probe_storage(self):
+        storage_cols = [
+            'StorageSize', 'LogicalSize', 'CompressionRatio', 'Layout',
+            'Chunks', 'Leaves', 'Offset',
+        ]
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('compressed', np.zeros((1000, 10)), '', 5)
+            data = [np.arange(3.0), 'text', [np.ones(2, bool)]]
+            sda_file.insert('cell', data)
+            sda_file.insert('empty', [])
+
+            state = sda_file.probe(storage=True)
+            self.assertEqual(list(state.columns[-7:]), storage_cols)
+
+            row = state.loc['compressed']
+            self.assertEqual(row['LogicalSize'], 80000)
+            self.assertGreater(row['StorageSize'], 0)
+            self.assertGreater(row['CompressionRatio'], 10)
+            self.assertEqual(row['Layout'], 'chunked')
+            self.assertEqual(row['Leaves'], 1)
+            self.assertGreater(row['Offset'], 0)
+
+            row = state.loc['cell']
+            self.assertEqual(row['LogicalSize'], 3 * 8 + 4 + 2)
+            self.assertEqual(row['Leaves'], 3)
+            self.assertEqual(row['Layout'], 'chunked')
+
+            row = state.loc['empty']
+            self.assertEqual(row['Leaves'], 0)
+            self.assertEqual(row['Layout'], '')
+
+            summary = sda_file.storage_summary()
+            self.assertEqual(summary['Records'], 3)
+            self.assertEqual(
+                summary['StorageSize'], state['StorageSize'].sum(),
+            )
+            self.assertEqual(
+                summary['LogicalSize'], state['LogicalSize'].sum(),
+            )
+            self.assertEqual(summary['FileSize'], os.path.getsize(file_path))
+            self.assertEqual(
+                summary['Unaccounted'],
+                summary['FileSize'] - summary['StorageSize'] -
+                summary['FreeSpace'],
+            )
+            self.assertGreater(summary['Unaccounted'], 0)
+
 
 class TestSDAFileReplaceUpdate(unittest.TestCase):
 
@@ -592,6 +1066,72 @@ class TestSDAFileReplaceUpdate(unittest.TestCase):
 
             self.assertNotEqual(sda_file.Updated, 'Unmodified')
 
+    def test_write_path(self):
+        data = {
+            'params': [np.arange(4.0), {'A1': np.eye(2), 'on': True}],
+            'name': 'abc',
+            'z': 1j,
+        }
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('shot12', data, 'description', 1)
+            sda_file.insert('top', np.arange(3))
+            sda_file.insert('small', np.arange(2, dtype=np.int8))
+            sda_file.insert('single', np.arange(2, dtype=np.float32))
+            complex_data = np.arange(6).reshape(2, 3) * (1 + 1j)
+            sda_file.insert('complex', complex_data)
+
+            sda_file.write_path('shot12/params/element 2/A1', np.ones((2, 2)))
+            sda_file.write_path('shot12/params/element 2/on', False)
+            sda_file.write_path('shot12/params/element 1', np.arange(4, 8))
+            sda_file.write_path('shot12/name', 'xyz')
+            sda_file.write_path('shot12/z', 2 + 3j)
+            sda_file.write_path('top', np.array([5, 6, 7]))
+            sda_file.write_path('small', np.array([-128, 127]))
+            sda_file.write_path('single', np.array([0.1, -np.inf]))
+            sda_file.write_path('complex', complex_data * 2)
+
+            extracted = sda_file.extract('shot12')
+            assert_equal(extracted['params'][0], np.arange(4.0, 8.0))
+            assert_equal(extracted['params'][1]['A1'], np.ones((2, 2)))
+            self.assertFalse(extracted['params'][1]['on'])
+            self.assertEqual(extracted['name'], 'xyz')
+            self.assertEqual(extracted['z'], 2 + 3j)
+            assert_equal(sda_file.extract('top'), [5, 6, 7])
+            assert_equal(sda_file.extract('small'), [-128, 127])
+            assert_equal(
+                sda_file.extract('single'), np.float32([0.1, -np.inf]),
+            )
+            assert_equal(sda_file.extract('complex'), complex_data * 2)
+            with sda_file._h5file('r') as h5file:
+                attrs = get_decoded(h5file['shot12'].attrs)
+            self.assertEqual(attrs['Description'], 'description')
+            self.assertEqual(attrs['Deflate'], 1)
+
+            bad = [
+                ('shot12/params/element 2/A1', np.ones((3, 3))),  # shape
+                ('shot12/params/element 2/A1', True),  # record type
+                ('shot12/params/element 1', np.arange(4) * 1j),  # complex
+                ('shot12/params/element 1', np.full(4, 'a')),  # unsupported
+                ('top', np.arange(3.5)),  # unsafe cast
+                ('small', np.array([300, 2])),  # overflow
+                ('small', np.array([-1.0, 2.0])),  # unsafe cast
+                ('single', np.array([1e300, 2.0])),  # overflow
+                ('shot12/name', 'abcd'),  # shape
+                ('complex', complex_data.reshape(3, 2)),  # complex shape
+                ('shot12/params', [1, 2]),  # not simple
+                ('shot12/params/element 2', np.arange(2)),  # composite
+                ('shot12/missing', 1),  # missing
+                ('top', coo_matrix(np.eye(3))),  # sparse
+            ]
+            for path, value in bad:
+                with self.assertRaises(ValueError):
+                    sda_file.write_path(path, value)
+
+            sda_file.Writable = 'no'
+            with self.assertRaises(IOError):
+                sda_file.write_path('top', np.arange(3))
+
     def test_update_object_on_non_object(self):
         reference_path = data_path('SDAreference.sda')
         with temporary_file() as file_path:
@@ -732,3 +1272,232 @@ class TestSDAFileReplaceUpdate(unittest.TestCase):
             # Replace some stuff with a non-dictionary
             with self.assertRaises(ValueError):
                 sda_file.update_objects(label, 'hello')
+
+
+def _stream_rows(file_path, started):
+    """ Append rows to a stream file, as a SWMR writer process. """
+    with SDAFile(file_path, 'a', swmr=True) as sda_file:
+        sda_file.flush_interval = 0
+        sda_file.append('time', 0.0)
+        started.set()
+        for i in range(1, 6):
+            sda_file.append('time', [float(i)])
+            sda_file.append('frames', np.full((2, 3), i))
+            time.sleep(0.02)
+
+
+class TestSDAFileStream(unittest.TestCase):
+
+    def test_append_single_row(self):
+        # A stream with one row is not mistaken for a 1D record
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.create_stream('xyz', row_shape=(3,))
+            sda_file.create_stream('x', row_shape=(1,))
+            sda_file.create_stream('t')
+
+            self.assertEqual(sda_file.append('xyz', [1.0, 2.0, 3.0]), 1)
+            self.assertEqual(sda_file.append('xyz', [4.0, 5.0, 6.0]), 2)
+            assert_equal(
+                sda_file.extract('xyz'), np.arange(1.0, 7.0).reshape(2, 3),
+            )
+            self.assertEqual(sda_file.append('x', [1.0]), 1)
+            self.assertEqual(sda_file.append('x', [2.0]), 2)
+            self.assertEqual(sda_file.append('t', 1.0), 1)
+            self.assertEqual(sda_file.append('t', 2.0), 2)
+            assert_equal(sda_file.extract('t'), [1.0, 2.0])
+
+            rows = sda_file.refresh(['xyz', 'x', 't'])
+            assert_equal(rows['xyz'], np.arange(1.0, 7.0).reshape(2, 3))
+            assert_equal(rows['x'], [[1.0], [2.0]])
+            assert_equal(rows['t'], [1.0, 2.0])
+
+    def test_append(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('vector', np.arange(3.0))
+            sda_file.insert('matrix', np.arange(6).reshape(2, 3))
+            sda_file.insert('flags', np.array([True, False]))
+            sda_file.insert('empty', np.array([]))
+            sda_file.insert('text', 'abc')
+            sda_file.create_stream('stream', (2, 2), np.float32, 'Frames')
+
+            self.assertEqual(sda_file.append('vector', 3.0), 4)
+            self.assertEqual(sda_file.append('vector', [4.0, 5.0]), 6)
+            assert_equal(sda_file.extract('vector'), np.arange(6.0))
+            self.assertEqual(sda_file.append('matrix', [6, 7, 8]), 3)
+            assert_equal(
+                sda_file.extract('matrix'), np.arange(9).reshape(3, 3),
+            )
+            sda_file.append('flags', [True])
+            assert_equal(sda_file.extract('flags'), [True, False, True])
+
+            record = sda_file['stream']
+            self.assertEqual(record.shape, (0, 2, 2))
+            self.assertEqual(record.dtype, np.float32)
+            self.assertEqual(record.description, 'Frames')
+            self.assertFalse(record.empty)
+            sda_file.append('stream', np.ones((2, 2, 2)))
+            sda_file.append('stream', np.eye(2))
+            extracted = sda_file.extract('stream')
+            self.assertEqual(extracted.shape, (3, 2, 2))
+            assert_equal(extracted[2], np.eye(2))
+
+            bad = [
+                ('matrix', [1, 2]),  # row shape
+                ('matrix', [1.5, 2.5, 3.5]),  # unsafe cast
+                ('empty', 1.0),  # empty
+                ('text', 'd'),  # record type
+                ('missing', 1.0),  # missing
+            ]
+            for label, rows in bad:
+                with self.assertRaises(ValueError):
+                    sda_file.append(label, rows)
+            with self.assertRaises(ValueError):
+                sda_file.create_stream('complex', dtype=np.complex128)
+
+            # Refresh returns only the rows added since the last refresh
+            rows = sda_file.refresh()
+            self.assertEqual(
+                list(rows), ['flags', 'matrix', 'stream', 'vector'],
+            )
+            assert_equal(rows['vector'], np.arange(6.0))
+            self.assertEqual(sda_file.refresh(), {})
+            sda_file.append('vector', 6.0)
+            rows = sda_file.refresh(['vector', 'matrix'])
+            self.assertEqual(list(rows), ['vector'])
+            assert_equal(rows['vector'], [6.0])
+            self.assertEqual(sda_file.refresh('vector'), {})
+
+    def test_swmr(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w', swmr=True)
+            sda_file.create_stream('time', description='Time')
+            sda_file.create_stream('frames', (3,), np.int32, chunk_rows=4)
+            sda_file.insert('static', 'text')
+
+            started = multiprocessing.Event()
+            writer = multiprocessing.Process(
+                target=_stream_rows, args=(file_path, started),
+            )
+            writer.start()
+            try:
+                self.assertTrue(started.wait(10))
+                with SDAFile(file_path, 'r', swmr=True) as reader:
+                    self.assertEqual(
+                        reader.labels(), ['frames', 'static', 'time'],
+                    )
+                    received = {'time': [], 'frames': []}
+                    for rows in reader.follow(interval=0.005, timeout=2):
+                        for label, new in rows.items():
+                            received[label].extend(new.tolist())
+                        if len(received['time']) == 6:
+                            break
+            finally:
+                writer.join()
+            self.assertEqual(writer.exitcode, 0)
+            self.assertEqual(received['time'], [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+
+            sda_file = SDAFile(file_path, 'r')
+            assert_equal(sda_file.extract('time'), np.arange(6.0))
+            frames = sda_file.extract('frames')
+            self.assertEqual(frames.shape, (10, 3))
+            assert_equal(frames[-1], [5, 5, 5])
+
+            # Records cannot be created or changed while streaming
+            sda_file = SDAFile(file_path, 'a', swmr=True)
+            sda_file.append('time', 6.0)
+            with self.assertRaises(IOError):
+                sda_file.insert('new', 1.0)
+            with self.assertRaises(IOError):
+                sda_file.create_stream('new')
+            assert_equal(sda_file.extract('time'), np.arange(7.0))
+            sda_file.close()
+            sda_file.insert('new', 1.0)
+            self.assertEqual(sda_file.extract('new'), 1.0)
+
+    def test_swmr_old_format(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('time', np.arange(3.0))
+            sda_file = SDAFile(file_path, 'a', swmr=True)
+            with self.assertRaises(IOError):
+                sda_file.append('time', 3.0)
+
+
+class TestSDAFileThreads(unittest.TestCase):
+
+    def test_shared_between_threads(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            for i in range(8):
+                sda_file.insert('read{}'.format(i), np.full(1000, float(i)))
+
+            def read(i):
+                return sda_file.extract('read{}'.format(i % 8)).sum()
+
+            def write(i):
+                sda_file.insert('write{}'.format(i), np.arange(100.0))
+                sda_file.replace('write{}'.format(i), np.arange(10.0))
+
+            with ThreadPoolExecutor(8) as executor:
+                writes = [executor.submit(write, i) for i in range(8)]
+                sums = list(executor.map(read, range(64)))
+                for future in writes:
+                    future.result()
+
+            self.assertEqual(sums, [1000.0 * (i % 8) for i in range(64)])
+            self.assertEqual(len(sda_file.labels()), 16)
+            assert_array_equal(sda_file.extract('write7'), np.arange(10.0))
+            # The shared handle is closed when no thread uses it
+            self.assertIsNone(sda_file._handle)
+
+    def test_concurrent_refresh(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.create_stream('time')
+            sda_file.append('time', np.arange(1000.0))
+
+            with ThreadPoolExecutor(8) as executor:
+                results = list(executor.map(
+                    lambda _: sda_file.refresh('time'), range(8)
+                ))
+            rows = [result['time'] for result in results if result]
+            # The rows are returned once, to one of the threads
+            self.assertEqual(len(rows), 1)
+            assert_array_equal(rows[0], np.arange(1000.0))
+
+    def test_shared_read_handle(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('test', np.arange(3.0))
+            with sda_file._h5file('r') as h5file:
+                with sda_file._h5file('r') as other:
+                    self.assertIs(other, h5file)
+                with self.assertRaises(RuntimeError):
+                    sda_file.insert('other', 1.0)
+
+
+class TestSDAFileIterRecords(unittest.TestCase):
+
+    def test_iter_records(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            for i in range(5):
+                sda_file.insert('data{}'.format(i), np.full(10, float(i)))
+            sda_file.insert('text', 'hello')
+
+            for prefetch in (0, 2):
+                records = list(sda_file.iter_records(prefetch=prefetch))
+                self.assertEqual(
+                    [label for label, _ in records], sda_file.labels()
+                )
+                assert_array_equal(records[3][1], np.full(10, 3.0))
+                self.assertEqual(records[-1][1], 'hello')
+
+            records = sda_file.iter_records(['text', 'data1'], max_bytes=1)
+            self.assertEqual(next(records), ('text', 'hello'))
+            records.close()
+
+            with self.assertRaises(ValueError):
+                next(sda_file.iter_records(['missing']))
@@ -0,0 +1,104 @@
+import json
+import multiprocessing
+import os
+import os.path as op
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from sdafile.sda_file import SDAFile
+from sdafile.shards import ShardedArchive, consolidate
+from sdafile.testing import temporary_directory
+
+
+def _produce(args):
+    """ Write the channels of one producer to its shard. """
+    manifest, producer = args
+    archive = ShardedArchive(manifest)
+    for i in range(3):
+        label = 'ch{}_{}'.format(producer, i)
+        archive.insert(label, np.full(4, 10.0 * producer + i), label)
+    return producer
+
+
+class TestShardedArchive(unittest.TestCase):
+
+    def test_parallel_ingest(self):
+        with temporary_directory() as directory:
+            manifest = op.join(directory, 'ingest.json')
+            rules = [('ch{}_'.format(i), i) for i in range(4)]
+            archive = ShardedArchive.create(manifest, 4, rules)
+            self.assertEqual(archive.shards, [
+                op.join(directory, 'ingest_shard{}.sda'.format(i))
+                for i in range(4)
+            ])
+            with open(manifest) as f:
+                content = json.load(f)
+            self.assertEqual(content['shards'][0], 'ingest_shard0.sda')
+            self.assertEqual(archive.shard_of('ch2_7'), 2)
+
+            pool = multiprocessing.Pool(4)
+            try:
+                producers = pool.map(
+                    _produce, [(manifest, i) for i in range(4)],
+                )
+            finally:
+                pool.close()
+                pool.join()
+            self.assertEqual(producers, [0, 1, 2, 3])
+            self.assertEqual(
+                archive.shard(1, 'r').labels(), ['ch1_0', 'ch1_1', 'ch1_2'],
+            )
+
+            # Labels without a rule are written to a shard by hash
+            archive = ShardedArchive(manifest)
+            shard = archive.shard_of('other')
+            self.assertEqual(shard, ShardedArchive(manifest).shard_of('other'))
+            archive.insert('other', 'text', 'Other record')
+            self.assertIn('other', archive.shard(shard, 'r').labels())
+
+            with archive.file_set() as file_set:
+                self.assertEqual(len(file_set), 13)
+                assert_equal(file_set.extract('ch3_1'), np.full(4, 31.0))
+
+            target = op.join(directory, 'ingest.sda')
+            archive.consolidate(target)
+            # The target has the permissions of a new file, like the shards
+            self.assertEqual(
+                os.stat(target).st_mode, os.stat(archive.shards[0]).st_mode,
+            )
+            sda_file = SDAFile(target, 'r')
+            self.assertEqual(len(sda_file.labels()), 13)
+            assert_equal(sda_file.extract('ch2_2'), np.full(4, 22.0))
+            self.assertEqual(sda_file.extract('other'), 'text')
+            self.assertEqual(sda_file['ch0_1'].description, 'ch0_1')
+
+            with self.assertRaises(IOError):
+                consolidate(manifest, target)
+
+            # Labels must be unique across shards
+            archive.shard((shard + 1) % 4).insert('other', 1.0)
+            with self.assertRaises(ValueError):
+                consolidate(manifest, target, overwrite=True)
+            self.assertEqual(len(SDAFile(target, 'r').labels()), 13)
+
+    def test_create(self):
+        with temporary_directory() as directory:
+            manifest = op.join(directory, 'archive.json')
+            with self.assertRaises(ValueError):
+                ShardedArchive.create(manifest, 0)
+            with self.assertRaises(ValueError):
+                ShardedArchive.create(manifest, 2, [('a', 2)])
+            ShardedArchive.create(manifest, 2)
+            with self.assertRaises(IOError):
+                ShardedArchive.create(manifest, 2)
+            ShardedArchive.create(manifest, 1, overwrite=True)
+            self.assertEqual(len(ShardedArchive(manifest).shards), 1)
+
+            with open(manifest, 'w') as f:
+                f.write('{}')
+            with self.assertRaises(ValueError):
+                ShardedArchive(manifest)
+            with self.assertRaises(IOError):
+                ShardedArchive(op.join(directory, 'missing.json'))
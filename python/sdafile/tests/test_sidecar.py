@@ -0,0 +1,69 @@
+import os
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from sdafile.index import build_index
+from sdafile.sda_file import SDAFile
+from sdafile.sidecar import read_sidecar, sidecar_path, write_sidecar
+from sdafile.testing import temporary_file
+
+
+class TestSidecar(unittest.TestCase):
+
+    def test_round_trip(self):
+        with temporary_file() as file_path:
+            sda_file = SDAFile(file_path, 'w')
+            sda_file.insert('numeric', np.arange(6.0).reshape(2, 3), 'desc')
+            sda_file.insert('complex', np.arange(3) * 1j)
+            sda_file.insert('cell', [1.0, 'two', {'a': np.arange(5)}])
+            sda_file.insert('structure', {'a': True, 'b': 'text'}, '', 1)
+            with sda_file._h5file('r') as h5file:
+                index = build_index(h5file)
+
+            path = sidecar_path(file_path)
+            self.assertEqual(path, file_path + '.sdaidx')
+            key = (100, 1234500000000, '01-Jan-2020 00:00:00')
+            try:
+                write_sidecar(path, key, index)
+                directory = os.path.dirname(os.path.abspath(path))
+                leftovers = [
+                    name for name in os.listdir(directory)
+                    if name.startswith(os.path.basename(path))
+                ]
+                self.assertEqual(leftovers, [os.path.basename(path)])
+
+                loaded = read_sidecar(path, key)
+                self.assertEqual(list(loaded), list(index))
+                for label, entry in index.items():
+                    other = loaded[label]
+                    for field in entry._fields:
+                        if field == 'attrs':
+                            self.assertEqual(
+                                sorted(other.attrs), sorted(entry.attrs),
+                            )
+                            for attr, value in entry.attrs.items():
+                                assert_equal(other.attrs[attr], value)
+                                self.assertEqual(
+                                    type(other.attrs[attr]), type(value),
+                                )
+                        else:
+                            self.assertEqual(
+                                getattr(other, field), getattr(entry, field),
+                            )
+
+                # The sidecar only serves the archive state it was built for
+                self.assertIsNone(read_sidecar(path, (101,) + key[1:]))
+                self.assertIsNone(
+                    read_sidecar(path, key[:2] + ('02-Jan-2020 00:00:00',))
+                )
+
+                # Unreadable sidecars are ignored
+                with open(path, 'wb') as f:
+                    f.write(b'not a database')
+                self.assertIsNone(read_sidecar(path, key))
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.assertIsNone(read_sidecar(path, key))
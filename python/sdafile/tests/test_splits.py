@@ -0,0 +1,128 @@
+import os
+import os.path as op
+import unittest
+
+import h5py
+import numpy as np
+
+from sdafile.sda_file import SDAFile
+from sdafile.splits import SPLIT_LABEL, merge_splits, split
+from sdafile.testing import temporary_directory
+
+
+class TestSplits(unittest.TestCase):
+
+    def test_split_and_merge(self):
+        with temporary_directory() as directory:
+            path = op.join(directory, 'data.sda')
+            data = np.random.bytes(300000)
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            max_bytes = 2 ** 17
+            parts = split(path, max_bytes, chunk_size=10000)
+            self.assertGreater(len(parts), 2)
+            names = [op.basename(part) for part in parts]
+            self.assertEqual(
+                names,
+                ['data_file{}.sda'.format(i)
+                 for i in range(1, len(parts) + 1)],
+            )
+            for part in parts:
+                self.assertLessEqual(op.getsize(part), max_bytes)
+
+            # Parts are valid SDA files with one 'split' record
+            sda_file = SDAFile(parts[0], 'r')
+            self.assertEqual(sda_file.labels(), [SPLIT_LABEL])
+            with h5py.File(parts[0], 'r') as h5file:
+                grp = h5file[SPLIT_LABEL]
+                self.assertEqual(grp.attrs['RecordType'], 'split')
+                self.assertEqual(
+                    grp.attrs['FieldNames'],
+                    'Bytes Checksum OriginalName SplitFiles',
+                )
+                self.assertEqual(grp['Bytes'].ndim, 2)
+
+            with self.assertRaises(IOError):
+                split(path, max_bytes)
+            with self.assertRaises(IOError):
+                merge_splits(parts[1])
+
+            target = op.join(directory, 'merged.sda')
+            self.assertEqual(
+                merge_splits(parts[-1], target, chunk_size=7000), target,
+            )
+            with open(target, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            self.assertEqual(
+                os.stat(target).st_mode, os.stat(parts[0]).st_mode,
+            )
+
+            # The original file is restored by default
+            os.remove(path)
+            self.assertEqual(merge_splits(parts[1]), path)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+            # Corrupt data is detected
+            with h5py.File(parts[1], 'r+') as h5file:
+                h5file[SPLIT_LABEL]['Bytes'][0] ^= 1
+            with self.assertRaises(ValueError):
+                merge_splits(parts[0], target, overwrite=True)
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                sorted(names + ['data.sda', 'merged.sda']),
+            )
+
+            os.remove(parts[-1])
+            with self.assertRaises(IOError):
+                merge_splits(parts[0], target, overwrite=True)
+
+            with self.assertRaises(ValueError):
+                split(path, 2 ** 14)
+
+    def test_empty(self):
+        with temporary_directory() as directory:
+            path = op.join(directory, 'empty')
+            open(path, 'wb').close()
+            parts = split(path, 2 ** 20)
+            self.assertEqual(parts, [op.join(directory, 'empty_file1.sda')])
+            target = op.join(directory, 'merged')
+            merge_splits(parts[0], target)
+            self.assertEqual(op.getsize(target), 0)
+
+    def test_merge_matlab(self):
+        # Parts written by MATLAB hold the bytes as a row and no checksum
+        with temporary_directory() as directory:
+            data = np.random.bytes(1000)
+            names = ['mydata_file1.sda', 'mydata_file2.sda']
+            for i, name in enumerate(names):
+                sda_file = SDAFile(op.join(directory, name), 'w')
+                sda_file.insert(SPLIT_LABEL, {
+                    'OriginalName': 'mydata',
+                    'SplitFiles': names,
+                })
+                chunk = np.frombuffer(data[i * 500:(i + 1) * 500], np.uint8)
+                with h5py.File(sda_file.name, 'r+') as h5file:
+                    grp = h5file[SPLIT_LABEL]
+                    grp['Bytes'] = chunk.reshape(1, -1)
+                    for attr, value in (('RecordType', 'numeric'),
+                                        ('Empty', 'no'), ('Complex', 'no'),
+                                        ('Sparse', 'no')):
+                        grp['Bytes'].attrs[attr] = np.bytes_(value)
+                    grp.attrs['RecordType'] = np.bytes_('split')
+                    grp.attrs['FieldNames'] = np.bytes_(
+                        'Bytes OriginalName SplitFiles'
+                    )
+
+            target = merge_splits(op.join(directory, names[1]))
+            self.assertEqual(target, op.join(directory, 'mydata'))
+            with open(target, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+            with self.assertRaises(IOError):
+                merge_splits(op.join(directory, 'missing.sda'))
+            other = op.join(directory, 'other.sda')
+            SDAFile(other, 'w').insert('x', 1.0)
+            with self.assertRaises(ValueError):
+                merge_splits(other)
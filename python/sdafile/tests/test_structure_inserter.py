@@ -1,7 +1,7 @@
 import numpy as np
 from numpy.testing import assert_equal
 
-from sdafile.structure_inserter import DictInserter
+from sdafile.structure_inserter import ColumnsInserter, DictInserter
 from sdafile.testing import InserterTestCase
 
 
@@ -94,3 +94,53 @@ class TestStructInserter(InserterTestCase):
                 grp.attrs,
                 **grp_attrs
             )
+
+
+class TestColumnsInserter(InserterTestCase):
+
+    def test_columns_inserter_basic(self):
+        data = {
+            'a': np.arange(3.0),
+            'b': ['x', 'yy', 'zzz'],
+            'c': np.arange(6).reshape(3, 2),
+        }
+        grp_attrs = dict(
+            RecordType='structures',
+            Empty='no',
+            RecordSize=(1, 3),
+            Description='desc',
+            Deflate=0,
+        )
+        label = 'test'
+        with self.insert(ColumnsInserter, label, data, 0, 'desc') as h5file:
+            grp = h5file[label]
+            self.assertAttrs(grp.attrs, **grp_attrs)
+            for i in range(3):
+                sub_grp = grp['element {}'.format(i + 1)]
+                self.assertAttrs(
+                    sub_grp.attrs,
+                    RecordType='structure',
+                    Empty='no',
+                    FieldNames='a b c',
+                    Deflate=0,
+                )
+                assert_equal(sub_grp['a'][()], [[float(i)]])
+                self.assertEqual(
+                    sub_grp['b'][()].tobytes().decode('ascii'), data['b'][i]
+                )
+                assert_equal(sub_grp['c'][()], data['c'][i].reshape(-1, 1))
+
+    def test_columns_inserter_invalid(self):
+        bad = [
+            {'a': np.arange(3), 'b': np.arange(4)},  # unequal lengths
+            {'a': np.arange(0)},  # empty
+            {'a': 'abc'},  # string column
+            {'a': 3},  # scalar column
+            {'_a': np.arange(3)},  # invalid label
+            {'a': [1, 'a']},  # inhomogeneous
+            {'a': [None, None]},  # unsupported
+        ]
+        for data in bad:
+            inserter = ColumnsInserter('test', data, 0, self.registry)
+            with self.assertRaises(ValueError):
+                inserter.prepare_data()
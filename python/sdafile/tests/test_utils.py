@@ -1,5 +1,7 @@
 import datetime
 from itertools import combinations
+import os
+import os.path as op
 import unittest
 
 import numpy as np
@@ -8,15 +10,16 @@ from numpy.testing import assert_array_equal
 from sdafile.exceptions import BadSDAFile
 from sdafile.record_inserter import InserterRegistry
 from sdafile.testing import (
-    BAD_ATTRS, GOOD_ATTRS, temporary_h5file
+    BAD_ATTRS, GOOD_ATTRS, temporary_directory, temporary_h5file
 )
 from sdafile.utils import (
     CELL_EQUIVALENT, STRUCTURE_EQUIVALENT, SUPPORTED_RECORD_TYPES,
     are_record_types_equivalent, are_signatures_equivalent, error_if_bad_attr,
-    error_if_bad_header, error_if_not_writable, get_date_str, get_decoded,
-    get_empty_for_type, is_valid_date, is_valid_file_format,
+    dumps_shape, error_if_bad_header, error_if_not_writable, get_date_str,
+    get_decoded, get_empty_for_type, is_valid_date, is_valid_file_format,
     is_valid_format_version, is_valid_matlab_field_label, is_valid_writable,
-    set_encoded, unnest, unnest_record, update_header, write_header
+    loads_shape, make_temporary_file, set_encoded, unnest, unnest_record,
+    update_header, write_header
 )
 
 
@@ -152,6 +155,13 @@ class TestUtils(unittest.TestCase):
             h5file.attrs['foo'] = b'foo'
             error_if_bad_attr(h5file, 'foo', lambda value: value == 'foo')
 
+            # Attrs read back as str are decoded the same way
+            h5file.attrs['foo'] = 'foo'
+            error_if_bad_attr(h5file, 'foo', lambda value: value == 'foo')
+            h5file.attrs['foo'] = 'bar'
+            with self.assertRaises(BadSDAFile):
+                error_if_bad_attr(h5file, 'foo', lambda value: value == 'foo')
+
     def test_error_if_bad_header(self):
         with temporary_h5file() as h5file:
 
@@ -178,6 +188,34 @@ class TestUtils(unittest.TestCase):
             with self.assertRaises(IOError):
                 error_if_not_writable(h5file)
 
+            h5file.attrs['Writable'] = 'yes'
+            error_if_not_writable(h5file)
+
+            h5file.attrs['Writable'] = 'no'
+            with self.assertRaises(IOError):
+                error_if_not_writable(h5file)
+
+    def test_dumps_shape(self):
+        for shape in [None, (), (3,), (2, 0, 4)]:
+            self.assertEqual(loads_shape(dumps_shape(shape)), shape)
+        self.assertEqual(dumps_shape(np.zeros((2, 3)).shape), '[2, 3]')
+        self.assertEqual(dumps_shape((np.int64(2),)), '[2]')
+
+    def test_make_temporary_file(self):
+        with temporary_directory() as directory:
+            fd, path = make_temporary_file(directory, 'a', '.sda')
+            os.close(fd)
+            fd, other = make_temporary_file(directory, 'a', '.sda')
+            os.close(fd)
+            self.assertNotEqual(path, other)
+            self.assertEqual(op.dirname(path), op.abspath(directory))
+            name = op.basename(path)
+            self.assertTrue(name.startswith('a') and name.endswith('.sda'))
+
+            umask = os.umask(0)
+            os.umask(umask)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+
     def test_get_date_str(self):
         dt = datetime.datetime(2017, 8, 18, 2, 22, 11)
         date_str = get_date_str(dt)
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import os.path as op
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_equal
+
+import sdafile
+from sdafile.sda_file import SDAFile
+from sdafile.testing import temporary_directory
+from sdafile.writer import (
+    WriterClient, WriterService, _Request, _Writer, _share, _unshare,
+)
+
+
+# Inserts through a writer service and prints the names of the shared memory
+# blocks that the client unlinked. With 'shared', the server shares the
+# resource tracker of the client.
+_CLIENT_SCRIPT = """
+import sys
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from sdafile.writer import WriterService
+
+if sys.argv[2] == 'shared':
+    resource_tracker.ensure_running()
+names = []
+unlink = shared_memory.SharedMemory.unlink
+
+def spy(self):
+    names.append(self.name)
+    unlink(self)
+
+shared_memory.SharedMemory.unlink = spy
+with WriterService(sys.argv[1]) as service:
+    client = service.client()
+    client.insert('a', np.arange(1000.0))
+    client.insert('b', [np.arange(1000.0), np.arange(2000.0)])
+print(' '.join(names))
+"""
+
+
+def _produce(args):
+    """ Insert the channels of one producer through a writer service. """
+    address, authkey, producer = args
+    client = WriterClient(address, authkey)
+    for i in range(5):
+        label = 'ch{}_{}'.format(producer, i)
+        data = np.full((100, 20), 10.0 * producer + i)
+        client.insert(label, data, label)
+    return producer
+
+
+class TestWriterService(unittest.TestCase):
+
+    def test_concurrent_inserts(self):
+        with temporary_directory() as directory:
+            name = op.join(directory, 'ingest.sda')
+            with WriterService(name) as service:
+                pool = multiprocessing.Pool(4)
+                try:
+                    args = [
+                        (service.address, service.authkey, i)
+                        for i in range(4)
+                    ]
+                    pool.map(_produce, args)
+                    pool.close()
+                finally:
+                    pool.terminate()
+                    pool.join()
+
+            sda_file = SDAFile(name, 'r')
+            self.assertEqual(len(sda_file.labels()), 20)
+            assert_equal(
+                sda_file.extract('ch3_4'), np.full((100, 20), 34.0)
+            )
+            self.assertEqual(sda_file['ch3_4'].description, 'ch3_4')
+
+    def test_requests(self):
+        with temporary_directory() as directory:
+            name = op.join(directory, 'ingest.sda')
+            sda_file = SDAFile(name, 'w')
+            sda_file.create_stream('rows', row_shape=(3,))
+
+            with WriterService(name, batch_interval=0.01) as service:
+                client = service.client()
+                data = {'a': np.arange(2000.0), 'b': 'text'}
+                client.insert('record', data, 'a structure')
+                client.replace('record', np.ones(10))
+                self.assertEqual(client.append('rows', np.ones((4, 3))), 4)
+                with self.assertRaises(ValueError):
+                    client.insert('record', 1.0)
+
+            assert_array_equal(sda_file.extract('record'), np.ones(10))
+            self.assertEqual(sda_file['record'].description, 'a structure')
+            self.assertEqual(sda_file.extract('rows').shape, (4, 3))
+
+    def test_closed_writer(self):
+        with temporary_directory() as directory:
+            name = op.join(directory, 'ingest.sda')
+            writer = _Writer(name, 8, 0.0, {})
+            writer.submit('insert', 'a', np.arange(3.0), {})
+
+            # A request behind the request to stop fails rather than hangs
+            with writer._lock:
+                writer._closed = True
+                writer._requests.put(None)
+                late = _Request('insert', 'b', 1.0, {})
+                writer._requests.put(late)
+            writer.close()
+            self.assertTrue(late.done.wait(5))
+            self.assertIsInstance(late.error, IOError)
+            with self.assertRaises(IOError):
+                writer.submit('insert', 'c', 1.0, {})
+            self.assertEqual(SDAFile(name, 'r').labels(), ['a'])
+
+    @unittest.skipUnless(os.name == 'posix', 'POSIX shared memory')
+    def test_unlink_once(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = op.dirname(op.dirname(sdafile.__file__))
+        for tracker in ('separate', 'shared'):
+            with temporary_directory() as directory:
+                name = op.join(directory, 'ingest.sda')
+                result = subprocess.run(
+                    [sys.executable, '-c', _CLIENT_SCRIPT, name, tracker],
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    env=env, universal_newlines=True, check=True,
+                )
+
+                # The client unlinks each block, and no resource tracker
+                # warns of leaked blocks or fails to unlink them again
+                names = result.stdout.split()
+                self.assertEqual(len(names), 3)
+                self.assertEqual(len(set(names)), 3)
+                self.assertEqual(result.stderr, '')
+                for block_name in names:
+                    self.assertFalse(
+                        op.exists(op.join('/dev/shm', block_name))
+                    )
+                self.assertEqual(SDAFile(name, 'r').labels(), ['a', 'b'])
+
+    def test_batch(self):
+        with temporary_directory() as directory:
+            sda_file = SDAFile(op.join(directory, 'batch.sda'), 'w')
+            updated = sda_file.Updated
+            with sda_file.batch():
+                sda_file.insert('a', np.arange(3.0))
+                sda_file.insert('b', 'text')
+                self.assertEqual(sda_file.labels(), ['a', 'b'])
+                with self.assertRaises(IOError):
+                    sda_file.remove('a')
+            self.assertEqual(sda_file.labels(), ['a', 'b'])
+            self.assertGreaterEqual(sda_file.Updated, updated)
+
+    def test_share(self):
+        blocks = []
+        data = [np.arange(1000.0), np.arange(3), 'text']
+        try:
+            shared = _share(data, blocks)
+            self.assertEqual(len(blocks), 1)
+            self.assertIs(shared[1], data[1])
+            server_blocks = []
+            unshared = _unshare(shared, server_blocks)
+            assert_array_equal(unshared[0], data[0])
+            del unshared
+            for block in server_blocks:
+                block.close()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
@@ -7,9 +7,13 @@ interaction with HDF5 are not included here.
 """
 
 from datetime import datetime
+import errno
+import json
+import os
 import re
 import string
 import time
+import uuid
 
 import numpy as np
 
@@ -102,18 +106,17 @@ def are_signatures_equivalent(sig1, sig2):
 def error_if_bad_attr(h5file, attr, is_valid):
     """ Raise BadSDAFile error if h5file has a bad SDA attribute.
 
-    This assumes that the attr is stored as bytes. The passed ``is_valid``
+    The attr may be stored as bytes or as a string. The passed ``is_valid``
     function should accept the value as a string.
 
     """
     name = h5file.filename
     try:
-        value = h5file.attrs[attr]
+        value = get_decoded(h5file.attrs, attr)[attr]
     except KeyError:
         msg = "File '{}' does not contain '{}' attribute".format(name, attr)
         raise BadSDAFile(msg)
     else:
-        value = value.decode('ascii')
         if not is_valid(value):
             msg = "File '{}' has invalid '{}' attribute".format(name, attr)
             raise BadSDAFile(msg)
@@ -139,12 +142,54 @@ def error_if_bad_header(h5file):
 
 def error_if_not_writable(h5file):
     """ Raise an IOError if an SDAFile indicates 'Writable' as 'no'. """
-    writable = h5file.attrs.get('Writable')
-    if writable == b'no':
+    writable = get_decoded(h5file.attrs, 'Writable').get('Writable')
+    if writable == 'no':
         msg = "File '{}' is not writable".format(h5file.filename)
         raise IOError(msg)
 
 
+def make_temporary_file(directory, prefix='', suffix=''):
+    """ Create a new file with a unique name in a directory.
+
+    Unlike ``tempfile.mkstemp``, which makes files that only their owner
+    can access, the file gets the default permissions of new files, 0666
+    less the umask, so that it can replace a file that others may read.
+
+    Returns
+    -------
+    fd : int
+        The file descriptor of the file, open for reading and writing.
+    path : str
+        The absolute path of the file.
+
+    """
+    directory = os.path.abspath(directory)
+    flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    for _ in range(100):
+        name = '{}{}{}'.format(prefix, uuid.uuid4().hex[:12], suffix)
+        path = os.path.join(directory, name)
+        try:
+            fd = os.open(path, flags, 0o666)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        else:
+            return fd, path
+    raise IOError("No unique file name found in '{}'".format(directory))
+
+
+def dumps_shape(shape):
+    """ Encode an array shape, or None, as a JSON string. """
+    if shape is None:
+        return None
+    return json.dumps([int(dim) for dim in shape])
+
+
+def loads_shape(value):
+    """ Decode an array shape encoded with ``dumps_shape``. """
+    return None if value is None else tuple(json.loads(value))
+
+
 def get_date_str(dt=None):
     """ Get a valid date string from a datetime, or current time. """
     if dt is None:
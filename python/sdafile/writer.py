@@ -0,0 +1,444 @@
+""" A writer service for SDA files written by many processes.
+
+HDF5 allows one writer per file. A ``WriterService`` runs a server process
+that holds the only write handle of an SDA file, and many client processes
+send it insert, replace, and append requests. The server applies requests in
+groups, with one open of the file and one header update per group, so that
+the cost of commits is shared by the requests of concurrent clients.
+
+Clients connect over a local socket (a Unix domain socket on POSIX systems).
+Arrays in the data of requests are passed through shared memory rather than
+pickled through the socket. Other data, such as strings, is pickled.
+
+"""
+
+from collections import OrderedDict
+from multiprocessing import current_process, resource_tracker, shared_memory
+from multiprocessing.managers import BaseManager
+import os
+import queue
+import threading
+
+import numpy as np
+
+from .sda_file import SDAFile
+
+
+# Maximum number of requests applied in one commit
+BATCH_SIZE = 64
+
+# Minimum number of bytes of arrays passed through shared memory
+SHARE_MIN_BYTES = 2 ** 12
+
+
+class WriterService(object):
+    """ A server process that writes to an SDA file for many processes.
+
+    Examples
+    --------
+    In the coordinating process
+
+    >>> service = WriterService('ingest.sda')
+    >>> service.start()
+
+    In each producer process, given ``service.address`` and
+    ``service.authkey``
+
+    >>> client = WriterClient(address, authkey)
+    >>> client.insert(label, data, description)
+
+    When all producers are done
+
+    >>> service.shutdown()
+
+    """
+
+    def __init__(self, name, address=None, authkey=None,
+                 batch_size=BATCH_SIZE, batch_interval=0.0, **kw):
+        """ Create a writer service for a file.
+
+        The file is created if it does not exist. The service is not started
+        until ``start`` is called.
+
+        Parameters
+        ----------
+        name : str
+            The name of the SDA file.
+        address : str, optional
+            The address of the socket of the service. Defaults to a new
+            address.
+        authkey : bytes, optional
+            The key that clients authenticate with. Defaults to the key of
+            this process, which child processes inherit.
+        batch_size : int, optional
+            The maximum number of requests applied in one commit.
+        batch_interval : float, optional
+            The time, in seconds, that the service waits for more requests
+            before a commit. By default, a commit holds the requests that
+            arrived while the previous commit was written.
+        kw :
+            Key-word arguments that are passed to the underlying HDF5 file.
+            See h5py.File for options.
+
+        Raises
+        ------
+        IOError if the file is not writable
+        ValueError if ``batch_size`` is less than 1
+
+        """
+        if int(batch_size) < 1:
+            raise ValueError("batch_size must be at least 1")
+        # Validate the file before starting the server process
+        SDAFile(name, 'a', **kw)._validate_can_write()
+
+        if authkey is None:
+            authkey = bytes(current_process().authkey)
+        self._name = name
+        self._authkey = authkey
+        self._args = (name, int(batch_size), float(batch_interval), kw)
+        self._manager = _WriterManager(address=address, authkey=authkey)
+        self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    @property
+    def name(self):
+        """ The name of the SDA file. """
+        return self._name
+
+    @property
+    def address(self):
+        """ The address of the socket of the service. """
+        return self._manager.address
+
+    @property
+    def authkey(self):
+        """ The key that clients authenticate with. """
+        return self._authkey
+
+    def start(self):
+        """ Start the server process. """
+        if not self._started:
+            self._manager.start(_start_writer, self._args)
+            self._started = True
+
+    def client(self):
+        """ Get a client of the service. """
+        return WriterClient(self.address, self._authkey)
+
+    def shutdown(self):
+        """ Apply pending requests, close the file, and stop the server. """
+        if self._started:
+            self._manager.get_writer().close()
+            self._manager.shutdown()
+            self._started = False
+
+
+class WriterClient(object):
+    """ A client of a ``WriterService``.
+
+    Each request blocks until it has been committed to the file, and raises
+    any error raised by applying it.
+
+    """
+
+    def __init__(self, address, authkey=None):
+        """ Connect to a writer service.
+
+        Parameters
+        ----------
+        address : str
+            The address of the service. See ``WriterService.address``.
+        authkey : bytes, optional
+            The key of the service. Defaults to the key of this process.
+
+        """
+        if authkey is None:
+            authkey = bytes(current_process().authkey)
+        manager = _WriterManager(address=address, authkey=authkey)
+        manager.connect()
+        self._writer = manager.get_writer()
+
+    def insert(self, label, data, description='', deflate=0, **kw):
+        """ Insert data into the file.
+
+        See ``SDAFile.insert``.
+
+        """
+        kw.update(description=description, deflate=deflate)
+        self._submit('insert', label, data, kw)
+
+    def replace(self, label, data):
+        """ Replace an existing record.
+
+        See ``SDAFile.replace``.
+
+        """
+        self._submit('replace', label, data, {})
+
+    def append(self, label, rows):
+        """ Append rows to a numeric or logical record.
+
+        See ``SDAFile.append``.
+
+        Returns
+        -------
+        n : int
+            The number of rows of the record.
+
+        """
+        return self._submit('append', label, rows, {})
+
+    def _submit(self, method, label, data, kw):
+        blocks = []
+        try:
+            payload = _share(data, blocks)
+            return self._writer.submit(method, label, payload, kw)
+        finally:
+            # The server has released the blocks once the request is done
+            for block in blocks:
+                block.close()
+                _unlink(block)
+
+
+class _WriterManager(BaseManager):
+    pass
+
+
+class _SharedArray(object):
+    """ Reference to an array in a shared memory block. """
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+class _Request(object):
+    """ A request, and its result once it is done. """
+
+    def __init__(self, method, label, payload, kw):
+        self.method = method
+        self.label = label
+        self.payload = payload
+        self.kw = kw
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def apply(self, sda_file):
+        blocks = []
+        data = None
+        try:
+            data = _unshare(self.payload, blocks)
+            method = getattr(sda_file, self.method)
+            self.result = method(self.label, data, **self.kw)
+        finally:
+            data = self.payload = None
+            for block in blocks:
+                try:
+                    block.close()
+                except BufferError:
+                    # An error traceback holds the array. The block is
+                    # unmapped when the array is collected.
+                    pass
+
+
+class _Writer(object):
+    """ The writer of a service, run in the server process. """
+
+    def __init__(self, name, batch_size, batch_interval, kw):
+        self._sda_file = SDAFile(name, 'a', **kw)
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._requests = queue.Queue()
+        # Guards the closing of the queue, so that no request is queued
+        # after the request to stop
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, method, label, payload, kw):
+        """ Apply a request, and wait until it is committed. """
+        request = _Request(method, label, payload, kw)
+        with self._lock:
+            if self._closed:
+                raise IOError("The writer service is closed")
+            self._requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def close(self):
+        """ Apply pending requests and stop writing. """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            while batch[-1] is not None and len(batch) < self._batch_size:
+                try:
+                    if self._batch_interval > 0:
+                        request = self._requests.get(
+                            timeout=self._batch_interval
+                        )
+                    else:
+                        request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch:
+                self._commit(batch)
+            if stop:
+                self._fail_pending()
+                return
+
+    def _fail_pending(self):
+        """ Fail the requests that remain after the request to stop. """
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request.error = IOError("The writer service is closed")
+                request.done.set()
+
+    def _commit(self, batch):
+        """ Apply a batch of requests with one commit. """
+        try:
+            with self._sda_file.batch():
+                for request in batch:
+                    try:
+                        request.apply(self._sda_file)
+                    except Exception as e:
+                        request.error = e
+        except Exception as e:
+            # The commit failed, so no request is known to be written
+            for request in batch:
+                if request.error is None:
+                    request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
+
+
+_writer = None
+
+
+def _start_writer(name, batch_size, batch_interval, kw):
+    """ Create the writer of the server process. """
+    global _writer
+    _writer = _Writer(name, batch_size, batch_interval, kw)
+
+
+def _get_writer():
+    return _writer
+
+
+_WriterManager.register(
+    'get_writer', callable=_get_writer, exposed=('submit', 'close'),
+)
+
+
+def _share(data, blocks):
+    """ Copy the arrays in data to shared memory blocks.
+
+    Arrays are replaced by references to their blocks, which are appended to
+    ``blocks``. Arrays nested in dicts, lists, and tuples are shared.
+
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype.hasobject or data.nbytes < SHARE_MIN_BYTES:
+            return data
+        block = shared_memory.SharedMemory(create=True, size=data.nbytes)
+        blocks.append(block)
+        shared = np.ndarray(data.shape, data.dtype, buffer=block.buf)
+        shared[...] = data
+        del shared
+        return _SharedArray(block.name, data.shape, data.dtype.str)
+    if type(data) in (dict, OrderedDict):
+        return type(data)(
+            (key, _share(value, blocks)) for key, value in data.items()
+        )
+    if type(data) in (list, tuple):
+        return type(data)(_share(item, blocks) for item in data)
+    return data
+
+
+def _unshare(data, blocks):
+    """ Map the shared arrays of data from their blocks. """
+    if isinstance(data, _SharedArray):
+        block = _attach(data)
+        blocks.append(block)
+        return np.ndarray(data.shape, np.dtype(data.dtype), buffer=block.buf)
+    if type(data) in (dict, OrderedDict):
+        return type(data)(
+            (key, _unshare(value, blocks)) for key, value in data.items()
+        )
+    if type(data) in (list, tuple):
+        return type(data)(_unshare(item, blocks) for item in data)
+    return data
+
+
+def _attach(shared):
+    """ Attach to the shared memory block of a shared array.
+
+    The client owns the block and unlinks it, so the block must not be
+    tracked by this process. Otherwise the resource tracker of this process
+    would unlink it again when this process exits.
+
+    """
+    try:
+        return shared_memory.SharedMemory(name=shared.name, track=False)
+    except TypeError:
+        # Before Python 3.13, attached blocks are always tracked (bpo-39959)
+        pass
+    block = shared_memory.SharedMemory(name=shared.name)
+    if _IS_TRACKED:
+        resource_tracker.unregister(_tracked_name(block), 'shared_memory')
+    return block
+
+
+def _unlink(block):
+    """ Unlink a shared memory block created by this process.
+
+    If this process shares its resource tracker with the server, the server
+    unregistered the block when it attached to it. The block is registered
+    again so that the unlink, which unregisters it, is balanced.
+
+    """
+    if _IS_TRACKED:
+        resource_tracker.register(_tracked_name(block), 'shared_memory')
+    block.unlink()
+
+
+# Whether the resource tracker tracks shared memory blocks. It only does on
+# POSIX systems.
+_IS_TRACKED = os.name == 'posix'
+
+
+def _tracked_name(block):
+    """ Get the name under which the resource tracker tracks a block.
+
+    POSIX shared memory names are tracked with their leading slash, which
+    ``SharedMemory.name`` omits.
+
+    """
+    return '/' + block.name.lstrip('/')
@@ -38,6 +38,13 @@ setup(
         "Operating System :: POSIX",
         "Operating System :: Unix",
         "Programming Language :: Python",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
         "Topic :: Scientific/Engineering",
         "Topic :: Software Development",
         "Topic :: Software Development :: Libraries",
@@ -47,6 +54,7 @@ setup(
         'Archive (SDA) files.'
     ),
     install_requires=install_requires,
+    python_requires=">=3.8",
     license='BSD',
     platforms=["Windows", "Linux", "Mac OS-X", "Unix", "Solaris"],
     zip_safe=True,